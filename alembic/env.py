@@ -1,4 +1,6 @@
+import sys
 from logging.config import fileConfig
+from pathlib import Path
 
 from dotenv import load_dotenv
 from sqlalchemy import engine_from_config, MetaData
@@ -10,6 +12,10 @@ from alembic import context
 
 load_dotenv()
 
+# Lets revisions `from tenant import for_each_tenant`; the directory itself
+# cannot be imported as `alembic`, the name belongs to the library.
+sys.path.append(str(Path(__file__).parent))
+
 from src.settings import Settings
 
 config = context.config
@@ -1,17 +1,193 @@
 import functools
+import inspect
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
 
-from sqlalchemy import text
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
 from typeguard import typechecked
-from alembic import op
+from alembic import context, op
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+
+from src.settings import Settings
+
+logger = logging.getLogger("alembic.tenant")
+
+DEFAULT_WORKERS = 4
+
+# One row per schema and revision whose tenant step has been applied, so
+# that a failed run resumes with the schemas it did not get to.
+STATE_TABLE = "shared.tenant_migration"
+
+
+def create_timespan_index(op: Operations, table: str, schema: str) -> None:
+    """Create the `src.data_model.timespan_index` of `table` in `schema`."""
+    op.create_index(
+        f"ix_{table}_span",
+        table,
+        [text('tsrange(start, "end")')],
+        schema=schema,
+        postgresql_using="gist",
+    )
+
+
+def drop_timespan_index(op: Operations, table: str, schema: str) -> None:
+    op.drop_index(f"ix_{table}_span", table_name=table, schema=schema)
+
+
+def _options() -> dict[str, str]:
+    return context.get_x_argument(as_dictionary=True)
+
+
+def _tenant_schemas(connection: Connection) -> list[str]:
+    # The template goes first: new tenants are cloned from it, so it must
+    # never lag behind them.
+    return [Settings.database.template_schema] + [
+        schema
+        for (schema,) in connection.execute(
+            text("SELECT schema FROM shared.tenant ORDER BY id")
+        )
+    ]
+
+
+def _applied(connection: Connection, revision: str) -> set[str]:
+    return {
+        schema
+        for (schema,) in connection.execute(
+            text(f"SELECT schema FROM {STATE_TABLE} WHERE revision = :rev"),
+            {"rev": revision},
+        )
+    }
+
+
+def _migrate_schema(
+    engine: Engine,
+    func: Callable,
+    schema: str,
+    revision: str,
+    upgrade: bool,
+) -> float:
+    start = time.perf_counter()
+    # The tenant step and its bookkeeping commit together or not at all.
+    with engine.begin() as connection:
+        func(
+            schema=schema,
+            op=Operations(MigrationContext.configure(connection)),
+        )
+        if upgrade:
+            connection.execute(
+                text(
+                    f"INSERT INTO {STATE_TABLE} (schema, revision) "
+                    "VALUES (:schema, :rev)"
+                ),
+                {"schema": schema, "rev": revision},
+            )
+        else:
+            connection.execute(
+                text(
+                    f"DELETE FROM {STATE_TABLE} "
+                    "WHERE schema = :schema AND revision = :rev"
+                ),
+                {"schema": schema, "rev": revision},
+            )
+    return time.perf_counter() - start
+
+
+def _run_parallel(func: Callable, revision: str, upgrade: bool) -> None:
+    bind = op.get_bind()
+    schemas = _tenant_schemas(bind)
+    applied = _applied(bind, revision)
+    pending = [s for s in schemas if (s in applied) != upgrade]
+    workers = int(_options().get("tenant_workers", DEFAULT_WORKERS))
+    step = f"{revision} {'upgrade' if upgrade else 'downgrade'}"
+
+    start = time.perf_counter()
+    engine = create_engine(bind.engine.url, pool_size=workers, max_overflow=0)
+    timings: dict[str, float] = {}
+    failures: dict[str, BaseException] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                schema: executor.submit(
+                    _migrate_schema, engine, func, schema, revision, upgrade
+                )
+                for schema in pending
+            }
+            for schema, future in futures.items():
+                try:
+                    timings[schema] = future.result()
+                except Exception as e:
+                    logger.error(f"{step} failed for {schema}: {e}")
+                    failures[schema] = e
+    finally:
+        engine.dispose()
+
+    slowest = max(timings, key=timings.__getitem__, default=None)
+    logger.info(
+        f"{step}: {len(timings)} schemas migrated, "
+        f"{len(schemas) - len(pending)} already done, {len(failures)} "
+        f"failed in {time.perf_counter() - start:.1f}s with {workers} "
+        "workers."
+    )
+    if slowest is not None:
+        logger.info(f"{step}: slowest {slowest} ({timings[slowest]:.2f}s).")
+    if failures:
+        raise RuntimeError(
+            f"{step} failed for {sorted(failures)}; rerun to resume."
+        )
+
+
+def _run_offline(func: Callable, accepts_op: bool) -> None:
+    schemas = _options().get("tenants", "")
+    if not schemas:
+        raise ValueError(
+            "Offline tenant migrations need the schemas: -x tenants=a,b"
+        )
+    for schema in schemas.split(","):
+        op.execute(f"-- Tenant schema {schema}")
+        if accepts_op:
+            func(schema=schema, op=op)
+        else:
+            func(schema=schema)
 
 
 @typechecked
 def for_each_tenant(func: Callable) -> Callable:
+    """Run a migration step for every tenant schema and the template.
+
+    Steps taking an ``op`` argument, ``func(schema, op)``, must use that
+    `Operations` instead of the global `alembic.op`. They run in parallel
+    on ``-x tenant_workers=N`` connections (default 4), each schema in a
+    transaction of its own that also records it in ``STATE_TABLE``; schemas
+    already done are skipped, so a failed run resumes where it stopped.
+    Steps taking only ``schema`` run one after another on the migration
+    connection, as before.
+
+    Offline (``--sql``) runs emit the SQL of each schema of
+    ``-x tenants=a,b`` in turn. Online runs refuse that option: they always
+    migrate every schema, as the revision they leave in alembic_version is
+    shared by all of them.
+    """
+    accepts_op = "op" in inspect.signature(func).parameters
+    revision = func.__globals__.get("revision", func.__module__)
+    upgrade = func.__name__ != "downgrade"
+
     @functools.wraps(func)
     def wrapped():
-        schemas = op.get_bind().execute(text("SELECT schema FROM shared.tenant")).fetchall()
-        for (schema,) in schemas:
-            func(schema=schema)
+        if context.is_offline_mode():
+            _run_offline(func, accepts_op)
+            return
+        if "tenants" in _options():
+            raise ValueError(
+                "-x tenants=a,b only applies to offline (--sql) runs."
+            )
+        if accepts_op:
+            _run_parallel(func, revision, upgrade)
+        else:
+            for schema in _tenant_schemas(op.get_bind()):
+                func(schema=schema)
 
-    return wrapped
\ No newline at end of file
+    return wrapped
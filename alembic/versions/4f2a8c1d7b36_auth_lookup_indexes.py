@@ -0,0 +1,49 @@
+"""auth lookup indexes
+
+Revision ID: 4f2a8c1d7b36
+Revises: d9eb09f4f799
+Create Date: 2026-10-18 10:12:41.205113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '4f2a8c1d7b36'
+down_revision: Union[str, None] = 'd9eb09f4f799'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Soft-deleted rows may share a name with a live one, hence partial.
+    op.create_index(
+        'uq_user_name',
+        'user',
+        ['name'],
+        unique=True,
+        schema='shared',
+        postgresql_where=sa.text('deleted_at IS NULL'),
+    )
+    op.create_index(
+        'uq_tenant_name',
+        'tenant',
+        ['name'],
+        unique=True,
+        schema='shared',
+        postgresql_where=sa.text('deleted_at IS NULL'),
+    )
+    op.create_index(
+        'ix_user_tenant_id',
+        'user',
+        ['tenant_id'],
+        schema='shared',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_tenant_id', table_name='user', schema='shared')
+    op.drop_index('uq_tenant_name', table_name='tenant', schema='shared')
+    op.drop_index('uq_user_name', table_name='user', schema='shared')
@@ -0,0 +1,32 @@
+"""tenant migration state
+
+Revision ID: 7b1e5c9a2f40
+Revises: 4f2a8c1d7b36
+Create Date: 2026-10-18 14:03:27.518420
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '7b1e5c9a2f40'
+down_revision: Union[str, None] = '4f2a8c1d7b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Written by `tenant.for_each_tenant` for every schema a step is done in.
+    op.create_table('tenant_migration',
+    sa.Column('schema', sa.String(), nullable=False),
+    sa.Column('revision', sa.String(), nullable=False),
+    sa.Column('applied_at', sa.DateTime(), server_default=sa.text("timezone('UTC', now())"), nullable=False),
+    sa.PrimaryKeyConstraint('schema', 'revision', name=op.f('pk_tenant_migration')),
+    schema='shared'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('tenant_migration', schema='shared')
@@ -0,0 +1,32 @@
+"""tenant template schema
+
+Revision ID: a3d6f0b8c215
+Revises: 7b1e5c9a2f40
+Create Date: 2026-10-18 15:21:09.733012
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from src.settings import Settings
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d6f0b8c215'
+down_revision: Union[str, None] = '7b1e5c9a2f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Tenant steps of later revisions run against it as well; new tenants
+    # are cloned from it by `src.multitenancy.provisioning`.
+    op.execute(
+        f'CREATE SCHEMA IF NOT EXISTS "{Settings.database.template_schema}"'
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        f'DROP SCHEMA IF EXISTS "{Settings.database.template_schema}" CASCADE'
+    )
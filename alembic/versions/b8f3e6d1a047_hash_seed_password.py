@@ -0,0 +1,43 @@
+"""hash seed password
+
+Revision ID: b8f3e6d1a047
+Revises: e2b7d4a9c613
+Create Date: 2026-10-18 20:31:55.904217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.security.password import hashing_context
+from src.settings import Settings
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8f3e6d1a047'
+down_revision: Union[str, None] = 'e2b7d4a9c613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The default tenant's user was seeded in plain text, which no scheme
+    # can verify; logins treat unidentifiable hashes as a failed match.
+    hashed = hashing_context(Settings.security_settings).hash('super_secret_password')
+    op.execute(
+        sa.text(
+            """
+            UPDATE shared.user
+            SET password = :hashed
+            WHERE name = 'User'
+              AND tenant_id = 1000
+              AND password = 'super_secret_password'
+            """
+        ).bindparams(hashed=hashed)
+    )
+
+
+def downgrade() -> None:
+    # The hash stays: putting the password back in plain text would only
+    # lock the user out again.
+    pass
@@ -0,0 +1,59 @@
+"""calendar sync
+
+Revision ID: c5e8a1f3d902
+Revises: a3d6f0b8c215
+Create Date: 2026-10-18 17:02:44.118306
+
+"""
+from typing import Sequence, Union
+
+from alembic.operations import Operations
+import sqlalchemy as sa
+
+from tenant import create_timespan_index, drop_timespan_index, for_each_tenant
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e8a1f3d902'
+down_revision: Union[str, None] = 'a3d6f0b8c215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+@for_each_tenant
+def upgrade(schema: str, op: Operations) -> None:
+    op.create_table('calendar',
+    sa.Column('url', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('ctag', sa.String(), nullable=True),
+    sa.Column('sync_token', sa.String(), nullable=True),
+    sa.Column('synced_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), sa.Identity(always=False, start=1000), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text("timezone('UTC', now())"), nullable=True),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_calendar')),
+    sa.UniqueConstraint('url', name=op.f('uq_calendar_url')),
+    schema=schema
+    )
+    op.create_table('calendar_event',
+    sa.Column('calendar_id', sa.Integer(), nullable=False),
+    sa.Column('href', sa.String(), nullable=False),
+    sa.Column('etag', sa.String(), nullable=False),
+    sa.Column('uid', sa.String(), nullable=False),
+    sa.Column('summary', sa.String(), nullable=True),
+    sa.Column('recurring', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+    sa.Column('start', sa.DateTime(), nullable=False),
+    sa.Column('end', sa.DateTime(), nullable=False),
+    sa.Column('id', sa.Integer(), sa.Identity(always=False, start=1000), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text("timezone('UTC', now())"), nullable=True),
+    sa.ForeignKeyConstraint(['calendar_id'], [f'{schema}.calendar.id'], name=op.f('fk_calendar_event_calendar_id_calendar')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_calendar_event')),
+    sa.UniqueConstraint('calendar_id', 'href', name=op.f('uq_calendar_event_calendar_id_href')),
+    schema=schema
+    )
+    create_timespan_index(op, 'calendar_event', schema)
+
+
+@for_each_tenant
+def downgrade(schema: str, op: Operations) -> None:
+    drop_timespan_index(op, 'calendar_event', schema)
+    op.drop_table('calendar_event', schema=schema)
+    op.drop_table('calendar', schema=schema)
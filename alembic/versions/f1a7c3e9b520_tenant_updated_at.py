@@ -0,0 +1,64 @@
+"""tenant updated at
+
+Revision ID: f1a7c3e9b520
+Revises: b8f3e6d1a047
+Create Date: 2026-10-18 09:14:27.318405
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a7c3e9b520'
+down_revision: Union[str, None] = 'b8f3e6d1a047'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'tenant',
+        sa.Column(
+            'updated_at',
+            sa.DateTime(),
+            server_default=sa.text("timezone('UTC', now())"),
+            nullable=False,
+        ),
+        schema='shared',
+    )
+    op.execute(
+        'UPDATE shared.tenant SET updated_at ='
+        ' coalesce(greatest(created_at, deleted_at), updated_at)'
+    )
+    op.create_index(
+        'ix_tenant_updated_at', 'tenant', ['updated_at'], schema='shared'
+    )
+    # Kept by the database, so that no way of changing a tenant can slip
+    # past the incremental refresh of the tenant registry.
+    op.execute(
+        """
+        CREATE FUNCTION shared.touch_updated_at() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.updated_at := timezone('UTC', now());
+            RETURN NEW;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tenant_touch_updated_at
+        BEFORE UPDATE ON shared.tenant
+        FOR EACH ROW EXECUTE FUNCTION shared.touch_updated_at()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER tenant_touch_updated_at ON shared.tenant')
+    op.execute('DROP FUNCTION shared.touch_updated_at()')
+    op.drop_index('ix_tenant_updated_at', table_name='tenant', schema='shared')
+    op.drop_column('tenant', 'updated_at', schema='shared')
@@ -1,16 +1,49 @@
 from __future__ import annotations
 
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app import VERSION
+from app.api.metrics import api as api_metrics
+from app.api.middleware import RequestMetricsMiddleware
+from app.api.responses import FastJSONResponse
+from app.api.v1.admin import api as api_admin
 from app.api.v1.health_check import api as api_health_check
 from app.api.v1.security.authentication import api as api_authentication
+from src.caching import listen_for_invalidations
+from src.db import dispose_async_engines, dispose_engines
 from src.logging.main import init_logging
+from src.multitenancy.registry import keep_fresh, tenant_registry
+from src.redis_client import close_redis
+from src.security.password import password_hasher
+from src.write_behind import write_behind
 
 init_logging("config/logging_backend.yml")
 
 
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    background = [
+        asyncio.create_task(listen_for_invalidations()),
+        asyncio.create_task(keep_fresh(tenant_registry)),
+        asyncio.create_task(write_behind.run()),
+    ]
+    yield
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await write_behind.close()
+    await close_redis()
+    password_hasher.shutdown()
+    await dispose_async_engines()
+    dispose_engines()
+
+
 app = FastAPI(
     title="Application API",
     description="Backend for the application.",
@@ -23,10 +56,14 @@ app = FastAPI(
         }
     ],
     version=VERSION,
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 app.include_router(api_health_check, prefix="/api/v1")
 app.include_router(api_authentication, prefix="/api/v1")
+app.include_router(api_admin, prefix="/api/v1")
+app.include_router(api_metrics, prefix="/api")
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,3 +72,4 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
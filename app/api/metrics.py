@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import secrets
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from starlette.responses import PlainTextResponse
+
+from src.metrics import render_prometheus
+from src.settings import Settings
+
+api = APIRouter(tags=["Metrics"])
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def _scraper(
+    credentials: Annotated[
+        HTTPAuthorizationCredentials | None, Depends(_bearer)
+    ],
+) -> None:
+    """Admit scrapers presenting ``METRICS_TOKEN``; without it, nobody."""
+    token = Settings.security_settings.metrics_token
+    if token is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND)
+    if credentials is None or not secrets.compare_digest(
+        credentials.credentials.encode(), token.encode()
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail="Not authenticated.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@api.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+    dependencies=[Depends(_scraper)],
+)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        render_prometheus(), media_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import logging
+from time import perf_counter
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.metrics import RequestStats, histogram, request_stats
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+_QUERY_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+
+class RequestMetricsMiddleware:
+    """Records latency, SQL statement count and DB time per route.
+
+    Statements are counted by the engine hooks of `src.db_metrics`, which
+    report into the `RequestStats` of the request being served. Requests
+    running more statements than ``DB_QUERY_BUDGET`` are logged, as that
+    usually means an N+1 query pattern.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            request_stats.reset(token)
+            self._record(scope, stats, elapsed, status_code)
+
+    @staticmethod
+    def _record(
+        scope: Scope,
+        stats: RequestStats,
+        elapsed: float,
+        status_code: int,
+    ) -> None:
+        # FastAPI puts the matched route into the scope while routing.
+        route = getattr(scope.get("route"), "path", "<unmatched>")
+        labels = {"method": scope["method"], "route": route}
+        histogram(
+            "http_request_duration_seconds",
+            "Latency of HTTP requests.",
+            **labels,
+        ).observe(elapsed)
+        histogram(
+            "http_request_db_seconds",
+            "Time spent executing SQL per HTTP request.",
+            **labels,
+        ).observe(stats.db_time)
+        histogram(
+            "http_request_queries",
+            "Number of SQL statements per HTTP request.",
+            buckets=_QUERY_BUCKETS,
+            **labels,
+        ).observe(stats.queries)
+
+        if stats.queries > Settings.database.query_budget:
+            logger.warning(
+                "%s %s ran %d SQL statements (budget %d) in %.1f ms of DB "
+                "time; status %d.",
+                scope["method"],
+                route,
+                stats.queries,
+                Settings.database.query_budget,
+                stats.db_time * 1000,
+                status_code,
+            )
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from typing import Any, AsyncIterable, AsyncIterator, Iterable
+
+from pydantic_core import to_json
+from starlette.responses import JSONResponse, StreamingResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON rendered by pydantic-core in a single pass.
+
+    Models are serialized straight to bytes, skipping the detour through
+    `jsonable_encoder` and `json.dumps` that FastAPI takes when a handler
+    returns one; return this response from the handler to get that. Bytes
+    are taken to be JSON already and sent as they are.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return to_json(content)
+
+
+class NDJSONResponse(StreamingResponse):
+    """Newline-delimited JSON, one line per item, streamed as it comes.
+
+    Takes an async iterable of batches of items and sends each batch as a
+    single chunk, so memory use depends on the batch size only.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(
+        self,
+        batches: AsyncIterable[Iterable[Any]],
+        status_code: int = 200,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(self._encode(batches), status_code, **kwargs)
+
+    @staticmethod
+    async def _encode(
+        batches: AsyncIterable[Iterable[Any]],
+    ) -> AsyncIterator[bytes]:
+        async for batch in batches:
+            yield b"".join(to_json(item) + b"\n" for item in batch)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from typing import AsyncIterator, Sequence
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.responses import FastJSONResponse, NDJSONResponse
+from app.api.v1.data_model import Page, TenantSummary, UserSummary
+from app.api.v1.security.common import get_admin_tenant
+from src.data_model import Tenant, User
+from src.db import get_shared_async_read_db_session, new_async_db_session
+from src.multitenancy import tenant, user
+from src.settings import Settings
+
+api = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(get_admin_tenant)],
+)
+
+_EXPORT_BATCH_SIZE = 1000
+
+After = Query(0, ge=0, description="Id of the last item of the last page.")
+Limit = Query(100, ge=1, le=1000)
+
+
+def _tenant_summary(row: Tenant) -> TenantSummary:
+    return TenantSummary(
+        tenant_id=row.id,
+        name=row.name,
+        schema_name=row.schema,
+        active=row.active,
+        default_tenant=row.default_tenant,
+        created_at=row.created_at,
+    )
+
+
+def _user_summary(row: User) -> UserSummary:
+    return UserSummary(
+        user_id=row.id,
+        username=row.name,
+        email=row.email,
+        active=row.active,
+        tenant_id=row.tenant_id,
+        created_at=row.created_at,
+    )
+
+
+def _next_after(rows: Sequence[Tenant | User], limit: int) -> int | None:
+    return rows[-1].id if len(rows) == limit else None
+
+
+@api.get("/tenants", response_model=Page[TenantSummary])
+async def list_tenants(
+    after: int = After,
+    limit: int = Limit,
+    session: AsyncSession = Depends(get_shared_async_read_db_session),
+) -> FastJSONResponse:
+    rows = await tenant.page_async(session, after, limit)
+    return FastJSONResponse(
+        Page[TenantSummary](
+            items=[_tenant_summary(row) for row in rows],
+            next_after=_next_after(rows, limit),
+        )
+    )
+
+
+@api.get("/users", response_model=Page[UserSummary])
+async def list_users(
+    after: int = After,
+    limit: int = Limit,
+    tenant_id: int | None = None,
+    session: AsyncSession = Depends(get_shared_async_read_db_session),
+) -> FastJSONResponse:
+    rows = await user.page_async(session, after, limit, tenant_id)
+    return FastJSONResponse(
+        Page[UserSummary](
+            items=[_user_summary(row) for row in rows],
+            next_after=_next_after(rows, limit),
+        )
+    )
+
+
+# The exports open their own session: the one of a dependency would be
+# closed before the response has been streamed.
+
+
+async def _exported_tenants() -> AsyncIterator[list[TenantSummary]]:
+    async with new_async_db_session(
+        Settings.database.shared_schema, read_only=True
+    ) as session:
+        async for batch in tenant.stream_async(session, _EXPORT_BATCH_SIZE):
+            yield [_tenant_summary(row) for row in batch]
+
+
+async def _exported_users(
+    tenant_id: int | None,
+) -> AsyncIterator[list[UserSummary]]:
+    async with new_async_db_session(
+        Settings.database.shared_schema, read_only=True
+    ) as session:
+        async for batch in user.stream_async(
+            session, _EXPORT_BATCH_SIZE, tenant_id
+        ):
+            yield [_user_summary(row) for row in batch]
+
+
+@api.get("/tenants/export", response_class=NDJSONResponse)
+async def export_tenants() -> NDJSONResponse:
+    """All tenants as newline-delimited JSON, one `TenantSummary` a line."""
+    return NDJSONResponse(_exported_tenants())
+
+
+@api.get("/users/export", response_class=NDJSONResponse)
+async def export_users(tenant_id: int | None = None) -> NDJSONResponse:
+    """All users as newline-delimited JSON, one `UserSummary` a line."""
+    return NDJSONResponse(_exported_users(tenant_id))
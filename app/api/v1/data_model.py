@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+from datetime import datetime
+from typing import Generic, TypeVar
+
 from pydantic import BaseModel
 
+Item = TypeVar("Item")
+
 
 class Token(BaseModel):
     token_type: str
@@ -14,4 +19,29 @@ class User(BaseModel):
     password: str | None = None
     email: str | None = None
     full_name: str | None = None
+    tenant_id: int
     tenant_schema: str
+
+
+class Page(BaseModel, Generic[Item]):
+    items: list[Item]
+    # Pass as ``after`` to get the next page; None on the last one.
+    next_after: int | None
+
+
+class TenantSummary(BaseModel):
+    tenant_id: int
+    name: str
+    schema_name: str
+    active: bool
+    default_tenant: bool
+    created_at: datetime | None
+
+
+class UserSummary(BaseModel):
+    user_id: int
+    username: str
+    email: str
+    active: bool
+    tenant_id: int
+    created_at: datetime | None
@@ -1,71 +1,215 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
+import math
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from http import HTTPStatus
-from typing import Annotated
+from ipaddress import IPv4Network, IPv6Network, ip_address, ip_network
+from typing import Annotated, Any
 
-import jwt
-from fastapi import APIRouter, Cookie, Depends, Form, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    Form,
+    Header,
+    HTTPException,
+    Request,
+    status,
+)
 from fastapi.security import OAuth2PasswordRequestForm
-from jwt import ExpiredSignatureError
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from starlette.responses import JSONResponse
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import Response
 
+from app.api.responses import FastJSONResponse
 from app.api.v1.data_model import Token
 from app.api.v1.data_model import User as UserDto
-from app.api.v1.security.common import get_current_user, oauth2_scheme
+from app.api.v1.security.common import (
+    ACCESS_TOKEN,
+    REFRESH_TOKEN,
+    Claims,
+    access_token_claims,
+    get_current_user,
+    refresh_token_claims,
+)
 from src.data_model import User
-from src.db import get_shared_db_session
-from src.multitenancy.user import try_get
+from src.db import get_shared_async_read_db_session
+from src.multitenancy.user import try_get_async
+from src.security.keys import key_ring
+from src.security.password import HashingSaturatedError, password_hasher
+from src.security.rate_limit import login_limiter
+from src.security.refresh_tokens import (
+    InvalidRefreshTokenError,
+    refresh_tokens,
+)
 from src.settings import Settings
+from src.write_behind import AuditRecord, write_behind
 
 logger = logging.getLogger(__name__)
 
 api = APIRouter(prefix="/authentication", tags=["Security"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-
-def _verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+async def _verify_password(plain: str, hashed: str) -> tuple[bool, str | None]:
+    try:
+        return await password_hasher.verify_and_update(plain, hashed)
+    except HashingSaturatedError:
+        logger.warning("Password hashing pool saturated; rejecting login.")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent login attempts, try again later.",
+            headers={"Retry-After": "1"},
+        )
 
 
-def _authenticate(
-    session: Session,
+async def _authenticate(
+    session: AsyncSession,
     username: str,
     password: str,
 ) -> User | None:
-    if (user := try_get(session, username)) and _verify_password(
-        password, user.password
-    ):
-        return user
-    return None
+    if not (user := await try_get_async(session, username)):
+        return None
+    verified, new_hash = await _verify_password(password, user.password)
+    if not verified:
+        return None
+    if new_hash:
+        # Hashed under an outdated policy; replaced in the background, as
+        # the session here may well be a read replica's.
+        await write_behind.update_user(user.id, password=new_hash)
+    return user
 
 
 def _create_token(
     user_id: int,
+    token_type: str,
     expires_delta: timedelta,
+    **claims: Any,
 ) -> str:
-    return jwt.encode(
+    return key_ring.sign(
         {
             "sub": str(user_id),
+            "typ": token_type,
             "exp": datetime.now(timezone.utc) + expires_delta,
-        },
-        Settings.security_settings.secret_key,
-        algorithm=Settings.security_settings.algorithm,
+            **claims,
+        }
     )
 
 
-@api.post("/token", response_model=Token)
+def _access_token(user_id: int) -> Token:
+    return Token(
+        access_token=_create_token(
+            user_id=user_id,
+            token_type=ACCESS_TOKEN,
+            expires_delta=timedelta(
+                minutes=Settings.security_settings.access_token_expire_mins
+            ),
+        ),
+        token_type="bearer",
+    )
+
+
+def _set_refresh_cookie(
+    response: Response, user_id: int, family: str, jti: str
+) -> None:
+    response.set_cookie(
+        key="refresh_token",
+        value=_create_token(
+            user_id=user_id,
+            token_type=REFRESH_TOKEN,
+            expires_delta=timedelta(
+                minutes=Settings.security_settings.refresh_token_expire_mins
+            ),
+            fam=family,
+            jti=jti,
+        ),
+        httponly=True,
+        # TODO: introduce Environment for secure flag
+        secure=False,  # Only over HTTPS
+        path="/",  # Visible to Django
+        samesite="lax",
+        max_age=Settings.security_settings.refresh_token_expire_mins * 60,
+    )
+
+
+@lru_cache
+def _networks(proxies: tuple[str, ...]) -> list[IPv4Network | IPv6Network]:
+    return [ip_network(proxy, strict=False) for proxy in proxies]
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ip_address(host)
+    except ValueError:
+        return False
+    proxies = tuple(Settings.security_settings.trusted_proxies)
+    return any(address in network for network in _networks(proxies))
+
+
+def _client_ip(request: Request) -> str | None:
+    """The address of the client, past any trusted reverse proxies.
+
+    ``X-Forwarded-For`` is followed from the right for as long as the hop
+    that appended to it is in ``AUTH_TRUSTED_PROXIES``. Anything further
+    left is whatever the client sent, and so is not believed.
+    """
+    if request.client is None:
+        return None
+    host = request.client.host
+    forwarded = ",".join(request.headers.getlist("x-forwarded-for"))
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    while hops and _is_trusted_proxy(host):
+        host = hops.pop()
+    return host
+
+
+async def _throttle_login(
+    request: Request,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+) -> None:
+    # Runs ahead of the session and any password hashing, so that flooding
+    # the endpoint costs little more than a Redis round trip.
+    if retry_after := await login_limiter.retry_after(
+        user=form_data.username.lower(),
+        ip=_client_ip(request) or "",
+    ):
+        logger.info(f"Throttled login attempt for {form_data.username!r}.")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+async def _record_login(user: User, request: Request) -> None:
+    # Buffered rather than written here, to keep the database off the
+    # login's critical path.
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    await write_behind.update_user(user.id, last_login_at=now)
+    await write_behind.record(
+        AuditRecord(
+            kind="login",
+            occurred_at=now,
+            user_id=user.id,
+            tenant_id=user.tenant_id,
+            client_ip=_client_ip(request),
+        )
+    )
+
+
+@api.post(
+    "/token", response_model=Token, dependencies=[Depends(_throttle_login)]
+)
 async def login(
+    request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     auto_refresh: bool = Form(default=True),
-    session: Session = Depends(get_shared_db_session),
-) -> JSONResponse:
+    session: AsyncSession = Depends(get_shared_async_read_db_session),
+) -> FastJSONResponse:
     if not (
-        user := _authenticate(
+        user := await _authenticate(
             session,
             form_data.username,
             form_data.password,
@@ -76,88 +220,98 @@ async def login(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    await _record_login(user, request)
 
-    token = Token(
-        access_token=_create_token(
-            user_id=user.id,
-            expires_delta=timedelta(
-                minutes=Settings.security_settings.access_token_expire_mins
-            ),
-        ),
-        token_type="bearer",
-    )
-
-    response = JSONResponse(content=token.model_dump())
+    response = FastJSONResponse(_access_token(user.id))
     if auto_refresh:
-        response.set_cookie(
-            key="refresh_token",
-            value=_create_token(
-                user_id=user.id,
-                expires_delta=timedelta(
-                    minutes=Settings.security_settings.refresh_token_expire_mins  # noqa: E501
-                ),
-            ),
-            httponly=True,
-            # TODO: introduce Environment for secure flag
-            secure=False,  # Only over HTTPS
-            path="/",  # Visible to Django
-            samesite="lax",
-            max_age=Settings.security_settings.refresh_token_expire_mins * 60,
-        )
+        try:
+            family, jti = await refresh_tokens.start()
+        except RedisError:
+            # The access token is good without Redis; the client logs in
+            # again once it expires.
+            logger.warning("Redis unavailable, login without refresh token.")
+        else:
+            _set_refresh_cookie(response, user.id, family, jti)
 
     return response
 
 
 @api.post("/refresh", response_model=Token)
-async def refresh_access_token(refresh_token: str = Cookie(None)) -> Token:
-    if not refresh_token:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Missing refresh token.",
-        )
+async def refresh_access_token(
+    claims: Annotated[Claims, Depends(refresh_token_claims)],
+) -> FastJSONResponse:
+    """Trade the refresh token for an access token and a new refresh token.
+
+    Each refresh token is good for a single use; presenting one again
+    revokes every token descending from the same login.
+    """
     try:
-        payload = jwt.decode(
-            refresh_token,
-            Settings.security_settings.secret_key,
-            algorithms=[Settings.security_settings.algorithm],
-        )
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        return Token(
-            access_token=_create_token(
-                user_id=user_id,
-                expires_delta=timedelta(
-                    minutes=Settings.security_settings.access_token_expire_mins
-                ),
-            ),
-            token_type="bearer",
-        )
-    except ExpiredSignatureError:
+        jti = await refresh_tokens.rotate(claims["fam"], claims["jti"])
+    except (KeyError, InvalidRefreshTokenError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Refresh token expired",
+            detail="Invalid token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except RedisError:
+        logger.warning("Redis unavailable, cannot refresh tokens.")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Cannot refresh tokens right now, try again later.",
+            headers={"Retry-After": "1"},
         )
+    response = FastJSONResponse(_access_token(int(claims["sub"])))
+    _set_refresh_cookie(response, int(claims["sub"]), claims["fam"], jti)
+    return response
+
+
+@api.post("/logout", status_code=HTTPStatus.NO_CONTENT, response_model=None)
+async def logout(
+    claims: Annotated[Claims, Depends(refresh_token_claims)],
+    response: Response,
+) -> None:
+    if family := claims.get("fam"):
+        try:
+            await refresh_tokens.revoke(family)
+        except RedisError:
+            # Not done: the tokens would outlive the outage. The cookie is
+            # kept for the client to retry with.
+            logger.warning("Redis unavailable, cannot revoke tokens.")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Cannot log out right now, try again later.",
+                headers={"Retry-After": "1"},
+            )
+    response.delete_cookie("refresh_token", path="/")
 
 
 @api.get("/users/me", response_model=UserDto)
 async def who_am_i(
     user: Annotated[UserDto, Depends(get_current_user)],
-) -> UserDto:
-    return user
+) -> FastJSONResponse:
+    return FastJSONResponse(user)
 
 
-@api.get("/ping", status_code=HTTPStatus.OK)
-async def ping(token: str = Depends(oauth2_scheme)):
-    try:
-        jwt.decode(
-            token,
-            Settings.security_settings.secret_key,
-            algorithms=[Settings.security_settings.algorithm],
-        )
-    except ExpiredSignatureError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token expired",
-        )
+@api.get(
+    "/ping",
+    status_code=HTTPStatus.OK,
+    dependencies=[Depends(access_token_claims)],
+)
+async def ping():
+    return
+
+
+_jwks = json.dumps(key_ring.jwks()).encode()
+_jwks_etag = f'"{hashlib.sha256(_jwks).hexdigest()[:32]}"'
+
+
+@api.get("/.well-known/jwks.json")
+async def jwks(if_none_match: str | None = Header(default=None)) -> Response:
+    headers = {
+        "Cache-Control": "public, max-age="
+        f"{Settings.security_settings.jwks_max_age_seconds}",
+        "ETag": _jwks_etag,
+    }
+    if if_none_match == _jwks_etag:
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+    return Response(_jwks, media_type="application/json", headers=headers)
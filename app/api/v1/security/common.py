@@ -1,60 +1,200 @@
 from __future__ import annotations
 
-from typing import Annotated, Iterator
+import hashlib
+from typing import Annotated, Any, AsyncIterator, Iterator
 
-import jwt
-from fastapi import Depends, HTTPException
+from fastapi import Cookie, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jwt import InvalidTokenError
+from jwt import ExpiredSignatureError, InvalidTokenError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from starlette import status
 
 from app.api.v1.data_model import User as UserDto
-from src.db import new_db_session
-from src.multitenancy.user import get
+from src.caching import local_cache, tiered_cache
+from src.data_model import DeletableMixin, Tenant, User
+from src.db import new_async_db_session, new_db_session, on_deleted
+from src.multitenancy.registry import TenantRecord, tenant_registry
+from src.multitenancy.user import get_async
+from src.security.keys import key_ring
 from src.settings import Settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/authentication/token")
 
+Claims = dict[str, Any]
 
-def user_from_id(user_id: int) -> UserDto | None:
-    with new_db_session(Settings.database.shared_schema) as session:
-        if user := get(session, user_id):
+# The ``typ`` claim of each kind of token, so that neither passes for the
+# other.
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+
+def _claims_expiry(_: bytes, claims: Claims, __: float) -> float:
+    return float(claims["exp"])
+
+
+# Keyed by token digest, so that raw bearer tokens are not kept around.
+_claims_cache = local_cache(
+    "verified_tokens",
+    maxsize=Settings.cache.token_cache_size,
+    expires_at=_claims_expiry,
+)
+
+
+def verify_token(token: str) -> Claims:
+    """Verify `token` and return its claims.
+
+    A token is only decoded and its signature checked the first time it is
+    seen; after that its claims are served from a cache until the token
+    expires. Raises `jwt.InvalidTokenError` like `jwt.decode` does.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    if (claims := _claims_cache.get(digest)) is None:
+        claims = key_ring.verify(token, options={"require": ["exp", "sub"]})
+        _claims_cache.set(digest, claims)
+    return claims
+
+
+def _credentials_exception(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def access_token_claims(
+    token: Annotated[str, Depends(oauth2_scheme)]
+) -> Claims:
+    try:
+        claims = verify_token(token)
+    except ExpiredSignatureError:
+        raise _credentials_exception("Token expired")
+    except InvalidTokenError:
+        raise _credentials_exception("Could not validate credentials")
+    if claims.get("typ") != ACCESS_TOKEN:
+        raise _credentials_exception("Could not validate credentials")
+    return claims
+
+
+async def refresh_token_claims(refresh_token: str = Cookie(None)) -> Claims:
+    if not refresh_token:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Missing refresh token.",
+        )
+    try:
+        claims = verify_token(refresh_token)
+    except ExpiredSignatureError:
+        raise _credentials_exception("Refresh token expired")
+    except InvalidTokenError:
+        raise _credentials_exception("Invalid token")
+    if claims.get("typ") != REFRESH_TOKEN:
+        raise _credentials_exception("Invalid token")
+    return claims
+
+
+_user_cache = tiered_cache(
+    "authenticated_users",
+    maxsize=Settings.cache.user_cache_size,
+    ttl=Settings.cache.user_cache_ttl_seconds,
+    dump=UserDto.model_dump_json,
+    load=UserDto.model_validate_json,
+)
+
+
+@on_deleted
+def _invalidate_cached_users(deletable: DeletableMixin) -> None:
+    if isinstance(deletable, User):
+        _user_cache.invalidate(deletable.id)
+    elif isinstance(deletable, Tenant):
+        _user_cache.invalidate_tag(deletable.schema)
+
+
+async def _load_user(user_id: int) -> UserDto | None:
+    async with new_async_db_session(
+        Settings.database.shared_schema, read_only=True
+    ) as session:
+        if user := await get_async(session, user_id):
             return UserDto(
                 username=user.name,
                 user_id=user.id,
                 email=user.email,
                 full_name=user.name,
+                tenant_id=user.tenant_id,
                 tenant_schema=user.tenant.schema,
             )
         return None
 
 
+async def user_from_id(user_id: int) -> UserDto | None:
+    if user := await _user_cache.get(user_id):
+        return user
+    if user := await _load_user(user_id):
+        await _user_cache.set(user_id, user, tags=[user.tenant_schema])
+    return user
+
+
 async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)]
+    claims: Annotated[Claims, Depends(access_token_claims)]
 ) -> UserDto:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
     try:
-        payload = jwt.decode(
-            token,
-            Settings.security_settings.secret_key,
-            algorithms=[Settings.security_settings.algorithm],
+        user_id = int(claims["sub"])
+    except ValueError:
+        user_id = 0
+    if user_id and (user := await user_from_id(user_id)):
+        return user
+    raise _credentials_exception("Could not validate credentials")
+
+
+async def get_current_tenant(
+    current_user: Annotated[UserDto, Depends(get_current_user)],
+) -> TenantRecord:
+    """The tenant of the current user, as known to the tenant registry."""
+    if tenant := await tenant_registry.resolve(current_user.tenant_id):
+        return tenant
+    raise _credentials_exception("Could not validate credentials")
+
+
+async def get_admin_tenant(
+    tenant: Annotated[TenantRecord, Depends(get_current_tenant)],
+) -> TenantRecord:
+    """The current tenant, if it is the default one.
+
+    Users of the default tenant administer all the others.
+    """
+    if not tenant.default_tenant:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed.",
         )
-        user_id = int(payload.get("sub"))
-        if user_id and (user := user_from_id(user_id)):
-            return user
-        raise credentials_exception
-    except InvalidTokenError:
-        raise credentials_exception
+    return tenant
 
 
 def get_authenticated_session(
-    current_user: Annotated[UserDto, Depends(get_current_user)],
+    tenant: Annotated[TenantRecord, Depends(get_current_tenant)],
 ) -> Iterator[Session]:
-    with new_db_session(current_user.tenant_schema) as s:
+    with new_db_session(tenant.schema) as s:
+        yield s
+
+
+async def get_authenticated_async_session(
+    tenant: Annotated[TenantRecord, Depends(get_current_tenant)],
+) -> AsyncIterator[AsyncSession]:
+    async with new_async_db_session(tenant.schema) as s:
+        yield s
+
+
+def get_authenticated_read_session(
+    tenant: Annotated[TenantRecord, Depends(get_current_tenant)],
+) -> Iterator[Session]:
+    """For endpoints that only read; may be served by a replica."""
+    with new_db_session(tenant.schema, read_only=True) as s:
+        yield s
+
+
+async def get_authenticated_async_read_session(
+    tenant: Annotated[TenantRecord, Depends(get_current_tenant)],
+) -> AsyncIterator[AsyncSession]:
+    async with new_async_db_session(tenant.schema, read_only=True) as s:
         yield s
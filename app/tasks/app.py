@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from typing import Any
+
+from celery import Celery
+from celery.signals import setup_logging
+
+from src.logging.main import init_logging
+from src.settings import Settings
+
+celery_app = Celery(
+    "app",
+    broker=Settings.redis_dsn.unicode_string(),
+    include=["app.tasks.tenants", "app.tasks.calendars"],
+)
+celery_app.conf.update(
+    task_always_eager=Settings.tasks.always_eager,
+    task_eager_propagates=True,
+    task_acks_late=True,
+    task_ignore_result=True,
+    worker_prefetch_multiplier=1,
+    timezone=Settings.time_settings.server_timezone,
+    beat_schedule={
+        "sync-calendars": {
+            "task": "tenants.fan_out",
+            "args": ("app.tasks.calendars.sync_calendars",),
+            "schedule": Settings.caldav.sync_interval_seconds,
+        },
+    },
+)
+
+
+@setup_logging.connect
+def _setup_logging(**_: Any) -> None:
+    init_logging("config/logging_worker.yml")
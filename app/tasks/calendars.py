@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from sqlalchemy.orm import Session
+
+from app.tasks.tenants import tenant_job
+from src import calendar_sync
+
+
+@tenant_job
+def sync_calendars(session: Session) -> None:
+    """Sync the CalDAV calendars of one tenant; run via `fan_out`."""
+    calendar_sync.sync_calendars(session)
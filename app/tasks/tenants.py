@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import logging
+from itertools import islice
+from typing import Any, Callable, TypeVar
+
+from celery import chain, group
+from celery.result import AsyncResult
+
+from app.tasks.app import celery_app
+from src.db import new_db_session
+from src.multitenancy import provisioning, tenant
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+TenantJob = Callable[..., None]
+Job = TypeVar("Job", bound=TenantJob)
+
+_jobs: dict[str, TenantJob] = {}
+
+
+def tenant_job(func: Job) -> Job:
+    """Register `func` so that `for_each_tenant` can run it per tenant.
+
+    The job is called as ``func(session, **kwargs)`` with a session bound
+    to the schema of the tenant at hand, committed when the job returns.
+    """
+    _jobs[f"{func.__module__}.{func.__qualname__}"] = func
+    return func
+
+
+def _job_name(job: TenantJob) -> str:
+    name = f"{job.__module__}.{job.__qualname__}"
+    if name not in _jobs:
+        raise ValueError(f"{name} is not registered with @tenant_job.")
+    return name
+
+
+@celery_app.task(name="tenants.run_chunk")
+def run_tenant_chunk(
+    job: str,
+    schemas: list[str],
+    kwargs: dict[str, Any],
+) -> list[str]:
+    """Run `job` for each schema in turn; returns the schemas that failed.
+
+    One failing tenant is logged and skipped rather than failing the rest
+    of the chunk.
+    """
+    func = _jobs[job]
+    failed = []
+    for schema in schemas:
+        try:
+            with new_db_session(schema) as session:
+                func(session, **kwargs)
+        except Exception:
+            logger.exception(f"{job} failed for tenant schema {schema}.")
+            failed.append(schema)
+    return failed
+
+
+def _active_schemas() -> list[str]:
+    with new_db_session(
+        Settings.database.shared_schema, read_only=True
+    ) as session:
+        return [t.schema for t in tenant.get(session)]
+
+
+def for_each_tenant(
+    job: TenantJob,
+    chunk_size: int | None = None,
+    concurrency: int | None = None,
+    **kwargs: Any,
+) -> AsyncResult | None:
+    """Fan `job` out over all active tenants.
+
+    Tenants are split into chunks of ``chunk_size`` schemas, one task per
+    chunk. The chunks are dealt round-robin onto ``concurrency`` chains, so
+    at most that many chunks of this fan-out run at the same time, however
+    many workers are available.
+    """
+    name = _job_name(job)
+    chunk_size = chunk_size or Settings.tasks.tenant_chunk_size
+    concurrency = concurrency or Settings.tasks.tenant_concurrency
+
+    schemas = _active_schemas()
+    remaining = iter(schemas)
+    chunks = list(iter(lambda: list(islice(remaining, chunk_size)), []))
+    lanes = [chunks[i::concurrency] for i in range(concurrency)]
+    logger.info(
+        f"Running {name} for {len(schemas)} tenants "
+        f"in {len(chunks)} chunks over {min(concurrency, len(chunks))} lanes."
+    )
+    if not chunks:
+        return None
+    return group(
+        chain(run_tenant_chunk.si(name, chunk, kwargs) for chunk in lane)
+        for lane in lanes
+        if lane
+    ).apply_async()
+
+
+@celery_app.task(name="tenants.fan_out")
+def fan_out(job: str, **kwargs: Any) -> None:
+    """Task entry point of `for_each_tenant`, e.g. for beat schedules."""
+    for_each_tenant(_jobs[job], **kwargs)
+
+
+@celery_app.task(name="tenants.provision")
+def provision(
+    name: str, schema: str | None = None, active: bool = True
+) -> int:
+    """Background counterpart of `provisioning.provision_tenant`."""
+    return provisioning.provision_tenant(name, schema, active)
@@ -1,3 +1,9 @@
+from __future__ import annotations
+
+import time
+from argparse import Namespace
+from typing import Any, Callable
+
 import click
 
 
@@ -21,11 +27,22 @@ def myapp() -> None:
     type=bool,
     default=True,
 )
+@click.option(
+    "-s",
+    "--schema",
+    help="Schema of the tenant, derived from its name if omitted",
+    type=str,
+)
 def add_tenant(
     tenant_name: str,
     active: bool,
+    schema: str | None,
 ) -> None:
-    click.echo(f"{tenant_name=}-{active=}")
+    """Add a tenant with a schema cloned from the tenant template."""
+    from src.multitenancy import provisioning
+
+    tenant_id = provisioning.provision_tenant(tenant_name, schema, active)
+    click.echo(f"Added tenant {tenant_name!r} with id {tenant_id}")
 
 
 @myapp.command()
@@ -55,4 +72,198 @@ def add_user(
     password: str,
     tenant: str,
 ) -> None:
-    click.echo(f"{user_name=}-{password=}-{tenant=}")
\ No newline at end of file
+    click.echo(f"{user_name=}-{password=}-{tenant=}")
+
+
+@myapp.command()
+@click.option(
+    "-w",
+    "--workers",
+    help="Number of tenant schemas migrated concurrently",
+    type=int,
+    default=4,
+)
+@click.option(
+    "-r",
+    "--revision",
+    help="Revision to upgrade to",
+    type=str,
+    default="head",
+)
+@click.option(
+    "-t",
+    "--tenant",
+    "tenants",
+    help="Schema of a tenant to print the SQL of (with --dry-run)",
+    type=str,
+    multiple=True,
+)
+@click.option(
+    "--dry-run",
+    help="Print the SQL instead of running it (requires --tenant)",
+    is_flag=True,
+)
+def migrate_tenants(
+    workers: int,
+    revision: str,
+    tenants: tuple[str, ...],
+    dry_run: bool,
+) -> None:
+    """Upgrade the database, tenant schemas in parallel.
+
+    Tenant steps already applied to a schema are skipped, so rerunning
+    after a failure resumes with the schemas that are left. All tenants
+    are upgraded together, as they share the revision of the database.
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    if tenants and not dry_run:
+        raise click.UsageError("--tenant only applies with --dry-run.")
+    x = [f"tenant_workers={workers}"]
+    if tenants:
+        x.append(f"tenants={','.join(tenants)}")
+    config = Config("alembic.ini", cmd_opts=Namespace(x=x))
+
+    start = time.perf_counter()
+    command.upgrade(config, revision, sql=dry_run)
+    if not dry_run:
+        click.echo(
+            f"Migrated to {revision} in {time.perf_counter() - start:.1f}s"
+        )
+
+
+def _input_format(path: str, fmt: str | None) -> str:
+    if fmt is not None:
+        return fmt
+    return "csv" if path.endswith(".csv") else "ndjson"
+
+
+def _report(kind: str, report: Any) -> None:
+    click.echo(
+        f"Imported {report.inserted} {kind} ({report.skipped} skipped) from "
+        f"{report.read} rows in {report.seconds:.1f}s, "
+        f"{report.rows_per_second:.0f} rows/s"
+    )
+
+
+_input_options = [
+    click.argument("source", type=click.Path(allow_dash=True)),
+    click.option(
+        "-f",
+        "--format",
+        "fmt",
+        help="Input format, guessed from the file extension if omitted",
+        type=click.Choice(["csv", "ndjson"]),
+    ),
+    click.option(
+        "-b",
+        "--batch-size",
+        help="Rows copied to the database at a time",
+        type=int,
+        default=5000,
+    ),
+]
+
+
+def _with_input_options(func: Callable) -> Callable:
+    for option in reversed(_input_options):
+        func = option(func)
+    return func
+
+
+@myapp.command()
+@_with_input_options
+@click.option(
+    "-w",
+    "--workers",
+    help="Password hashing processes, one per CPU if omitted",
+    type=int,
+)
+def import_users(
+    source: str,
+    fmt: str | None,
+    batch_size: int,
+    workers: int | None,
+) -> None:
+    """Import users from a CSV or NDJSON file (- for stdin).
+
+    Columns: tenant, name, password, email and optionally active.
+    """
+    from src.multitenancy import bulk_import
+
+    with click.open_file(source) as stream:
+        report = bulk_import.import_users(
+            bulk_import.read_records(stream, _input_format(source, fmt)),
+            batch_size=batch_size,
+            workers=workers,
+        )
+    _report("users", report)
+
+
+@myapp.command()
+@_with_input_options
+def import_tenants(source: str, fmt: str | None, batch_size: int) -> None:
+    """Import tenants from a CSV or NDJSON file (- for stdin).
+
+    Columns: name, schema and optionally active and default_tenant.
+    """
+    from src.multitenancy import bulk_import
+
+    with click.open_file(source) as stream:
+        report = bulk_import.import_tenants(
+            bulk_import.read_records(stream, _input_format(source, fmt)),
+            batch_size=batch_size,
+        )
+    _report("tenants", report)
+
+
+# Settings of the cost parameters `calibrate-hashing` recommends.
+_COST_SETTINGS = {
+    "rounds": "AUTH_BCRYPT_ROUNDS",
+    "time_cost": "AUTH_ARGON2_TIME_COST",
+    "memory_cost": "AUTH_ARGON2_MEMORY_COST_KIB",
+    "parallelism": "AUTH_ARGON2_PARALLELISM",
+}
+
+
+@myapp.command()
+@click.option(
+    "-t",
+    "--target-ms",
+    help="Time a password verification should take",
+    type=float,
+    default=250,
+)
+@click.option(
+    "-s",
+    "--scheme",
+    help="Scheme to calibrate, the first of AUTH_HASH_SCHEMES if omitted",
+    type=click.Choice(["bcrypt", "argon2"]),
+)
+def calibrate_hashing(target_ms: float, scheme: str | None) -> None:
+    """Recommend password hashing costs for this host.
+
+    Raises the cost of the scheme until verifying a password would take
+    longer than the target; argon2 keeps its configured memory cost and
+    parallelism.
+    """
+    from src.security.password import calibrate
+    from src.settings import Settings
+
+    security = Settings.security_settings
+    scheme = scheme or security.hash_schemes[0]
+    options = {}
+    if scheme == "argon2":
+        options = {
+            "memory_cost": security.argon2_memory_cost,
+            "parallelism": security.argon2_parallelism,
+        }
+    calibration = calibrate(scheme, target_ms / 1000, **options)
+    click.echo(
+        f"{scheme} verifies in {calibration.seconds * 1000:.0f} ms with:"
+    )
+    for key, value in calibration.options.items():
+        click.echo(f"{_COST_SETTINGS[key]}={value}")
+    if calibration.seconds > target_ms / 1000:
+        click.echo("That is over the target even at the lowest cost.")
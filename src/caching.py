@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from functools import partial
+from typing import Any, Callable, Generic, Hashable, Iterable, TypeVar
+
+from cachetools import Cache, TLRUCache, TTLCache
+from redis.exceptions import RedisError
+
+from src.metrics import gauge
+from src.redis_client import get_async_redis, get_redis
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# While Redis is down, each cache warns about it at most this often.
+_OUTAGE_WARNING_SECONDS = 60.0
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class CacheStats:
+    __slots__ = ("hits", "misses", "evictions")
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class _EvictionCounter(Cache):
+    _stats: CacheStats
+
+    def expire(self, time: Any = None) -> Any:
+        expired = super().expire(time)
+        self._stats.evictions += len(expired)
+        return expired
+
+    def popitem(self) -> Any:
+        item = super().popitem()
+        self._stats.evictions += 1
+        return item
+
+    def clear(self) -> None:
+        # Clearing goes through `popitem`, but it is not an eviction.
+        evictions = self._stats.evictions
+        super().clear()
+        self._stats.evictions = evictions
+
+
+class _CountingTTLCache(_EvictionCounter, TTLCache):
+    pass
+
+
+class _CountingTLRUCache(_EvictionCounter, TLRUCache):
+    pass
+
+
+ExpiresAt = Callable[[Any, Any, float], float]
+
+
+class LocalCache(Generic[K, V]):
+    """A thread-safe TTL + LRU cache that counts hits, misses and evictions.
+
+    Entries leave the cache when their TTL runs out, when the cache is full
+    and they are the least recently used, or when explicitly invalidated.
+    Instead of a fixed ``ttl``, ``expires_at(key, value, now)`` may give each
+    entry its own expiry time (measured by `time.time`).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        ttl: float = 0,
+        expires_at: ExpiresAt | None = None,
+    ) -> None:
+        self.name = name
+        self.stats = CacheStats()
+        self._cache: _CountingTTLCache | _CountingTLRUCache
+        if expires_at is None:
+            self._cache = _CountingTTLCache(maxsize=maxsize, ttl=ttl)
+        else:
+            self._cache = _CountingTLRUCache(
+                maxsize=maxsize, ttu=expires_at, timer=time.time
+            )
+        self._cache._stats = self.stats
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            value = self._cache.get(key)
+            if value is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        with self._lock:
+            self._cache[key] = value
+
+    def invalidate(self, key: K) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[K, V], bool]) -> None:
+        with self._lock:
+            for key in [k for k, v in self._cache.items() if predicate(k, v)]:
+                self._cache.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+class TieredCache(Generic[K, V]):
+    """A `LocalCache` in front of a Redis tier shared by all workers.
+
+    Lookups hit the in-process tier first and fall back to Redis; values
+    found there are promoted into the local tier. Invalidations delete the
+    Redis entries and are broadcast over pub/sub so every worker drops its
+    local copy too (see `listen_for_invalidations`).
+
+    Entries may carry tags, e.g. the schema of a user's tenant, so that a
+    whole group can be invalidated without knowing its keys. Redis being
+    unavailable degrades the cache to its local tier rather than failing
+    the request, with a warning at most every ``_OUTAGE_WARNING_SECONDS``.
+    """
+
+    def __init__(
+        self,
+        local: LocalCache[K, V],
+        ttl: int,
+        dump: Callable[[V], str | bytes],
+        load: Callable[[bytes], V],
+    ) -> None:
+        self.name = local.name
+        self.local = local
+        self.remote_stats = CacheStats()
+        self._warned_at = -_OUTAGE_WARNING_SECONDS
+        self._suppressed = 0
+        self._ttl = ttl
+        self._dump = dump
+        self._load = load
+
+    def _key(self, key: K) -> str:
+        return f"cache:{self.name}:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"cache:{self.name}:tag:{tag}"
+
+    def _warn(self, message: str) -> None:
+        # Every request would run into an outage, and log it.
+        now = time.monotonic()
+        if now - self._warned_at < _OUTAGE_WARNING_SECONDS:
+            self._suppressed += 1
+            return
+        if self._suppressed:
+            message += f" ({self._suppressed} more since the last warning)"
+        self._warned_at, self._suppressed = now, 0
+        logger.warning(message)
+
+    async def get(self, key: K) -> V | None:
+        if (value := self.local.get(key)) is not None:
+            return value
+        try:
+            raw = await get_async_redis().get(self._key(key))
+        except RedisError:
+            self._warn(f"Redis unavailable, skipping {self.name} tier.")
+            return None
+        if raw is None:
+            self.remote_stats.misses += 1
+            return None
+        try:
+            value = self._load(raw)
+        except ValueError:
+            # Written by a release with a different shape of the value.
+            self.remote_stats.misses += 1
+            return None
+        self.remote_stats.hits += 1
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key: K, value: V, tags: Iterable[str] = ()) -> None:
+        self.local.set(key, value)
+        try:
+            async with get_async_redis().pipeline(transaction=False) as pipe:
+                pipe.set(self._key(key), self._dump(value), ex=self._ttl)
+                for tag in tags:
+                    pipe.sadd(self._tag_key(tag), json.dumps(key))
+                    pipe.expire(self._tag_key(tag), self._ttl)
+                await pipe.execute()
+        except RedisError:
+            self._warn(f"Redis unavailable, skipping {self.name} tier.")
+
+    def invalidate(self, key: K) -> None:
+        self._invalidate_keys([key])
+
+    def invalidate_tag(self, tag: str) -> None:
+        keys: list[K] = []
+        try:
+            members = get_redis().smembers(self._tag_key(tag))
+            keys = [json.loads(member) for member in members]  # type: ignore
+        except RedisError:
+            self._warn(f"Redis unavailable, clearing {self.name} tier.")
+            self.local.clear()
+        self._invalidate_keys(keys, tag=tag)
+
+    def _invalidate_keys(self, keys: list[K], tag: str | None = None) -> None:
+        for key in keys:
+            self.local.invalidate(key)
+        try:
+            with get_redis().pipeline(transaction=False) as pipe:
+                if keys:
+                    pipe.delete(*(self._key(key) for key in keys))
+                if tag is not None:
+                    pipe.delete(self._tag_key(tag))
+                pipe.publish(
+                    INVALIDATION_CHANNEL,
+                    json.dumps({"cache": self.name, "keys": keys}),
+                )
+                pipe.execute()
+        except RedisError:
+            self._warn(
+                f"Redis unavailable, {self.name} invalidation not broadcast."
+            )
+
+
+INVALIDATION_CHANNEL = "cache-invalidation"
+
+_caches: dict[str, LocalCache] = {}
+_tiered_caches: dict[str, TieredCache] = {}
+
+
+def local_cache(
+    name: str,
+    maxsize: int,
+    ttl: float = 0,
+    expires_at: ExpiresAt | None = None,
+) -> LocalCache:
+    """Create a cache and register it so its counters can be exported."""
+    cache: LocalCache = LocalCache(
+        name, maxsize=maxsize, ttl=ttl, expires_at=expires_at
+    )
+    _caches[name] = cache
+    _export(cache.stats, cache=name, tier="local")
+    gauge("cache_size", "Entries held by a cache.", cache.__len__, cache=name)
+    return cache
+
+
+def _export(stats: CacheStats, **labels: str) -> None:
+    for counter in ("hits", "misses", "evictions"):
+        gauge(
+            f"cache_{counter}_total",
+            f"Cache {counter} since start-up.",
+            partial(getattr, stats, counter),
+            kind="counter",
+            **labels,
+        )
+
+
+def tiered_cache(
+    name: str,
+    maxsize: int,
+    ttl: float,
+    dump: Callable[[V], str | bytes],
+    load: Callable[[bytes], V],
+) -> TieredCache[Any, V]:
+    """Create a two-tier cache and register it for invalidation messages."""
+    cache: TieredCache[Any, V] = TieredCache(
+        local_cache(name, maxsize=maxsize, ttl=ttl),
+        ttl=Settings.cache.redis_cache_ttl_seconds,
+        dump=dump,
+        load=load,
+    )
+    _tiered_caches[name] = cache
+    _export(cache.remote_stats, cache=name, tier="redis")
+    return cache
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    stats = {
+        name: {**cache.stats.as_dict(), "size": len(cache)}
+        for name, cache in _caches.items()
+    }
+    for name, tiered in _tiered_caches.items():
+        stats[f"{name}.redis"] = tiered.remote_stats.as_dict()
+    return stats
+
+
+def _apply_invalidation(data: bytes) -> None:
+    message = json.loads(data)
+    if cache := _tiered_caches.get(message["cache"]):
+        for key in message["keys"]:
+            cache.local.invalidate(key)
+
+
+async def listen_for_invalidations() -> None:
+    """Drop local entries invalidated by any worker, until cancelled."""
+    while True:
+        try:
+            async with get_async_redis().pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                while True:
+                    # Waiting with a timeout of its own, as the socket
+                    # timeout of the client would end a quiet spell.
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=30
+                    )
+                    if message is not None:
+                        _apply_invalidation(message["data"])
+        except RedisError:
+            logger.warning("Lost cache invalidation channel, reconnecting.")
+            # Anything may have changed while we were not listening.
+            for cache in _tiered_caches.values():
+                cache.local.clear()
+            await asyncio.sleep(1)
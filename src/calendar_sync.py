@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import islice
+from typing import Any, Iterable, Iterator, NamedTuple
+
+import caldav
+from caldav.calendarobjectresource import CalendarObjectResource
+from caldav.davobject import DAVObject
+from caldav.elements import dav
+from caldav.elements.base import ValuedBaseElement
+from caldav.lib import error
+from caldav.lib.url import URL
+from icalendar import Calendar as ICalendar
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from src.data_model import Calendar, CalendarEvent
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+_UPSERTED = ("etag", "uid", "summary", "start", "end", "recurring")
+
+
+class GetCTag(ValuedBaseElement):
+    """The collection tag of CalendarServer, changed by any edit."""
+
+    tag = "{http://calendarserver.org/ns/}getctag"
+
+
+class SyncReport(NamedTuple):
+    url: str
+    updated: int
+    deleted: int
+    # Whether the whole calendar had to be listed rather than its changes.
+    full: bool
+
+
+class _Changes(NamedTuple):
+    sync_token: str | None
+    etags: dict[str, str]  # href -> etag of new or changed resources
+    deleted: set[str]
+    full: bool
+
+
+def dav_client(url: str) -> caldav.DAVClient:
+    """A client for the calendar at `url`, as the configured account."""
+    return caldav.DAVClient(
+        url=Settings.caldav.url or url,
+        username=Settings.caldav.username,
+        password=Settings.caldav.password,
+    )
+
+
+def add_calendar(
+    session: Session, url: str, name: str | None = None
+) -> Calendar:
+    """Start mirroring the calendar at `url`; synced by the next run."""
+    calendar = Calendar(url=url, name=name)
+    session.add(calendar)
+    session.flush()
+    return calendar
+
+
+def sync_calendars(
+    session: Session, client: caldav.DAVClient | None = None
+) -> list[SyncReport]:
+    """Sync every calendar of the tenant `session` is bound to.
+
+    Each calendar is committed on its own; one that cannot be synced is
+    logged and rolled back, and retried from its last state next time.
+    """
+    reports = []
+    for calendar in session.scalars(select(Calendar)).all():
+        remote_client = client or dav_client(calendar.url)
+        try:
+            reports.append(
+                sync_calendar(
+                    session, remote_client.calendar(url=calendar.url), calendar
+                )
+            )
+            session.commit()
+        except (error.DAVError, OSError, ValueError):
+            session.rollback()
+            logger.exception(f"Syncing calendar {calendar.url} failed.")
+    return reports
+
+
+def sync_calendar(
+    session: Session, remote: caldav.Calendar, calendar: Calendar
+) -> SyncReport:
+    """Bring the events of `calendar` in line with `remote`.
+
+    Nothing is fetched if the collection tag is unchanged. Otherwise only
+    the resources whose etag differs from the stored one are downloaded,
+    in batches, and upserted as they are parsed.
+    """
+    ctag = _ctag(remote)
+    if ctag is not None and ctag == calendar.ctag:
+        return SyncReport(calendar.url, 0, 0, False)
+
+    changes = _changes(session, remote, calendar)
+    updated = 0
+    rows = []
+    for href, data in _fetch(remote, list(changes.etags)):
+        if (row := _event_row(data)) is None:
+            continue
+        rows.append(
+            {
+                **row,
+                "calendar_id": calendar.id,
+                "href": href,
+                "etag": changes.etags.get(href, ""),
+            }
+        )
+        if len(rows) >= Settings.caldav.batch_size:
+            updated += _upsert(session, rows)
+            rows = []
+    if rows:
+        updated += _upsert(session, rows)
+    if changes.deleted:
+        session.execute(
+            delete(CalendarEvent).where(
+                CalendarEvent.calendar_id == calendar.id,
+                CalendarEvent.href.in_(changes.deleted),
+            )
+        )
+
+    calendar.ctag = ctag
+    calendar.sync_token = changes.sync_token
+    calendar.synced_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    logger.info(
+        f"Synced calendar {calendar.url}: {updated} updated, "
+        f"{len(changes.deleted)} deleted."
+    )
+    return SyncReport(
+        calendar.url, updated, len(changes.deleted), changes.full
+    )
+
+
+def _ctag(remote: caldav.Calendar) -> str | None:
+    try:
+        props = remote.get_properties([GetCTag()])
+    except error.DAVError:
+        return None
+    ctag = props.get(GetCTag.tag)
+    return str(ctag) if ctag else None
+
+
+def _changes(
+    session: Session, remote: caldav.Calendar, calendar: Calendar
+) -> _Changes:
+    token = calendar.sync_token
+    for attempt in [token, None] if token else [None]:
+        try:
+            collection = remote.objects_by_sync_token(
+                attempt, load_objects=False
+            )
+        except error.DAVError:
+            # Expired tokens are refused; so are sync reports altogether
+            # by servers without RFC 6578.
+            continue
+        etags, deleted = {}, set()
+        for resource in collection:
+            href = _url(resource).path
+            if etag := resource.props.get(dav.GetEtag.tag):
+                etags[href] = etag
+            else:
+                deleted.add(href)
+        full = attempt is None
+        if full:
+            deleted = _stored_etags(session, calendar).keys() - etags.keys()
+        return _Changes(
+            collection.sync_token,
+            _unseen(session, calendar, etags),
+            deleted,
+            full,
+        )
+
+    etags = _listed_etags(remote)
+    stored = _stored_etags(session, calendar)
+    return _Changes(
+        None,
+        {h: e for h, e in etags.items() if stored.get(h) != e},
+        stored.keys() - etags.keys(),
+        True,
+    )
+
+
+def _listed_etags(remote: caldav.Calendar) -> dict[str, str]:
+    base = _url(remote)
+    response = remote._query_properties([dav.GetEtag()], depth=1)
+    props = response.expand_simple_props([dav.GetEtag()])
+    return {
+        path: etag
+        for href, prop in props.items()
+        if (path := base.join(href).path) != base.path
+        and (etag := prop.get(dav.GetEtag.tag))
+    }
+
+
+def _url(resource: DAVObject) -> URL:
+    if resource.url is None:
+        raise ValueError(f"{resource} has no URL.")
+    return resource.url
+
+
+def _stored_etags(session: Session, calendar: Calendar) -> dict[str, str]:
+    rows = session.execute(
+        select(CalendarEvent.href, CalendarEvent.etag).where(
+            CalendarEvent.calendar_id == calendar.id
+        )
+    )
+    return {href: etag for href, etag in rows.tuples()}
+
+
+def _unseen(
+    session: Session, calendar: Calendar, etags: dict[str, str]
+) -> dict[str, str]:
+    # Sync reports also list our own earlier state after a token reset.
+    known = set(
+        session.execute(
+            select(CalendarEvent.href, CalendarEvent.etag).where(
+                CalendarEvent.calendar_id == calendar.id,
+                CalendarEvent.href.in_(etags),
+            )
+        ).tuples()
+    )
+    return {h: e for h, e in etags.items() if (h, e) not in known}
+
+
+def _batched(items: Iterable[str], size: int) -> Iterator[list[str]]:
+    remaining = iter(items)
+    return iter(lambda: list(islice(remaining, size)), [])
+
+
+def _fetch(
+    remote: caldav.Calendar, hrefs: list[str]
+) -> Iterator[tuple[str, str]]:
+    # A single calendar-multiget report per batch rather than a GET each.
+    base = _url(remote)
+    for batch in _batched(hrefs, Settings.caldav.batch_size):
+        resources: Iterable[CalendarObjectResource] = remote.multiget(
+            base.join(h) for h in batch
+        )
+        for resource in resources:
+            yield _url(resource).path, str(resource.data)
+
+
+def _event_row(data: str) -> dict[str, Any] | None:
+    """The columns of the event in iCalendar `data`, if it holds one.
+
+    Recurring events are stored with the span of their first occurrence,
+    overridden occurrences (with a ``RECURRENCE-ID``) are skipped, as are
+    events without a ``DTSTART``, which iTIP messages may send.
+    """
+    for component in ICalendar.from_ical(data).walk("VEVENT"):
+        if "RECURRENCE-ID" in component or "DTSTART" not in component:
+            continue
+        dtstart = component.decoded("DTSTART")
+        start = _naive_utc(dtstart)
+        if "DTEND" in component:
+            end = _naive_utc(component.decoded("DTEND"))
+        elif "DURATION" in component:
+            end = start + component.decoded("DURATION")
+        elif isinstance(dtstart, datetime):
+            end = start
+        else:
+            end = start + timedelta(days=1)
+        summary = component.get("SUMMARY")
+        return {
+            "uid": str(component.get("UID", "")),
+            "summary": str(summary) if summary is not None else None,
+            "start": start,
+            "end": end,
+            "recurring": "RRULE" in component,
+        }
+    return None
+
+
+def _naive_utc(value: date) -> datetime:
+    # Timestamps are stored without zone, in UTC; all-day events start at
+    # midnight and floating times are taken as they are.
+    if not isinstance(value, datetime):
+        return datetime.combine(value, time())
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _upsert(session: Session, rows: list[dict[str, Any]]) -> int:
+    statement = insert(CalendarEvent).values(rows)
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["calendar_id", "href"],
+            set_={name: statement.excluded[name] for name in _UPSERTED},
+        )
+    )
+    return len(rows)
@@ -1,9 +1,21 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, List, Optional, Sequence
-
-from sqlalchemy import ForeignKey, Identity, MetaData, func, text
+from typing import Any, List, Optional
+
+from sqlalchemy import (
+    TIMESTAMP,
+    FetchedValue,
+    ForeignKey,
+    Identity,
+    Index,
+    MetaData,
+    UniqueConstraint,
+    cast,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSRANGE
 from sqlalchemy.orm import (
     DeclarativeBase,
     Mapped,
@@ -38,9 +50,37 @@ class CommonMixin:
 
 
 class HasTimespanMixin:
+    """A half-open span of time, ``[start, end)``."""
+
     start: Mapped[datetime]
     end: Mapped[datetime]
 
+    @classmethod
+    def span(cls) -> Any:
+        # Matches the expression of `timespan_index`, which is what lets
+        # Postgres use that index; tsrange defaults to '[)' bounds.
+        return func.tsrange(cls.start, cls.end, type_=TSRANGE)
+
+    @classmethod
+    def filter_overlapping(cls, start: datetime, end: datetime) -> Any:
+        return cls.span().op("&&")(func.tsrange(start, end, type_=TSRANGE))
+
+    @classmethod
+    def filter_at(cls, when: datetime) -> Any:
+        return cls.span().op("@>")(cast(when, TIMESTAMP))
+
+
+def timespan_index(table: str) -> Index:
+    """GiST index for the overlap filters of a `HasTimespanMixin` table.
+
+    Tenant migrations create it with `tenant.create_timespan_index`.
+    """
+    return Index(
+        f"ix_{table}_span",
+        text('tsrange(start, "end")'),
+        postgresql_using="gist",
+    )
+
 
 class DeletableMixin:
     deleted_at: Mapped[Optional[datetime]]
@@ -64,16 +104,33 @@ class Tenant(CommonMixin, DeletableMixin, Base):
     active: Mapped[bool] = mapped_column(
         server_default=text("false"), default=False
     )
+    # Set by a trigger on every update, for the tenant registry.
+    updated_at: Mapped[datetime] = mapped_column(
+        server_default=func.timezone("UTC", func.now()),
+        server_onupdate=FetchedValue(),
+        index=True,
+    )
 
     users_raw: Mapped[List[User]] = relationship(
         back_populates="tenant", lazy="dynamic"
     )
+    # Loaded once per instance (or eagerly with `selectinload`), unlike
+    # `users_raw` which queries on every access.
+    users: Mapped[List[User]] = relationship(
+        primaryjoin="and_(Tenant.id == User.tenant_id, "
+        "User.deleted_at.is_(None))",
+        viewonly=True,
+    )
 
-    @property
-    def users(self) -> Sequence[User]:
-        return list(self.users_raw.filter(User.filter_deleted_out()).all())  # type: ignore  # noqa: E501
-
-    __table_args__ = ({"schema": Settings.database.shared_schema},)
+    __table_args__ = (
+        Index(
+            "uq_tenant_name",
+            "name",
+            unique=True,
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        {"schema": Settings.database.shared_schema},
+    )
 
 
 class User(CommonMixin, DeletableMixin, Base):
@@ -85,7 +142,77 @@ class User(CommonMixin, DeletableMixin, Base):
     active: Mapped[bool] = mapped_column(
         server_default=text("false"), default=False
     )
+    last_login_at: Mapped[Optional[datetime]]
 
     tenant: Mapped[Tenant] = relationship(back_populates="users_raw")
 
-    __table_args__ = ({"schema": Settings.database.shared_schema},)
+    __table_args__ = (
+        Index(
+            "uq_user_name",
+            "name",
+            unique=True,
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        Index("ix_user_tenant_id", "tenant_id"),
+        {"schema": Settings.database.shared_schema},
+    )
+
+
+class AuditEvent(CommonMixin, Base):
+    """Something that happened to a user, like a login.
+
+    Written in batches by `src.write_behind`, so `occurred_at` may be a
+    little before `created_at`. Not tied to the user by a foreign key,
+    to keep inserting cheap.
+    """
+
+    __tablename__ = "audit_event"
+    kind: Mapped[str]
+    occurred_at: Mapped[datetime]
+    user_id: Mapped[Optional[int]]
+    tenant_id: Mapped[Optional[int]]
+    client_ip: Mapped[Optional[str]]
+
+    __table_args__ = (
+        Index("ix_audit_event_user_id", "user_id"),
+        {"schema": Settings.database.shared_schema},
+    )
+
+
+# Tables below live in the tenant schemas.
+
+
+class Calendar(CommonMixin, Base):
+    """A remote CalDAV calendar mirrored into the tenant schema."""
+
+    __tablename__ = "calendar"
+    url: Mapped[str] = mapped_column(unique=True)
+    name: Mapped[Optional[str]]
+    # Collection tags of the last sync: `ctag` tells whether anything
+    # changed at all, `sync_token` what changed (RFC 6578).
+    ctag: Mapped[Optional[str]]
+    sync_token: Mapped[Optional[str]]
+    synced_at: Mapped[Optional[datetime]]
+
+    events: Mapped[List[CalendarEvent]] = relationship(
+        back_populates="calendar", lazy="dynamic"
+    )
+
+
+class CalendarEvent(CommonMixin, HasTimespanMixin, Base):
+    __tablename__ = "calendar_event"
+    calendar_id: Mapped[int] = mapped_column(ForeignKey("calendar.id"))
+    href: Mapped[str]  # Path of the resource on the CalDAV server
+    etag: Mapped[str]
+    uid: Mapped[str]
+    summary: Mapped[Optional[str]]
+    recurring: Mapped[bool] = mapped_column(
+        server_default=text("false"), default=False
+    )
+
+    calendar: Mapped[Calendar] = relationship(back_populates="events")
+
+    __table_args__ = (
+        UniqueConstraint("calendar_id", "href"),
+        timespan_index("calendar_event"),
+    )
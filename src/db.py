@@ -1,27 +1,219 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
-from contextlib import contextmanager
-from typing import Iterator
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import URL, Engine, create_engine, event, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session, object_session, sessionmaker
 
 from src.data_model import DeletableMixin
+from src.db_metrics import TimedAsyncQueuePool, TimedQueuePool, instrument
+from src.db_replicas import Replica, ReplicaSet, recently_written
 from src.settings import Settings
 
+_engine: Engine | None = None
+_schema_engines: dict[str, Engine] = {}
+_engine_lock = threading.Lock()
 
-def _get_db_session(schema: str) -> Session:
-    return sessionmaker(
-        autocommit=False,
-        autoflush=False,
-        bind=create_engine(
-            Settings.database.pg_dsn.unicode_string(),
-            pool_pre_ping=True,
-            pool_size=5,
-            max_overflow=10,
-        ).execution_options(schema_translate_map={None: schema}),
-    )()
+_async_engine: AsyncEngine | None = None
+_async_schema_engines: dict[str, AsyncEngine] = {}
+
+_replicas: ReplicaSet | None = None
+
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+# Async sessions cannot lazy-load after commit, so keep loaded state around.
+_async_session_factory = async_sessionmaker(
+    autoflush=False, expire_on_commit=False
+)
+
+ASYNC_DRIVER = "postgresql+asyncpg"
+
+DeletionHook = Callable[[DeletableMixin], None]
+_deletion_hooks: list[DeletionHook] = []
+
+
+def _pool_options() -> dict[str, Any]:
+    return {
+        "pool_pre_ping": True,
+        "pool_size": Settings.database.pool_size,
+        "max_overflow": Settings.database.max_overflow,
+        "pool_timeout": Settings.database.pool_timeout,
+        "pool_recycle": Settings.database.pool_recycle,
+    }
+
+
+def get_engine() -> Engine:
+    """The process-wide engine; built once and shared by every schema."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(
+                    Settings.database.pg_dsn.unicode_string(),
+                    poolclass=TimedQueuePool,
+                    **_pool_options(),
+                )
+                instrument(_engine, name="primary")
+    return _engine
+
+
+def _schema_engine(schema: str) -> Engine:
+    # `execution_options` returns a lightweight proxy sharing the pool of the
+    # underlying engine, so each tenant only costs one dict entry.
+    if (engine := _schema_engines.get(schema)) is None:
+        engine = _schema_engines.setdefault(
+            schema,
+            get_engine().execution_options(
+                schema_translate_map={None: schema}
+            ),
+        )
+    return engine
+
+
+def _async_dsn() -> URL:
+    return make_url(Settings.database.pg_dsn.unicode_string()).set(
+        drivername=ASYNC_DRIVER
+    )
+
+
+def get_async_engine() -> AsyncEngine:
+    """The process-wide asyncio engine, the counterpart of `get_engine`."""
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                _async_engine = create_async_engine(
+                    _async_dsn(),
+                    poolclass=TimedAsyncQueuePool,
+                    **_pool_options(),
+                )
+                instrument(_async_engine.sync_engine, name="primary_async")
+    return _async_engine
+
+
+def _async_schema_engine(schema: str) -> AsyncEngine:
+    if (engine := _async_schema_engines.get(schema)) is None:
+        engine = _async_schema_engines.setdefault(
+            schema,
+            get_async_engine().execution_options(
+                schema_translate_map={None: schema}
+            ),
+        )
+    return engine
+
+
+def _replica(index: int, url: URL) -> Replica:
+    name = f"replica{index}"
+    # A replica that is down must not hold up the requests checking it.
+    timeout = Settings.database.replica_connect_timeout
+    engine = create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        connect_args={"connect_timeout": timeout},
+        **_pool_options(),
+    )
+    instrument(engine, name=name)
+    async_engine = create_async_engine(
+        url.set(drivername=ASYNC_DRIVER),
+        poolclass=TimedAsyncQueuePool,
+        connect_args={"timeout": timeout},
+        **_pool_options(),
+    )
+    instrument(async_engine.sync_engine, name=f"{name}_async")
+    return Replica(name, engine, async_engine)
+
+
+def get_replicas() -> ReplicaSet:
+    """The read replicas of ``DB_REPLICA_URLS``, possibly none."""
+    global _replicas
+    if _replicas is None:
+        with _engine_lock:
+            if _replicas is None:
+                _replicas = ReplicaSet(
+                    [
+                        _replica(i, make_url(dsn.unicode_string()))
+                        for i, dsn in enumerate(Settings.database.replica_dsns)
+                    ]
+                )
+    return _replicas
+
+
+def _read_engine(schema: str) -> Engine:
+    if not recently_written(schema) and (replica := get_replicas().pick()):
+        return replica.schema_engine(schema)
+    return _schema_engine(schema)
+
+
+async def _async_read_engine(schema: str) -> AsyncEngine:
+    if not recently_written(schema) and (
+        replica := await get_replicas().pick_async()
+    ):
+        return replica.async_schema_engine(schema)
+    return _async_schema_engine(schema)
+
+
+def dispose_engines(close: bool = True) -> None:
+    """Release the pooled connections of this process.
+
+    With ``close=False`` the connections are dropped without being closed,
+    which is what a forked child must do with sockets owned by its parent.
+    Closing the connections of the asyncio engine needs a running loop; use
+    `dispose_async_engines` for that on shutdown.
+    """
+    global _engine, _async_engine, _replicas
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose(close=close)
+        if _async_engine is not None and not close:
+            _async_engine.sync_engine.dispose(close=False)
+            _async_engine = None
+            _async_schema_engines.clear()
+        for replica in _replicas.replicas if _replicas else []:
+            replica.engine.dispose(close=close)
+            if not close:
+                replica.async_engine.sync_engine.dispose(close=False)
+        _engine = None
+        _schema_engines.clear()
+        _replicas = None
+
+
+async def dispose_async_engines() -> None:
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    for replica in _replicas.replicas if _replicas else []:
+        await replica.async_engine.dispose()
+    _async_engine = None
+    _async_schema_engines.clear()
+
+
+def _dispose_after_fork() -> None:
+    # The lock may have been held by another thread of the parent.
+    global _engine_lock
+    _engine_lock = threading.Lock()
+    dispose_engines(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
+def _get_db_session(schema: str, read_only: bool = False) -> Session:
+    if read_only:
+        return _session_factory(bind=_read_engine(schema))
+    session = _session_factory(bind=_schema_engine(schema))
+    # For the read-your-writes window of `src.db_replicas`.
+    session.info["schema"] = schema
+    return session
 
 
 def get_shared_db_session() -> Iterator[Session]:
@@ -36,9 +228,20 @@ def get_shared_db_session() -> Iterator[Session]:
         s.close()
 
 
+def get_shared_read_db_session() -> Iterator[Session]:
+    """Like `get_shared_db_session`, but served by a replica if possible."""
+    with new_db_session(Settings.database.shared_schema, read_only=True) as s:
+        yield s
+
+
 @contextmanager
-def new_db_session(schema: str) -> Iterator[Session]:
-    s = _get_db_session(schema)
+def new_db_session(schema: str, read_only: bool = False) -> Iterator[Session]:
+    """A session of `schema`, committed on success.
+
+    With `read_only` it may be served by a replica, unless the schema was
+    written to within the read-your-writes window or no replica is usable.
+    """
+    s = _get_db_session(schema, read_only)
     try:
         yield s
         s.commit()
@@ -49,11 +252,98 @@ def new_db_session(schema: str) -> Iterator[Session]:
         s.close()
 
 
+async def _get_async_db_session(
+    schema: str, read_only: bool = False
+) -> AsyncSession:
+    if read_only:
+        return _async_session_factory(bind=await _async_read_engine(schema))
+    session = _async_session_factory(bind=_async_schema_engine(schema))
+    session.info["schema"] = schema
+    return session
+
+
+async def get_shared_async_db_session() -> AsyncIterator[AsyncSession]:
+    s = await _get_async_db_session(schema=Settings.database.shared_schema)
+    try:
+        yield s
+        await s.commit()
+    except:  # noqa
+        await s.rollback()
+        raise
+    finally:
+        await s.close()
+
+
+async def get_shared_async_read_db_session() -> AsyncIterator[AsyncSession]:
+    """The asyncio counterpart of `get_shared_read_db_session`."""
+    async with new_async_db_session(
+        Settings.database.shared_schema, read_only=True
+    ) as s:
+        yield s
+
+
+@asynccontextmanager
+async def new_async_db_session(
+    schema: str, read_only: bool = False
+) -> AsyncIterator[AsyncSession]:
+    """The asyncio counterpart of `new_db_session`."""
+    s = await _get_async_db_session(schema, read_only)
+    try:
+        yield s
+        await s.commit()
+    except:  # noqa
+        await s.rollback()
+        raise
+    finally:
+        await s.close()
+
+
+def on_deleted(hook: DeletionHook) -> DeletionHook:
+    """Register `hook` to run whenever an entity gets soft-deleted.
+
+    Meant for invalidating caches of users, tenants and the like.
+    """
+    _deletion_hooks.append(hook)
+    return hook
+
+
+def _run_deletion_hooks(deletable: DeletableMixin) -> None:
+    for hook in _deletion_hooks:
+        hook(deletable)
+
+
+async def _run_deletion_hooks_async(deletable: DeletableMixin) -> None:
+    # Hooks may block, e.g. on Redis, which must not hold up the loop.
+    await asyncio.to_thread(_run_deletion_hooks, deletable)
+
+
 def tag_to_be_deleted(deletable: DeletableMixin) -> None:
     deletable.deleted_at = datetime.datetime.now()
+    _run_deletion_hooks(deletable)
+    if (session := object_session(deletable)) is not None:
+        # Once more after commit, so that a reader racing the deletion
+        # cannot leave a stale copy behind in a cache.
+        event.listen(
+            session,
+            "after_commit",
+            lambda _: _run_deletion_hooks(deletable),
+            once=True,
+        )
 
 
 def delete(deletable: DeletableMixin, session: Session) -> None:
-    tag_to_be_deleted(deletable)
+    # Added first, for the hooks to run again once committed.
     session.add(deletable)
+    tag_to_be_deleted(deletable)
     session.commit()
+
+
+async def delete_async(
+    deletable: DeletableMixin, session: AsyncSession
+) -> None:
+    """Like `delete`, with the hooks run off the event loop."""
+    session.add(deletable)
+    deletable.deleted_at = datetime.datetime.now()
+    await _run_deletion_hooks_async(deletable)
+    await session.commit()
+    await _run_deletion_hooks_async(deletable)
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from time import perf_counter
+from typing import Any
+
+from sqlalchemy import Engine, event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from src.metrics import gauge, histogram, request_stats
+
+_query_duration = histogram(
+    "db_query_duration_seconds", "Duration of single SQL statements."
+)
+_pool_wait = histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+)
+
+
+def _record_pool_wait(elapsed: float) -> None:
+    _pool_wait.observe(elapsed)
+    if stats := request_stats.get():
+        stats.pool_wait += elapsed
+
+
+class TimedQueuePool(QueuePool):
+    """A `QueuePool` that records how long checkouts wait."""
+
+    def _do_get(self) -> Any:
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_pool_wait(perf_counter() - start)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """The asyncio counterpart of `TimedQueuePool`."""
+
+    def _do_get(self) -> Any:
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_pool_wait(perf_counter() - start)
+
+
+def _before_cursor_execute(conn: Any, *_: Any) -> None:
+    conn.info.setdefault("query_start", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn: Any, *_: Any) -> None:
+    elapsed = perf_counter() - conn.info["query_start"].pop()
+    _query_duration.observe(elapsed)
+    if stats := request_stats.get():
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def _handle_error(context: Any) -> None:
+    if context.connection is not None and (
+        starts := context.connection.info.get("query_start")
+    ):
+        starts.pop()
+
+
+def instrument(engine: Engine, name: str) -> None:
+    """Time the statements of `engine` and export the state of its pool.
+
+    For an asyncio engine pass its ``sync_engine``.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+    # The pool is replaced on `dispose`, so always look it up afresh.
+    gauge(
+        "db_pool_checked_out",
+        "Connections currently checked out of the pool.",
+        lambda: engine.pool.checkedout(),  # type: ignore[attr-defined]
+        engine=name,
+    )
+    gauge(
+        "db_pool_size",
+        "Configured number of pooled connections.",
+        lambda: engine.pool.size(),  # type: ignore[attr-defined]
+        engine=name,
+    )
+    # Negative while the pool is not full yet, counting down from its size.
+    gauge(
+        "db_pool_overflow",
+        "Connections opened beyond the pool size.",
+        lambda: max(engine.pool.overflow(), 0),  # type: ignore[attr-defined]
+        engine=name,
+    )
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from itertools import count
+from typing import Any
+
+from sqlalchemy import Engine, event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from src.metrics import gauge
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind; zero when it has replayed all it received.
+_LAG = text(
+    """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+    """
+)
+
+_last_write: dict[str, float] = {}
+
+
+class Replica:
+    """A read replica, with the outcome of its last health and lag check.
+
+    Checks run lazily from whichever session wants the replica next, at
+    most every ``DB_REPLICA_CHECK_SECONDS``; a replica that cannot be
+    reached within ``DB_REPLICA_CONNECT_TIMEOUT_SECONDS`` or lags more than
+    ``DB_REPLICA_MAX_LAG_SECONDS`` is skipped until a later check passes.
+    The engines are expected to time out connecting after that long.
+    """
+
+    def __init__(
+        self, name: str, engine: Engine, async_engine: AsyncEngine
+    ) -> None:
+        self.name = name
+        self.engine = engine
+        self.async_engine = async_engine
+        self.usable = True
+        self.lag = 0.0
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self._schema_engines: dict[str, Engine] = {}
+        self._async_schema_engines: dict[str, AsyncEngine] = {}
+        event.listen(engine, "handle_error", self._on_error)
+        gauge(
+            "db_replica_lag_seconds",
+            "Replication lag seen by the last check.",
+            lambda: self.lag,
+            replica=name,
+        )
+
+    def schema_engine(self, schema: str) -> Engine:
+        if (engine := self._schema_engines.get(schema)) is None:
+            engine = self._schema_engines.setdefault(
+                schema,
+                self.engine.execution_options(
+                    schema_translate_map={None: schema}
+                ),
+            )
+        return engine
+
+    def async_schema_engine(self, schema: str) -> AsyncEngine:
+        if (engine := self._async_schema_engines.get(schema)) is None:
+            engine = self._async_schema_engines.setdefault(
+                schema,
+                self.async_engine.execution_options(
+                    schema_translate_map={None: schema}
+                ),
+            )
+        return engine
+
+    def _claim_check(self) -> bool:
+        # Only one caller runs a due check, the others use the last outcome.
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < Settings.database.replica_check:
+                return False
+            self._checked_at = now
+            return True
+
+    def _record(self, lag: float | None) -> None:
+        usable = lag is not None and lag <= Settings.database.replica_max_lag
+        if usable != self.usable:
+            logger.warning(
+                f"Replica {self.name} is {'back' if usable else 'out'} "
+                f"of rotation (lag {lag})."
+            )
+        self.usable = usable
+        self.lag = lag if lag is not None else float("inf")
+
+    def check(self) -> None:
+        if not self._claim_check():
+            return
+        try:
+            with self.engine.connect() as connection:
+                lag = connection.scalar(_LAG)
+        except Exception:
+            lag = None
+        self._record(None if lag is None else float(lag))
+
+    async def check_async(self) -> None:
+        if not self._claim_check():
+            return
+        try:
+            # Bounds the query as well, which the connect timeout does not.
+            async with asyncio.timeout(
+                Settings.database.replica_connect_timeout
+            ), self.async_engine.connect() as connection:
+                lag = await connection.scalar(_LAG)
+        except Exception:
+            lag = None
+        self._record(None if lag is None else float(lag))
+
+    def _on_error(self, context: Any) -> None:
+        if context.is_disconnect:
+            self._record(None)
+
+
+class ReplicaSet:
+    """Hands out usable replicas round-robin."""
+
+    def __init__(self, replicas: list[Replica]) -> None:
+        self.replicas = replicas
+        self._turn = count()
+
+    def _next_usable(self) -> Replica | None:
+        start = next(self._turn)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if replica.usable:
+                return replica
+        return None
+
+    def pick(self) -> Replica | None:
+        for replica in self.replicas:
+            replica.check()
+        return self._next_usable()
+
+    async def pick_async(self) -> Replica | None:
+        for replica in self.replicas:
+            await replica.check_async()
+        return self._next_usable()
+
+
+def recently_written(schema: str) -> bool:
+    """Whether `schema` was written to within the read-your-writes window.
+
+    Reads of such a schema go to the primary, so that a client does not
+    miss its own writes on a replica that has not caught up. The window is
+    per process.
+    """
+    written = _last_write.get(schema)
+    return (
+        written is not None
+        and time.monotonic() - written < Settings.database.read_your_writes
+    )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_dml(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session: Session, _: Any) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _record_write(session: Session) -> None:
+    if session.info.pop("wrote", False) and (
+        schema := session.info.get("schema")
+    ):
+        _last_write[schema] = time.monotonic()
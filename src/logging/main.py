@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import atexit
 import logging
 import os
+import queue
 from logging.config import dictConfig
-from typing import Any, Mapping
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Iterable, Mapping
 
 import yaml
 
+_listeners: list[QueueListener] = []
+
 
 def _ensure_log_dirs(logging_config: Mapping[str, Any]) -> None:
     handlers = logging_config.get("handlers", {})
@@ -33,10 +38,64 @@ def _read(filename: str, loader: Any) -> dict[str, Any]:
         raise FileNotFoundError(filename)
 
 
+class _BatchFlushingListener(QueueListener):
+    """Flushes batching handlers whenever it has drained the queue."""
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        if block and self.queue.empty():  # type: ignore[attr-defined]
+            for handler in self.handlers:
+                if flush_batch := getattr(handler, "flush_batch", None):
+                    flush_batch()
+        return super().dequeue(block)
+
+
+def _stop_listeners() -> None:
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def _move_handlers_to_queues(logger_names: Iterable[str]) -> None:
+    """Replace the handlers of each logger by a `QueueHandler`.
+
+    The original handlers, and with them any formatting and file I/O, run
+    on a background `QueueListener` thread instead of the logging caller.
+    Loggers sharing the same handlers share a queue and listener.
+    """
+    queues: dict[tuple[logging.Handler, ...], QueueHandler] = {}
+    for name in logger_names:
+        logger = logging.getLogger(name)
+        if not (handlers := tuple(logger.handlers)):
+            continue
+        if handlers not in queues:
+            records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+            queues[handlers] = QueueHandler(records)
+            listener = _BatchFlushingListener(
+                records, *handlers, respect_handler_level=True
+            )
+            listener.start()
+            _listeners.append(listener)
+        logger.handlers = [queues[handlers]]
+
+
 def init_logging(config_path: str) -> None:
+    """Configure logging from a YAML `dictConfig` file.
+
+    Setting the top-level ``queue: true`` key in the file hands every record
+    to background threads, so that logging calls never block on formatting
+    or I/O.
+    """
     try:
-        dictConfig(_read(config_path, loader=yaml.FullLoader))
+        config = _read(config_path, loader=yaml.FullLoader)
     except FileNotFoundError:
         logger = logging.getLogger(__name__)
         logger.error(f"Configuration file: {config_path} not found")
         raise
+
+    _stop_listeners()
+    use_queue = config.pop("queue", False)
+    dictConfig(config)
+    if use_queue:
+        _move_handlers_to_queues(["", *config.get("loggers", {})])
+
+
+atexit.register(_stop_listeners)
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 import inspect
+import json
 import logging
 import traceback
 from functools import wraps
+from logging.handlers import TimedRotatingFileHandler
+from time import perf_counter
 from typing import Any, Callable
 
 import click
 
+from src.metrics import histogram
+
 
 class ColorHandler(logging.StreamHandler):
     """A color log handler.
@@ -72,17 +77,98 @@ class ColorHandler(logging.StreamHandler):
         return click.style(text, color)
 
 
+class JsonFormatter(logging.Formatter):
+    """Formats records as compact, single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+
+class BatchedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """A `TimedRotatingFileHandler` that flushes in batches.
+
+    The file is flushed after every ``batch_size`` records and whenever
+    `flush_batch` is called; the queue listener of `init_logging` does so
+    each time it runs out of records. Only use it in queue mode, otherwise
+    records may sit unwritten until the next batch fills up.
+    """
+
+    def __init__(self, *args: Any, batch_size: int = 256, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.batch_size = batch_size
+        self._pending = 0
+
+    def flush(self) -> None:
+        # Called by `StreamHandler.emit` after every single record.
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush_batch()
+
+    def flush_batch(self) -> None:
+        self._pending = 0
+        super().flush()
+
+    def close(self) -> None:
+        self.flush_batch()
+        super().close()
+
+
 def logged(func: Callable) -> Callable:
-    @wraps(func)
-    def wrapper(*args: Any, **kwargs: Any) -> Any:
-        logger = logging.getLogger(__name__)
-        if module := inspect.getmodule(inspect.unwrap(func)):
-            logger = logging.getLogger(module.__name__)
+    """Log the start and end of each call and time it.
 
-        logger.info(f"Started {func.__name__}.")
-        result = func(*args, **kwargs)
-        logger.info(f"Finished {func.__name__}.")
+    Works on plain and ``async def`` functions alike. Everything that can be
+    is resolved once here rather than per call, and calls check the log
+    level only once; durations are recorded in the
+    ``function_duration_seconds`` histogram of the function, see
+    `src.metrics.histograms`.
+    """
+    module = inspect.getmodule(inspect.unwrap(func))
+    logger = logging.getLogger(module.__name__ if module else __name__)
+    name = func.__name__
+    timings = histogram(
+        "function_duration_seconds",
+        "Wall time of functions decorated with @logged.",
+        function=f"{logger.name}.{func.__qualname__}",
+    )
 
+    if inspect.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            info = logger.isEnabledFor(logging.INFO)
+            if info:
+                logger.info("Started %s.", name)
+            start = perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            finally:
+                timings.observe(perf_counter() - start)
+            if info:
+                logger.info("Finished %s.", name)
+            return result
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        info = logger.isEnabledFor(logging.INFO)
+        if info:
+            logger.info("Started %s.", name)
+        start = perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            timings.observe(perf_counter() - start)
+        if info:
+            logger.info("Finished %s.", name)
         return result
 
     return wrapper
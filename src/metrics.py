@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_right
+from collections import deque
+from contextvars import ContextVar
+from itertools import repeat
+from operator import call
+from typing import Any, Callable, Sequence
+
+# Upper bounds in seconds, from a few microseconds up to ten seconds.
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.00001,
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """A fixed-bucket histogram of observed values, typically durations.
+
+    Observing only appends to a deque, which is atomic and needs no lock;
+    values are folded into the buckets in batches and when read. That keeps
+    it cheap enough to wrap hot functions with.
+    """
+
+    _BATCH = 1024
+
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        labels: Labels = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # One more than the bounds, for the values above the last one.
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._pending: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        self._pending.append(value)
+        if len(self._pending) >= self._BATCH:
+            self._fold()
+
+    def _fold(self) -> None:
+        with self._lock:
+            pending, counts = self._pending, self._counts
+            # Only what is there now, as observers may keep appending; and
+            # counted per bucket rather than per value.
+            values = sorted(map(call, repeat(pending.popleft, len(pending))))
+            below = 0
+            for i, bound in enumerate(self.buckets):
+                at_most = bisect_right(values, bound, lo=below)
+                counts[i] += at_most - below
+                below = at_most
+            counts[-1] += len(values) - below
+            self._sum += sum(values)
+            self._count += len(values)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Count, sum and cumulative bucket counts keyed by upper bound."""
+        self._fold()
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        cumulative, running = {}, 0
+        for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+            running += bucket_count
+            cumulative[bound] = running
+        return {"count": count, "sum": total, "buckets": cumulative}
+
+    def quantile(self, q: float) -> float:
+        """Estimate the ``q`` quantile as the upper bound of its bucket."""
+        snapshot = self.snapshot()
+        target = q * snapshot["count"]
+        for bound, cumulative in snapshot["buckets"].items():
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+
+_histograms: dict[tuple[str, Labels], Histogram] = {}
+_registry_lock = threading.Lock()
+
+
+def histogram(
+    name: str,
+    description: str = "",
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+    **labels: str,
+) -> Histogram:
+    """Get or create the histogram identified by `name` and `labels`."""
+    key = (name, tuple(sorted(labels.items())))
+    if (found := _histograms.get(key)) is None:
+        with _registry_lock:
+            found = _histograms.setdefault(
+                key, Histogram(name, description, key[1], buckets)
+            )
+    return found
+
+
+def histograms(name: str | None = None) -> list[Histogram]:
+    """All registered histograms, or only those called `name`."""
+    return [h for h in _histograms.values() if name in (None, h.name)]
+
+
+class Gauge:
+    """A value read from `callback` whenever the metrics are collected."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        callback: Callable[[], float],
+        labels: Labels = (),
+        kind: str = "gauge",
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.callback = callback
+        self.labels = labels
+        self.kind = kind
+
+
+_gauges: dict[tuple[str, Labels], Gauge] = {}
+
+
+def gauge(
+    name: str,
+    description: str,
+    callback: Callable[[], float],
+    kind: str = "gauge",
+    **labels: str,
+) -> None:
+    """Register (or replace) a gauge; use ``kind="counter"`` for totals."""
+    key = (name, tuple(sorted(labels.items())))
+    _gauges[key] = Gauge(name, description, callback, key[1], kind)
+
+
+class RequestStats:
+    """What a single request spent on the database."""
+
+    __slots__ = ("queries", "db_time", "pool_wait")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+
+
+# Set by the request middleware; `None` outside of requests.
+request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def _format_labels(labels: Labels, **extra: str) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in pairs
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def render_prometheus() -> str:
+    """All histograms and gauges in the Prometheus text exposition format."""
+    lines: list[str] = []
+    described: set[str] = set()
+
+    def describe(name: str, description: str, kind: str) -> None:
+        if name not in described:
+            described.add(name)
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for h in sorted(_histograms.values(), key=lambda h: h.name):
+        describe(h.name, h.description, "histogram")
+        snapshot = h.snapshot()
+        for bound, cumulative in snapshot["buckets"].items():
+            labels = _format_labels(h.labels, le=_format_bound(bound))
+            lines.append(f"{h.name}_bucket{labels} {cumulative}")
+        lines.append(
+            f"{h.name}_sum{_format_labels(h.labels)} {snapshot['sum']}"
+        )
+        lines.append(
+            f"{h.name}_count{_format_labels(h.labels)} {snapshot['count']}"
+        )
+
+    for g in sorted(_gauges.values(), key=lambda g: g.name):
+        describe(g.name, g.description, g.kind)
+        lines.append(f"{g.name}{_format_labels(g.labels)} {g.callback()}")
+
+    return "\n".join(lines) + "\n"
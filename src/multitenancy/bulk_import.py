@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from typing import IO, Any, Iterable, Iterator, NamedTuple
+
+from sqlalchemy import Connection, text
+
+from src.db import get_engine
+from src.multitenancy.provisioning import clone_template, template_layout
+from src.security.password import password_hasher
+from src.settings import Settings
+
+FORMATS = ("csv", "ndjson")
+
+
+class ImportReport(NamedTuple):
+    read: int
+    inserted: int
+    seconds: float
+
+    @property
+    def skipped(self) -> int:
+        return self.read - self.inserted
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.seconds if self.seconds else 0.0
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[dict[str, Any]]:
+    """Stream the records of a CSV (with a header row) or NDJSON input."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    elif fmt == "ndjson":
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMATS}.")
+
+
+def _flag(value: Any, default: bool) -> bool:
+    if value is None or value == "":
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "t", "true", "y", "yes")
+    return bool(value)
+
+
+def _batches(
+    records: Iterable[dict[str, Any]], size: int
+) -> Iterator[list[dict[str, Any]]]:
+    iterator = iter(records)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _copy(connection: Connection, table: str, rows: Iterable[tuple]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table} FROM STDIN WITH (FORMAT csv)", buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _hash_password(plain: str) -> str:
+    # Module level so that worker processes can unpickle it.
+    return password_hasher.context.hash(plain)
+
+
+def _unknown_tenants(connection: Connection) -> list[str]:
+    return list(
+        connection.scalars(
+            text(
+                f"""
+                SELECT DISTINCT s.tenant FROM _user_import s
+                LEFT JOIN {Settings.database.shared_schema}.tenant t
+                    ON t.name = s.tenant AND t.deleted_at IS NULL
+                WHERE t.id IS NULL
+                """
+            )
+        )
+    )
+
+
+def import_users(
+    records: Iterable[dict[str, Any]],
+    batch_size: int = 5000,
+    workers: int | None = None,
+) -> ImportReport:
+    """Bulk-insert users, hashing their plain-text passwords on the way.
+
+    Records carry ``tenant`` (the tenant name), ``name``, ``password``,
+    ``email`` and optionally ``active``. Batches are hashed on a pool of
+    ``workers`` processes, the next batch hashing while the current one is
+    copied into a staging table. A single ``INSERT ... SELECT`` joined to
+    the tenants then moves them into the user table, so tenant references
+    are resolved in one pass. Users whose name is already taken are
+    skipped; an unknown tenant aborts the whole import.
+    """
+    start = time.perf_counter()
+    read = 0
+    schema = Settings.database.shared_schema
+    with get_engine().begin() as connection, ProcessPoolExecutor(
+        workers
+    ) as executor:
+        connection.execute(
+            text(
+                "CREATE TEMPORARY TABLE _user_import ("
+                "tenant text NOT NULL, name text NOT NULL, "
+                "password text NOT NULL, email text NOT NULL, "
+                "active boolean NOT NULL) ON COMMIT DROP"
+            )
+        )
+        pending: tuple[list[dict[str, Any]], Iterator[str]] | None = None
+        for batch in _batches(records, batch_size):
+            submitted = (batch, _hash_batch(executor, batch, workers))
+            if pending is not None:
+                read += _copy_users(connection, *pending)
+            pending = submitted
+        if pending is not None:
+            read += _copy_users(connection, *pending)
+
+        if unknown := _unknown_tenants(connection):
+            raise ValueError(f"Unknown tenants {sorted(unknown)}.")
+        inserted = connection.execute(
+            text(
+                f"""
+                INSERT INTO {schema}."user"
+                    (tenant_id, name, password, email, active)
+                SELECT t.id, s.name, s.password, s.email, s.active
+                FROM _user_import s
+                JOIN {schema}.tenant t
+                    ON t.name = s.tenant AND t.deleted_at IS NULL
+                ON CONFLICT (name) WHERE deleted_at IS NULL DO NOTHING
+                """
+            )
+        ).rowcount
+    return ImportReport(read, inserted, time.perf_counter() - start)
+
+
+def _hash_batch(
+    executor: Executor, batch: list[dict[str, Any]], workers: int | None
+) -> Iterator[str]:
+    # `map` submits everything right away and hands back a lazy iterator.
+    chunksize = max(1, len(batch) // (4 * (workers or 1)))
+    return executor.map(
+        _hash_password,
+        [record["password"] for record in batch],
+        chunksize=chunksize,
+    )
+
+
+def _copy_users(
+    connection: Connection,
+    batch: list[dict[str, Any]],
+    hashes: Iterator[str],
+) -> int:
+    _copy(
+        connection,
+        "_user_import",
+        (
+            (
+                record["tenant"],
+                record["name"],
+                hashed,
+                record["email"],
+                _flag(record.get("active"), default=True),
+            )
+            for record, hashed in zip(batch, hashes)
+        ),
+    )
+    return len(batch)
+
+
+def import_tenants(
+    records: Iterable[dict[str, Any]], batch_size: int = 5000
+) -> ImportReport:
+    """Bulk-insert tenants, cloning the template schema for each of them.
+
+    Records carry ``name``, ``schema`` and optionally ``active`` and
+    ``default_tenant``. Tenants whose name is already taken are skipped.
+    """
+    start = time.perf_counter()
+    read = 0
+    schema = Settings.database.shared_schema
+    with get_engine().begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TEMPORARY TABLE _tenant_import ("
+                "name text NOT NULL, schema text NOT NULL, "
+                "active boolean NOT NULL, default_tenant boolean NOT NULL) "
+                "ON COMMIT DROP"
+            )
+        )
+        for batch in _batches(records, batch_size):
+            _copy(
+                connection,
+                "_tenant_import",
+                (
+                    (
+                        record["name"],
+                        record["schema"],
+                        _flag(record.get("active"), default=True),
+                        _flag(record.get("default_tenant"), default=False),
+                    )
+                    for record in batch
+                ),
+            )
+            read += len(batch)
+
+        created = connection.scalars(
+            text(
+                f"""
+                INSERT INTO {schema}.tenant
+                    (name, schema, active, default_tenant)
+                SELECT name, schema, active, default_tenant
+                FROM _tenant_import
+                ON CONFLICT (name) WHERE deleted_at IS NULL DO NOTHING
+                RETURNING schema
+                """
+            )
+        ).all()
+        layout = template_layout(connection)
+        for tenant_schema in created:
+            clone_template(connection, tenant_schema, layout)
+    return ImportReport(read, len(created), time.perf_counter() - start)
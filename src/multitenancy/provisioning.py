@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import logging
+import re
+import time
+from typing import NamedTuple
+
+from sqlalchemy import Connection, text
+from sqlalchemy.orm import Session
+
+from src.data_model import Tenant
+from src.db import get_engine
+from src.multitenancy import tenant
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA_NAME = re.compile(r"[a-z_][a-z0-9_]{0,62}")
+
+
+def schema_for(tenant_name: str) -> str:
+    """The schema name a tenant gets unless one is given explicitly."""
+    slug = re.sub(r"[^a-z0-9]+", "_", tenant_name.lower()).strip("_")
+    return f"tenant_{slug}"[:63]
+
+
+def _check_schema_name(schema: str) -> None:
+    # Schema names end up in DDL, which cannot take bound parameters.
+    if not _SCHEMA_NAME.fullmatch(schema):
+        raise ValueError(f"Invalid schema name {schema!r}.")
+
+
+def _tables(connection: Connection, schema: str) -> list[str]:
+    return list(
+        connection.scalars(
+            text(
+                """
+                SELECT c.relname FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = :schema AND c.relkind = 'r'
+                ORDER BY c.relname
+                """
+            ),
+            {"schema": schema},
+        )
+    )
+
+
+def _serial_columns(
+    connection: Connection, schema: str
+) -> list[tuple[str, str]]:
+    # Identity columns get sequences of their own from LIKE, serial columns
+    # would keep drawing from the template's.
+    return [
+        (table, column)
+        for table, column in connection.execute(
+            text(
+                """
+                SELECT table_name, column_name
+                FROM information_schema.columns
+                WHERE table_schema = :schema
+                    AND column_default LIKE 'nextval(%'
+                """
+            ),
+            {"schema": schema},
+        )
+    ]
+
+
+def _constraints(
+    connection: Connection, schema: str
+) -> list[tuple[str, str, str]]:
+    # Keys, unique and exclusion constraints before the foreign keys that
+    # may reference them. With the template first on the search path,
+    # references within it come out unqualified and resolve to the clone
+    # when replayed there.
+    connection.exec_driver_sql(f'SET LOCAL search_path TO "{schema}"')
+    return [
+        (table, name, definition)
+        for table, name, definition in connection.execute(
+            text(
+                """
+                SELECT c.relname, con.conname, pg_get_constraintdef(con.oid)
+                FROM pg_constraint con
+                JOIN pg_class c ON c.oid = con.conrelid
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = :schema
+                    AND con.contype IN ('p', 'u', 'x', 'f')
+                ORDER BY con.contype = 'f', c.relname, con.conname
+                """
+            ),
+            {"schema": schema},
+        )
+    ]
+
+
+def _indexes(connection: Connection, schema: str) -> list[tuple[str, str]]:
+    # The definitions of the indexes not backing a constraint, and the
+    # schema as they qualify their table with it.
+    return [
+        (definition, qualifier)
+        for definition, qualifier in connection.execute(
+            text(
+                """
+                SELECT pg_get_indexdef(i.indexrelid), quote_ident(n.nspname)
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indrelid
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = :schema AND NOT EXISTS (
+                    SELECT FROM pg_constraint con
+                    WHERE con.conindid = i.indexrelid
+                )
+                ORDER BY c.relname, i.indexrelid
+                """
+            ),
+            {"schema": schema},
+        )
+    ]
+
+
+class TemplateLayout(NamedTuple):
+    tables: list[str]
+    serial_columns: list[tuple[str, str]]
+    constraints: list[tuple[str, str, str]]
+    indexes: list[tuple[str, str]]
+
+
+def template_layout(connection: Connection) -> TemplateLayout:
+    """What `clone_template` copies; read once when cloning many times."""
+    template = Settings.database.template_schema
+    layout = TemplateLayout(
+        _tables(connection, template),
+        _serial_columns(connection, template),
+        _constraints(connection, template),
+        _indexes(connection, template),
+    )
+    connection.exec_driver_sql("SET LOCAL search_path TO DEFAULT")
+    return layout
+
+
+def clone_template(
+    connection: Connection,
+    schema: str,
+    layout: TemplateLayout | None = None,
+) -> None:
+    """Create `schema` as a copy of the template schema's DDL.
+
+    Tables are copied with ``LIKE ... INCLUDING ALL`` (columns, defaults,
+    check constraints, identities and comments), after which serial
+    sequences, foreign keys, indexes and the constraints backed by them are
+    recreated. ``LIKE`` would leave out the first two and rename the
+    others, while migrations refer to them by the names they were given.
+    The tenant migration state of the template is copied as well, since the
+    clone is at the same revision. Runs in the caller's transaction.
+    """
+    _check_schema_name(schema)
+    template = Settings.database.template_schema
+    layout = layout or template_layout(connection)
+    connection.exec_driver_sql(f'CREATE SCHEMA "{schema}"')
+    for table in layout.tables:
+        connection.exec_driver_sql(
+            f'CREATE TABLE "{schema}"."{table}" '
+            f'(LIKE "{template}"."{table}" INCLUDING ALL EXCLUDING INDEXES)'
+        )
+    for table, column in layout.serial_columns:
+        sequence = f'"{schema}"."{table}_{column}_seq"'
+        connection.exec_driver_sql(
+            f"CREATE SEQUENCE {sequence} "
+            f'OWNED BY "{schema}"."{table}"."{column}"'
+        )
+        connection.exec_driver_sql(
+            f'ALTER TABLE "{schema}"."{table}" ALTER COLUMN "{column}" '
+            f"SET DEFAULT nextval('{sequence}')"
+        )
+
+    connection.exec_driver_sql(f'SET LOCAL search_path TO "{schema}"')
+    for table, name, definition in layout.constraints:
+        connection.exec_driver_sql(
+            f'ALTER TABLE "{schema}"."{table}" '
+            f'ADD CONSTRAINT "{name}" {definition}'
+        )
+    connection.exec_driver_sql("SET LOCAL search_path TO DEFAULT")
+    for definition, qualifier in layout.indexes:
+        connection.exec_driver_sql(
+            definition.replace(f" ON {qualifier}.", f' ON "{schema}".', 1)
+        )
+
+    connection.execute(
+        text(
+            f"""
+            INSERT INTO {Settings.database.shared_schema}.tenant_migration
+                (schema, revision)
+            SELECT :schema, revision
+            FROM {Settings.database.shared_schema}.tenant_migration
+            WHERE schema = :template
+            """
+        ),
+        {"schema": schema, "template": template},
+    )
+
+
+def provision_tenant(
+    name: str,
+    schema: str | None = None,
+    active: bool = True,
+) -> int:
+    """Register a tenant and clone its schema, in a single transaction.
+
+    Cloning the template costs the same however long the migration history
+    gets, unlike replaying every migration against an empty schema. Returns
+    the id of the new tenant.
+    """
+    schema = schema or schema_for(name)
+    start = time.perf_counter()
+    with get_engine().begin() as connection:
+        with Session(bind=connection) as session:
+            if tenant.try_get(session, name) is not None:
+                raise ValueError(f"Tenant {name!r} already exists.")
+            clone_template(connection, schema)
+            new_tenant = Tenant(name=name, schema=schema, active=active)
+            session.add(new_tenant)
+            session.flush()
+            tenant_id = new_tenant.id
+    logger.info(
+        f"Provisioned tenant {name!r} in schema {schema} "
+        f"in {time.perf_counter() - start:.2f}s."
+    )
+    return tenant_id
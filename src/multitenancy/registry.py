@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import Iterator, Mapping, NamedTuple
+
+from src.data_model import DeletableMixin, Tenant
+from src.db import new_async_db_session, on_deleted
+from src.multitenancy import tenant
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Tenants committed a little after a later-updated one are still picked up.
+_WATERMARK_OVERLAP = timedelta(minutes=5)
+# Lookups of unknown tenants refresh at most this often.
+_MISS_REFRESH_SECONDS = 1.0
+
+
+class TenantRecord(NamedTuple):
+    id: int
+    name: str
+    schema: str
+    default_tenant: bool
+
+
+class _Snapshot(NamedTuple):
+    by_id: Mapping[int, TenantRecord]
+    by_name: Mapping[str, TenantRecord]
+    watermark: datetime
+
+
+_EMPTY = _Snapshot(MappingProxyType({}), MappingProxyType({}), datetime.min)
+
+
+class TenantRegistry:
+    """The active tenants of this process, kept in memory.
+
+    Lookups read an immutable snapshot and never touch the database. A
+    refresh only fetches tenants changed since the last one, going by
+    their ``updated_at`` watermark (kept by a trigger), and swaps in a new
+    snapshot. Deleted tenants are also dropped right away, by `forget`.
+    """
+
+    def __init__(self) -> None:
+        self._snapshot = _EMPTY
+        self._lock = asyncio.Lock()
+        self._last_refresh = 0.0
+
+    def __len__(self) -> int:
+        return len(self._snapshot.by_id)
+
+    def __iter__(self) -> Iterator[TenantRecord]:
+        return iter(self._snapshot.by_id.values())
+
+    def get(self, tenant_id: int) -> TenantRecord | None:
+        return self._snapshot.by_id.get(tenant_id)
+
+    def by_name(self, name: str) -> TenantRecord | None:
+        return self._snapshot.by_name.get(name)
+
+    def schema_for(self, tenant_id: int) -> str | None:
+        record = self._snapshot.by_id.get(tenant_id)
+        return record.schema if record else None
+
+    async def resolve(self, tenant_id: int) -> TenantRecord | None:
+        """Like `get`, but refreshes first if the tenant is not known yet."""
+        if (record := self.get(tenant_id)) is not None:
+            return record
+        if time.monotonic() - self._last_refresh >= _MISS_REFRESH_SECONDS:
+            await self.refresh()
+        return self.get(tenant_id)
+
+    def forget(self, tenant_id: int) -> None:
+        """Drop a tenant without waiting for the next refresh."""
+        snapshot = self._snapshot
+        if tenant_id in snapshot.by_id:
+            by_id = dict(snapshot.by_id)
+            del by_id[tenant_id]
+            self._snapshot = _snapshot(by_id, snapshot.watermark)
+
+    async def reload(self) -> None:
+        await self._update(full=True)
+
+    async def refresh(self) -> None:
+        await self._update(full=False)
+
+    async def _update(self, full: bool) -> None:
+        async with self._lock:
+            self._last_refresh = time.monotonic()
+            since = datetime.min if full else _since(self._snapshot.watermark)
+            async with new_async_db_session(
+                Settings.database.shared_schema, read_only=True
+            ) as session:
+                changed = await tenant.get_changed_async(session, since)
+            # Applied to the snapshot as it is now, not as it was before the
+            # query, so as not to bring back a tenant forgotten meanwhile.
+            if full or changed:
+                self._snapshot = _apply(
+                    _EMPTY if full else self._snapshot, changed
+                )
+
+
+def _since(watermark: datetime) -> datetime:
+    if watermark == datetime.min:
+        return watermark
+    return watermark - _WATERMARK_OVERLAP
+
+
+def _apply(snapshot: _Snapshot, changed: list[Tenant]) -> _Snapshot:
+    by_id = dict(snapshot.by_id)
+    watermark = snapshot.watermark
+    for row in changed:
+        by_id.pop(row.id, None)
+        if row.active and not row.is_deleted:
+            by_id[row.id] = TenantRecord(
+                id=row.id,
+                name=row.name,
+                schema=row.schema,
+                default_tenant=row.default_tenant,
+            )
+        watermark = max(watermark, row.updated_at)
+    return _snapshot(by_id, watermark)
+
+
+def _snapshot(
+    by_id: dict[int, TenantRecord], watermark: datetime
+) -> _Snapshot:
+    return _Snapshot(
+        by_id=MappingProxyType(by_id),
+        by_name=MappingProxyType({r.name: r for r in by_id.values()}),
+        watermark=watermark,
+    )
+
+
+async def keep_fresh(registry: TenantRegistry) -> None:
+    """Load `registry`, then keep refreshing it until cancelled."""
+    refresh = Settings.cache.tenant_refresh_seconds
+    full_reload = Settings.cache.tenant_full_reload_seconds
+    last_reload = -float(full_reload)
+    while True:
+        try:
+            if time.monotonic() - last_reload >= full_reload:
+                await registry.reload()
+                last_reload = time.monotonic()
+                logger.info(f"Loaded {len(registry)} tenants.")
+            else:
+                await registry.refresh()
+        except Exception:
+            logger.exception("Refreshing the tenant registry failed.")
+        await asyncio.sleep(refresh)
+
+
+tenant_registry = TenantRegistry()
+
+
+@on_deleted
+def _forget_deleted_tenant(deletable: DeletableMixin) -> None:
+    if isinstance(deletable, Tenant):
+        tenant_registry.forget(deletable.id)
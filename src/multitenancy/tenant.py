@@ -1,7 +1,10 @@
 from __future__ import annotations
 
-from typing import Callable, TypeVar
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterator, Sequence, TypeVar
 
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from src.data_model import Tenant
@@ -9,19 +12,90 @@ from src.data_model import Tenant
 NoReturnFunction = TypeVar("NoReturnFunction", bound=Callable[..., None])
 
 
-def get(session: Session) -> list[Tenant]:
-    return list(
-        session.query(Tenant)
-        .filter(Tenant.filter_deleted_out())
-        .filter(Tenant.active.is_(True))
-        .all()
+def _active() -> Select[tuple[Tenant]]:
+    return (
+        select(Tenant)
+        .where(Tenant.filter_deleted_out())
+        .where(Tenant.active.is_(True))
     )
 
 
-def try_get(session: Session, tenant_name: str) -> Tenant | None:
+def _by_name(tenant_name: str) -> Select[tuple[Tenant]]:
     return (
-        session.query(Tenant)
-        .filter(Tenant.filter_deleted_out())
-        .filter(Tenant.name == tenant_name)
-        .one_or_none()
+        select(Tenant)
+        .where(Tenant.filter_deleted_out())
+        .where(Tenant.name == tenant_name)
+    )
+
+
+def _changed_since(after: datetime) -> Select[tuple[Tenant]]:
+    # Deleted and inactive tenants included, so they can be dropped.
+    return select(Tenant).where(Tenant.updated_at > after)
+
+
+def _listed(after_id: int) -> Select[tuple[Tenant]]:
+    # Keyset on the primary key: any page is a range scan of its index,
+    # however far in, unlike an OFFSET that skips over all rows before it.
+    return (
+        select(Tenant)
+        .where(Tenant.filter_deleted_out())
+        .where(Tenant.id > after_id)
+        .order_by(Tenant.id)
+    )
+
+
+def get(session: Session) -> list[Tenant]:
+    return list(session.scalars(_active()).all())
+
+
+def try_get(session: Session, tenant_name: str) -> Tenant | None:
+    return session.scalars(_by_name(tenant_name)).one_or_none()
+
+
+def page(
+    session: Session, after_id: int = 0, limit: int = 100
+) -> list[Tenant]:
+    """Up to `limit` tenants following the one with id `after_id`."""
+    return list(session.scalars(_listed(after_id).limit(limit)).all())
+
+
+def stream(
+    session: Session, batch_size: int = 1000
+) -> Iterator[Sequence[Tenant]]:
+    """All tenants, in batches fetched from a server-side cursor."""
+    yield from session.scalars(
+        _listed(0).execution_options(yield_per=batch_size)
+    ).partitions()
+
+
+async def get_async(session: AsyncSession) -> list[Tenant]:
+    return list((await session.scalars(_active())).all())
+
+
+async def try_get_async(
+    session: AsyncSession, tenant_name: str
+) -> Tenant | None:
+    return (await session.scalars(_by_name(tenant_name))).one_or_none()
+
+
+async def get_changed_async(
+    session: AsyncSession, after: datetime
+) -> list[Tenant]:
+    """Tenants created or changed after the given point in time."""
+    return list((await session.scalars(_changed_since(after))).all())
+
+
+async def page_async(
+    session: AsyncSession, after_id: int = 0, limit: int = 100
+) -> list[Tenant]:
+    return list((await session.scalars(_listed(after_id).limit(limit))).all())
+
+
+async def stream_async(
+    session: AsyncSession, batch_size: int = 1000
+) -> AsyncIterator[Sequence[Tenant]]:
+    result = await session.stream_scalars(
+        _listed(0).execution_options(yield_per=batch_size)
     )
+    async for batch in result.partitions():
+        yield batch
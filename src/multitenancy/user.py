@@ -1,23 +1,102 @@
 from __future__ import annotations
 
-from sqlalchemy.orm import Session
+from typing import AsyncIterator, Iterator, Sequence
 
-from src.data_model import User
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
 
+from src.data_model import Tenant, User
 
-def try_get(session: Session, user_name: str) -> User | None:
+
+def _with_tenant() -> Select[tuple[User]]:
+    # One joined query for the user and its tenant; users of a deleted
+    # tenant are treated as gone as well.
     return (
-        session.query(User)
-        .filter(User.filter_deleted_out())
-        .filter(User.name == user_name)
-        .one_or_none()
+        select(User)
+        .join(User.tenant)
+        .options(contains_eager(User.tenant))
+        .where(User.filter_deleted_out())
+        .where(Tenant.filter_deleted_out())
     )
 
 
+def _by_name(user_name: str) -> Select[tuple[User]]:
+    return _with_tenant().where(User.name == user_name)
+
+
+def _by_id(user_id: int) -> Select[tuple[User]]:
+    return _with_tenant().where(User.id == user_id)
+
+
+def _listed(after_id: int, tenant_id: int | None) -> Select[tuple[User]]:
+    # Keyset on the primary key, see `tenant._listed`.
+    statement = _with_tenant().where(User.id > after_id).order_by(User.id)
+    if tenant_id is not None:
+        statement = statement.where(User.tenant_id == tenant_id)
+    return statement
+
+
+def try_get(session: Session, user_name: str) -> User | None:
+    return session.scalars(_by_name(user_name)).one_or_none()
+
+
 def get(session: Session, user_id: int) -> User | None:
-    return (
-        session.query(User)
-        .filter(User.filter_deleted_out())
-        .filter(User.id == user_id)
-        .one_or_none()
+    return session.scalars(_by_id(user_id)).one_or_none()
+
+
+def page(
+    session: Session,
+    after_id: int = 0,
+    limit: int = 100,
+    tenant_id: int | None = None,
+) -> list[User]:
+    """Up to `limit` users following the one with id `after_id`.
+
+    Unlike `Tenant.users`, never loads more than a page of them.
+    """
+    return list(
+        session.scalars(_listed(after_id, tenant_id).limit(limit)).all()
+    )
+
+
+def stream(
+    session: Session, batch_size: int = 1000, tenant_id: int | None = None
+) -> Iterator[Sequence[User]]:
+    """All users, in batches fetched from a server-side cursor."""
+    yield from session.scalars(
+        _listed(0, tenant_id).execution_options(yield_per=batch_size)
+    ).partitions()
+
+
+async def try_get_async(session: AsyncSession, user_name: str) -> User | None:
+    return (await session.scalars(_by_name(user_name))).one_or_none()
+
+
+async def get_async(session: AsyncSession, user_id: int) -> User | None:
+    return (await session.scalars(_by_id(user_id))).one_or_none()
+
+
+async def page_async(
+    session: AsyncSession,
+    after_id: int = 0,
+    limit: int = 100,
+    tenant_id: int | None = None,
+) -> list[User]:
+    return list(
+        (
+            await session.scalars(_listed(after_id, tenant_id).limit(limit))
+        ).all()
+    )
+
+
+async def stream_async(
+    session: AsyncSession,
+    batch_size: int = 1000,
+    tenant_id: int | None = None,
+) -> AsyncIterator[Sequence[User]]:
+    result = await session.stream_scalars(
+        _listed(0, tenant_id).execution_options(yield_per=batch_size)
     )
+    async for batch in result.partitions():
+        yield batch
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import redis
+import redis.asyncio as aioredis
+
+from src.settings import Settings
+
+_redis: redis.Redis | None = None
+_async_redis: aioredis.Redis | None = None
+
+
+def get_redis() -> redis.Redis:
+    """The process-wide, pooled Redis client for synchronous callers.
+
+    The underlying pool notices forks and rebuilds its connections in the
+    child, so it is safe to create before uvicorn or celery fork.
+    """
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(
+            Settings.redis_dsn.unicode_string(),
+            max_connections=Settings.cache.redis_max_connections,
+            socket_timeout=Settings.cache.redis_socket_timeout,
+            socket_connect_timeout=Settings.cache.redis_connect_timeout,
+            health_check_interval=30,
+        )
+    return _redis
+
+
+def get_async_redis() -> aioredis.Redis:
+    """The process-wide, pooled Redis client for coroutines."""
+    global _async_redis
+    if _async_redis is None:
+        _async_redis = aioredis.Redis.from_url(
+            Settings.redis_dsn.unicode_string(),
+            max_connections=Settings.cache.redis_max_connections,
+            socket_timeout=Settings.cache.redis_socket_timeout,
+            socket_connect_timeout=Settings.cache.redis_connect_timeout,
+            health_check_interval=30,
+        )
+    return _async_redis
+
+
+async def close_redis() -> None:
+    global _redis, _async_redis
+    if _async_redis is not None:
+        await _async_redis.aclose()
+    if _redis is not None:
+        _redis.close()
+    _redis = _async_redis = None
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed448, ed25519, rsa
+from cryptography.hazmat.primitives.serialization import (
+    load_pem_private_key,
+    load_pem_public_key,
+)
+
+from src.settings import SecuritySettings, Settings
+
+logger = logging.getLogger(__name__)
+
+_CURVE_ALGORITHMS = {
+    "secp256r1": "ES256",
+    "secp384r1": "ES384",
+    "secp521r1": "ES512",
+}
+
+
+class SigningKey(NamedTuple):
+    kid: str
+    algorithm: str
+    # Secret for HMAC algorithms, otherwise a private key (or None for keys
+    # that are only kept around to verify tokens they signed before).
+    signing_key: Any
+    verification_key: Any
+
+    @property
+    def is_asymmetric(self) -> bool:
+        return not self.algorithm.startswith("HS")
+
+
+def _algorithm_for(key: Any, preferred: str) -> str:
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return preferred if preferred[:2] in ("RS", "PS") else "RS256"
+    if isinstance(
+        key,
+        (
+            ed25519.Ed25519PrivateKey,
+            ed25519.Ed25519PublicKey,
+            ed448.Ed448PrivateKey,
+            ed448.Ed448PublicKey,
+        ),
+    ):
+        return "EdDSA"
+    if isinstance(
+        key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)
+    ):
+        return _CURVE_ALGORITHMS[key.curve.name]
+    raise ValueError(f"Unsupported key type {type(key).__name__}.")
+
+
+def _load_key(path: Path, preferred_algorithm: str) -> SigningKey:
+    pem = path.read_bytes()
+    if path.name.endswith(".pub.pem"):
+        public = load_pem_public_key(pem)
+        return SigningKey(
+            kid=path.name.removesuffix(".pub.pem"),
+            algorithm=_algorithm_for(public, preferred_algorithm),
+            signing_key=None,
+            verification_key=public,
+        )
+    private = load_pem_private_key(pem, password=None)
+    return SigningKey(
+        kid=path.name.removesuffix(".pem"),
+        algorithm=_algorithm_for(private, preferred_algorithm),
+        signing_key=private,
+        verification_key=private.public_key(),  # type: ignore[union-attr]
+    )
+
+
+class KeyRing:
+    """The keys tokens are signed and verified with, identified by ``kid``.
+
+    Without a keys directory the ring holds the single shared
+    ``AUTH_SECRET_KEY``. With ``AUTH_KEYS_DIR`` every ``<kid>.pem`` private
+    key (RSA, EC or Ed25519) and every verify-only ``<kid>.pub.pem`` public
+    key in it is accepted and published through `jwks`, while tokens are
+    signed with ``AUTH_ACTIVE_KID``, which must then be set. Rotating
+    without downtime is then:
+
+    1. add the new key and roll out, so it is published before use;
+    2. once the JWKS cache lifetime has passed, make it the active kid;
+    3. once the longest token lifetime has passed, drop the old key (or
+       keep only its public half until then).
+    """
+
+    def __init__(self, keys: list[SigningKey], active_kid: str) -> None:
+        self._keys = {key.kid: key for key in keys}
+        if active_kid not in self._keys:
+            raise ValueError(f"Active key {active_kid!r} is not available.")
+        self.active = self._keys[active_kid]
+        if self.active.signing_key is None:
+            raise ValueError(f"Active key {active_kid!r} has no private key.")
+
+    @classmethod
+    def from_settings(cls, settings: SecuritySettings) -> KeyRing:
+        if not settings.keys_dir:
+            return cls(
+                [
+                    SigningKey(
+                        kid="default",
+                        algorithm=settings.algorithm,
+                        signing_key=settings.secret_key,
+                        verification_key=settings.secret_key,
+                    )
+                ],
+                active_kid="default",
+            )
+
+        # Never guessed: a key picked by name could sign tokens before
+        # verifiers have fetched it.
+        if not settings.active_kid:
+            raise ValueError("AUTH_ACTIVE_KID is required with AUTH_KEYS_DIR.")
+        keys = [
+            _load_key(path, settings.algorithm)
+            for path in sorted(Path(settings.keys_dir).glob("*.pem"))
+        ]
+        if not keys:
+            raise ValueError(f"No keys in {settings.keys_dir}.")
+        logger.info(f"Loaded signing keys {[key.kid for key in keys]}.")
+        return cls(keys, active_kid=settings.active_kid)
+
+    def sign(self, claims: dict[str, Any]) -> str:
+        return jwt.encode(
+            claims,
+            self.active.signing_key,
+            algorithm=self.active.algorithm,
+            headers={"kid": self.active.kid},
+        )
+
+    def verify(self, token: str, **options: Any) -> dict[str, Any]:
+        """Verify `token` with the key named by its ``kid`` header.
+
+        Tokens without a ``kid`` predate key rotation and are checked
+        against the active key. Raises `jwt.InvalidTokenError`.
+        """
+        kid = jwt.get_unverified_header(token).get("kid", self.active.kid)
+        if (key := self._keys.get(kid)) is None:
+            raise jwt.InvalidTokenError(f"Unknown signing key {kid!r}.")
+        return jwt.decode(
+            token,
+            key.verification_key,
+            algorithms=[key.algorithm],
+            **options,
+        )
+
+    def jwks(self) -> dict[str, list[dict[str, Any]]]:
+        """The public keys as a JWK set; shared secrets are never included."""
+        return {
+            "keys": [
+                {
+                    **jwt.get_algorithm_by_name(key.algorithm).to_jwk(
+                        key.verification_key, as_dict=True
+                    ),
+                    "kid": key.kid,
+                    "alg": key.algorithm,
+                    "use": "sig",
+                }
+                for key in self._keys.values()
+                if key.is_asymmetric
+            ]
+        }
+
+
+key_ring = KeyRing.from_settings(Settings.security_settings)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, NamedTuple, TypeVar
+
+from passlib.context import CryptContext
+
+from src.settings import SecuritySettings, Settings
+
+T = TypeVar("T")
+
+
+class HashingSaturatedError(RuntimeError):
+    """Raised when the hashing pool and its queue are both full."""
+
+
+class PasswordHasher:
+    """Runs password hashing off the event loop on a bounded thread pool.
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism
+    without the pickling and start-up cost of a process pool. At most
+    ``max_workers`` hashes run at once and ``max_pending`` more may wait;
+    anything beyond that fails fast with `HashingSaturatedError` instead of
+    piling up latency.
+    """
+
+    def __init__(
+        self,
+        context: CryptContext,
+        max_workers: int,
+        max_pending: int,
+    ) -> None:
+        self.context = context
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="password-hasher",
+        )
+        self._capacity = max_workers + max_pending
+        # Only touched from the event loop thread, so no lock is needed.
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def _run(self, func: Callable[..., T], *args: str) -> T:
+        if self._in_flight >= self._capacity:
+            raise HashingSaturatedError(
+                f"{self._in_flight} password hashes already in flight."
+            )
+        self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, func, *args
+            )
+        finally:
+            self._in_flight -= 1
+
+    def _verify_and_update(
+        self, plain: str, hashed: str
+    ) -> tuple[bool, str | None]:
+        try:
+            return self.context.verify_and_update(plain, hashed)
+        except ValueError:
+            # Not a hash of any known scheme, like a plain-text password.
+            return False, None
+
+    async def verify(self, plain: str, hashed: str) -> bool:
+        verified, _ = await self.verify_and_update(plain, hashed)
+        return verified
+
+    async def verify_and_update(
+        self, plain: str, hashed: str
+    ) -> tuple[bool, str | None]:
+        """Verify `plain` against `hashed`, and rehash it if outdated.
+
+        Returns whether it matched, and if so and `hashed` is of a
+        deprecated scheme or lower cost than configured, the hash that
+        should replace it.
+        """
+        return await self._run(self._verify_and_update, plain, hashed)
+
+    async def hash(self, plain: str) -> str:
+        return await self._run(self.context.hash, plain)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def hashing_context(settings: SecuritySettings) -> CryptContext:
+    """The hashing policy of `settings`.
+
+    New hashes use the first of ``hash_schemes``, the others are only
+    verified. Raising a cost makes hashes of lower cost outdated as well.
+    """
+    return CryptContext(
+        schemes=settings.hash_schemes,
+        deprecated="auto",
+        bcrypt__rounds=settings.bcrypt_rounds,
+        bcrypt__min_rounds=settings.bcrypt_rounds,
+        argon2__time_cost=settings.argon2_time_cost,
+        argon2__memory_cost=settings.argon2_memory_cost,
+        argon2__parallelism=settings.argon2_parallelism,
+    )
+
+
+class Calibration(NamedTuple):
+    scheme: str
+    options: dict[str, int]
+    seconds: float  # Time to verify a password with these options
+
+
+# The cost raised step by step, its lowest and highest value.
+_CALIBRATED = {"bcrypt": ("rounds", 4, 31), "argon2": ("time_cost", 1, 64)}
+
+
+def _verify_seconds(scheme: str, options: dict[str, Any]) -> float:
+    context = CryptContext(
+        schemes=[scheme],
+        **{f"{scheme}__{key}": value for key, value in options.items()},
+    )
+    hashed = context.hash("calibration")
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        context.verify("calibration", hashed)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def calibrate(
+    scheme: str, target_seconds: float, **options: int
+) -> Calibration:
+    """The highest cost of `scheme` verifying within `target_seconds` here.
+
+    `options` fix the other parameters, like ``memory_cost`` of argon2.
+    Takes the fastest of a few runs on an otherwise idle host; concurrent
+    logins share its cores with each other and everything else.
+    """
+    if scheme not in _CALIBRATED:
+        raise ValueError(f"Cannot calibrate {scheme}.")
+    key, lowest, highest = _CALIBRATED[scheme]
+    # The lowest cost even if too slow, there being nothing cheaper.
+    best = Calibration(
+        scheme,
+        {**options, key: lowest},
+        _verify_seconds(scheme, {**options, key: lowest}),
+    )
+    for cost in range(lowest + 1, highest + 1):
+        candidate = {**options, key: cost}
+        seconds = _verify_seconds(scheme, candidate)
+        if seconds > target_seconds:
+            break
+        best = Calibration(scheme, candidate, seconds)
+    return best
+
+
+password_hasher = PasswordHasher(
+    hashing_context(Settings.security_settings),
+    max_workers=Settings.security_settings.hashing_workers,
+    max_pending=Settings.security_settings.hashing_queue_size,
+)
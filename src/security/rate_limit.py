@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+from time import perf_counter
+from typing import NamedTuple
+
+from redis.exceptions import RedisError
+
+from src.metrics import histogram
+from src.redis_client import get_async_redis
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# GCRA: each key holds the theoretical arrival time (TAT) of its next
+# request in milliseconds of Redis' clock. A request is admitted only if it
+# fits the bucket of every key; then all of them advance, else none does.
+# Returns 0 when admitted, otherwise the milliseconds until it would be.
+_GCRA = """
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local retry_after = 0
+local tats = {}
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    local tat = math.max(tonumber(redis.call('GET', key) or now), now)
+    local allowed_at = tat + interval - interval * burst
+    if allowed_at > now then
+        retry_after = math.max(retry_after, allowed_at - now)
+    end
+    tats[i] = tat + interval
+end
+if retry_after > 0 then
+    return retry_after
+end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, tats[i], 'PX', math.ceil(tats[i] - now))
+end
+return 0
+"""
+
+
+class Rate(NamedTuple):
+    per_minute: float
+    burst: int
+
+
+class RateLimiter:
+    """Rate limits shared by all workers, kept in Redis.
+
+    Every identity gets a bucket of ``burst`` requests that refills at
+    ``per_minute``; a request is let through only if all of its buckets have
+    room. Checking takes one round trip to an atomic script. Should Redis be
+    unavailable, requests are let through rather than locking everyone out.
+    """
+
+    def __init__(self, name: str, **rates: Rate) -> None:
+        self.name = name
+        self._rates = rates
+        self._script = get_async_redis().register_script(_GCRA)
+        self._duration = histogram(
+            "rate_limiter_duration_seconds",
+            "Time taken to check a rate limit.",
+            limiter=name,
+        )
+
+    def _key(self, kind: str, identity: str) -> str:
+        # Hashed to keep keys short whatever clients send.
+        digest = hashlib.sha256(identity.encode()).hexdigest()[:32]
+        return f"ratelimit:{self.name}:{kind}:{digest}"
+
+    async def retry_after(self, **identities: str) -> float:
+        """Count a request against the bucket of each identity.
+
+        Returns 0 if the request may proceed, else the seconds until it may.
+        """
+        keys, args = [], []
+        for kind, identity in identities.items():
+            rate = self._rates[kind]
+            keys.append(self._key(kind, identity))
+            args += [60_000 / rate.per_minute, rate.burst]
+        start = perf_counter()
+        try:
+            wait_ms = await self._script(
+                keys=keys, args=args, client=get_async_redis()
+            )
+        except RedisError:
+            logger.warning(f"Redis unavailable, not limiting {self.name}.")
+            return 0.0
+        finally:
+            self._duration.observe(perf_counter() - start)
+        return float(wait_ms) / 1000
+
+
+login_limiter = RateLimiter(
+    "login",
+    user=Rate(
+        Settings.security_settings.login_user_per_minute,
+        Settings.security_settings.login_user_burst,
+    ),
+    ip=Rate(
+        Settings.security_settings.login_ip_per_minute,
+        Settings.security_settings.login_ip_burst,
+    ),
+)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import logging
+import secrets
+
+from src.redis_client import get_async_redis
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] the family, ARGV the presented jti, its successor and the TTL in
+# seconds. 1: rotated, 0: reuse of a rotated-out token (family revoked),
+# -1: unknown or revoked family.
+_ROTATE = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return -1
+end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+class InvalidRefreshTokenError(Exception):
+    """Raised for refresh tokens of an unknown or revoked family."""
+
+
+class RefreshTokenReuseError(InvalidRefreshTokenError):
+    """Raised when a refresh token is presented after it was rotated out.
+
+    Either the legitimate client or whoever stole the token is replaying
+    it; the whole family is revoked since there is no telling which.
+    """
+
+
+class RefreshTokenStore:
+    """Tracks refresh token families in Redis.
+
+    A login starts a family; every refresh replaces its token with a new
+    one. Redis holds a single key per family with the ``jti`` of its one
+    valid token, expiring with it, so checking a token is a single lookup
+    and revoked or abandoned families clean themselves up.
+    """
+
+    def __init__(self, ttl_seconds: int) -> None:
+        self._ttl = ttl_seconds
+        self._rotate = get_async_redis().register_script(_ROTATE)
+
+    @staticmethod
+    def _key(family: str) -> str:
+        return f"refresh:family:{family}"
+
+    @staticmethod
+    def new_id() -> str:
+        return secrets.token_urlsafe(16)
+
+    async def start(self) -> tuple[str, str]:
+        """Start a family; returns its id and the ``jti`` of its token."""
+        family, jti = self.new_id(), self.new_id()
+        await get_async_redis().set(self._key(family), jti, ex=self._ttl)
+        return family, jti
+
+    async def rotate(self, family: str, jti: str) -> str:
+        """Replace token `jti` of `family`; returns the new ``jti``."""
+        successor = self.new_id()
+        outcome = await self._rotate(
+            keys=[self._key(family)],
+            args=[jti, successor, self._ttl],
+            client=get_async_redis(),
+        )
+        if outcome == 0:
+            logger.warning(f"Refresh token reused, revoked family {family}.")
+            raise RefreshTokenReuseError(family)
+        if outcome != 1:
+            raise InvalidRefreshTokenError(family)
+        return successor
+
+    async def revoke(self, family: str) -> None:
+        await get_async_redis().delete(self._key(family))
+
+
+refresh_tokens = RefreshTokenStore(
+    ttl_seconds=Settings.security_settings.refresh_token_expire_mins * 60
+)
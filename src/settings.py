@@ -18,11 +18,158 @@ class SecuritySettings(BaseSettings):
     refresh_token_expire_mins: int = Field(
         validation_alias="AUTH_REFRESH_EXPIRE_MINUTES"
     )
+    keys_dir: str | None = Field(
+        default=None, validation_alias="AUTH_KEYS_DIR"
+    )
+    active_kid: str | None = Field(
+        default=None, validation_alias="AUTH_ACTIVE_KID"
+    )
+    jwks_max_age_seconds: int = Field(
+        default=300, validation_alias="AUTH_JWKS_MAX_AGE_SECONDS"
+    )
+    hashing_workers: int = Field(
+        default=2, validation_alias="AUTH_HASHING_WORKERS"
+    )
+    hashing_queue_size: int = Field(
+        default=16, validation_alias="AUTH_HASHING_QUEUE_SIZE"
+    )
+    hash_schemes: list[str] = Field(
+        default=["bcrypt"], validation_alias="AUTH_HASH_SCHEMES"
+    )
+    bcrypt_rounds: int = Field(
+        default=12, validation_alias="AUTH_BCRYPT_ROUNDS"
+    )
+    argon2_time_cost: int = Field(
+        default=3, validation_alias="AUTH_ARGON2_TIME_COST"
+    )
+    argon2_memory_cost: int = Field(
+        default=65536, validation_alias="AUTH_ARGON2_MEMORY_COST_KIB"
+    )
+    argon2_parallelism: int = Field(
+        default=4, validation_alias="AUTH_ARGON2_PARALLELISM"
+    )
+    login_user_per_minute: float = Field(
+        default=10, validation_alias="AUTH_LOGIN_USER_PER_MINUTE"
+    )
+    login_user_burst: int = Field(
+        default=5, validation_alias="AUTH_LOGIN_USER_BURST"
+    )
+    login_ip_per_minute: float = Field(
+        default=60, validation_alias="AUTH_LOGIN_IP_PER_MINUTE"
+    )
+    login_ip_burst: int = Field(
+        default=20, validation_alias="AUTH_LOGIN_IP_BURST"
+    )
+    trusted_proxies: list[str] = Field(
+        default=[], validation_alias="AUTH_TRUSTED_PROXIES"
+    )
+    metrics_token: str | None = Field(
+        default=None, validation_alias="METRICS_TOKEN"
+    )
 
 
 class DatabaseSettings(BaseSettings):
     pg_dsn: PostgresDsn = Field(validation_alias="DB_URL")
     shared_schema: str = Field(validation_alias="SHARED_SCHEMA_NAME")
+    template_schema: str = Field(
+        default="tenant_template",
+        validation_alias="TENANT_TEMPLATE_SCHEMA_NAME",
+    )
+    pool_size: int = Field(default=5, validation_alias="DB_POOL_SIZE")
+    max_overflow: int = Field(default=10, validation_alias="DB_MAX_OVERFLOW")
+    pool_timeout: int = Field(
+        default=30, validation_alias="DB_POOL_TIMEOUT_SECONDS"
+    )
+    pool_recycle: int = Field(
+        default=1800, validation_alias="DB_POOL_RECYCLE_SECONDS"
+    )
+    query_budget: int = Field(default=25, validation_alias="DB_QUERY_BUDGET")
+    replica_dsns: list[PostgresDsn] = Field(
+        default=[], validation_alias="DB_REPLICA_URLS"
+    )
+    replica_check: int = Field(
+        default=10, validation_alias="DB_REPLICA_CHECK_SECONDS"
+    )
+    replica_max_lag: float = Field(
+        default=5, validation_alias="DB_REPLICA_MAX_LAG_SECONDS"
+    )
+    # Whole seconds, as libpq takes them.
+    replica_connect_timeout: int = Field(
+        default=2, validation_alias="DB_REPLICA_CONNECT_TIMEOUT_SECONDS"
+    )
+    read_your_writes: float = Field(
+        default=5, validation_alias="DB_READ_YOUR_WRITES_SECONDS"
+    )
+    write_behind_batch_size: int = Field(
+        default=500, validation_alias="DB_WRITE_BEHIND_BATCH_SIZE"
+    )
+    write_behind_interval: float = Field(
+        default=1, validation_alias="DB_WRITE_BEHIND_FLUSH_SECONDS"
+    )
+    write_behind_max_pending: int = Field(
+        default=10000, validation_alias="DB_WRITE_BEHIND_MAX_PENDING"
+    )
+    write_behind_max_wait: float = Field(
+        default=0.05, validation_alias="DB_WRITE_BEHIND_MAX_WAIT_SECONDS"
+    )
+
+
+class CacheSettings(BaseSettings):
+    user_cache_size: int = Field(
+        default=4096, validation_alias="USER_CACHE_SIZE"
+    )
+    user_cache_ttl_seconds: int = Field(
+        default=60, validation_alias="USER_CACHE_TTL_SECONDS"
+    )
+    token_cache_size: int = Field(
+        default=10000, validation_alias="TOKEN_CACHE_SIZE"
+    )
+    redis_cache_ttl_seconds: int = Field(
+        default=300, validation_alias="REDIS_CACHE_TTL_SECONDS"
+    )
+    redis_max_connections: int = Field(
+        default=32, validation_alias="REDIS_MAX_CONNECTIONS"
+    )
+    redis_socket_timeout: float = Field(
+        default=1, validation_alias="REDIS_SOCKET_TIMEOUT_SECONDS"
+    )
+    redis_connect_timeout: float = Field(
+        default=1, validation_alias="REDIS_CONNECT_TIMEOUT_SECONDS"
+    )
+    tenant_refresh_seconds: int = Field(
+        default=30, validation_alias="TENANT_REGISTRY_REFRESH_SECONDS"
+    )
+    tenant_full_reload_seconds: int = Field(
+        default=3600, validation_alias="TENANT_REGISTRY_FULL_RELOAD_SECONDS"
+    )
+
+
+class TaskSettings(BaseSettings):
+    always_eager: bool = Field(
+        default=False, validation_alias="CELERY_TASK_ALWAYS_EAGER"
+    )
+    tenant_chunk_size: int = Field(
+        default=50, validation_alias="TENANT_TASK_CHUNK_SIZE"
+    )
+    tenant_concurrency: int = Field(
+        default=4, validation_alias="TENANT_TASK_CONCURRENCY"
+    )
+
+
+class CalDAVSettings(BaseSettings):
+    url: str | None = Field(default=None, validation_alias="CALDAV_URL")
+    username: str | None = Field(
+        default=None, validation_alias="CALDAV_USERNAME"
+    )
+    password: str | None = Field(
+        default=None, validation_alias="CALDAV_PASSWORD"
+    )
+    batch_size: int = Field(
+        default=200, validation_alias="CALDAV_SYNC_BATCH_SIZE"
+    )
+    sync_interval_seconds: int = Field(
+        default=300, validation_alias="CALDAV_SYNC_INTERVAL_SECONDS"
+    )
 
 
 class AppSettings(BaseSettings):
@@ -36,6 +183,9 @@ class AppSettings(BaseSettings):
     database: DatabaseSettings = Field(
         default_factory=DatabaseSettings  # type: ignore
     )
+    cache: CacheSettings = Field(default_factory=CacheSettings)
+    tasks: TaskSettings = Field(default_factory=TaskSettings)
+    caldav: CalDAVSettings = Field(default_factory=CalDAVSettings)
 
 
 Settings: AppSettings = AppSettings()  # type: ignore
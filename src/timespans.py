@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Callable, Generic, Iterable, TypeVar
+
+from pyintervals import Interval
+
+from src.data_model import HasTimespanMixin
+
+T = TypeVar("T")
+
+Span = tuple[datetime, datetime]
+
+
+def _span_of(item: HasTimespanMixin) -> Span:
+    return item.start, item.end
+
+
+# Subtrees of at most this level, 2 ** (level + 1) - 1 spans, are scanned
+# rather than walked.
+_SCAN_LEVEL = 3
+
+
+class TimespanIndex(Generic[T]):
+    """Overlap and free-gap queries over many spans, in memory.
+
+    Built once in O(n log n). The spans are kept sorted by start, and that
+    array doubles as an implicit augmented interval tree: node ``i`` is at
+    the level ``k`` of the number of trailing one bits of ``i``, has its
+    children ``2 ** (k - 1)`` places to either side, and knows the latest
+    end within its subtree. Overlap queries walk the tree skipping
+    subtrees that end too early, in O(log n) plus O(log n) per overlap.
+    Another array holds how many spans are active from each point in time
+    on, which the binary searches of `busy_at` and `gaps` use. Spans are
+    half-open `pyintervals.Interval` s, ``[start, end)``, and zero-length
+    spans are ignored.
+    """
+
+    def __init__(
+        self,
+        items: Iterable[T],
+        span: Callable[[T], Span] = _span_of,  # type: ignore[assignment]
+    ) -> None:
+        spans = sorted(
+            (
+                (Interval(start, end), item)
+                for item in items
+                for start, end in [span(item)]
+                if start < end
+            ),
+            key=lambda pair: pair[0].start,
+        )
+        self._items = [item for _, item in spans]
+        self._starts = [interval.start for interval, _ in spans]
+        self._ends = [interval.end for interval, _ in spans]
+        self._max_ends = _subtree_max_ends(self._ends)
+        self._root_level = len(spans).bit_length() - 1
+
+        changes: dict[datetime, int] = {}
+        for interval, _ in spans:
+            changes[interval.start] = changes.get(interval.start, 0) + 1
+            changes[interval.end] = changes.get(interval.end, 0) - 1
+        self._times = sorted(changes)
+        self._active = list(accumulate(changes[t] for t in self._times))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def busy_at(self, when: datetime) -> int:
+        """How many spans cover `when`."""
+        i = bisect_right(self._times, when) - 1
+        return self._active[i] if i >= 0 else 0
+
+    def overlapping(self, start: datetime, end: datetime) -> list[T]:
+        """The items whose span overlaps ``[start, end)``, by start."""
+        # Spans from `stop` on start too late; a point in time is also
+        # overlapped by the spans starting right at it.
+        bound = bisect_right if start == end else bisect_left
+        stop = bound(self._starts, end)
+        if not stop:
+            return []
+        ends, max_ends = self._ends, self._max_ends
+        found: list[T] = []
+        # In order: a node is pushed back once to be taken after its left
+        # subtree. Nodes past the array stand in for their left subtree.
+        stack = [((1 << self._root_level) - 1, self._root_level, False)]
+        while stack:
+            node, level, left_done = stack.pop()
+            first = node >> level << level
+            if first >= stop:
+                continue
+            if level <= _SCAN_LEVEL:
+                last = min(node + (1 << level), stop)
+                found += (
+                    self._items[i]
+                    for i in range(first, last)
+                    if ends[i] > start
+                )
+            elif not left_done:
+                stack.append((node, level, True))
+                left = node - (1 << (level - 1))
+                if left >= len(ends) or max_ends[left] > start:
+                    stack.append((left, level - 1, False))
+            elif node < stop:
+                if ends[node] > start:
+                    found.append(self._items[node])
+                right = node + (1 << (level - 1))
+                if right >= len(ends) or max_ends[right] > start:
+                    stack.append((right, level - 1, False))
+        return found
+
+    def gaps(
+        self,
+        start: datetime,
+        end: datetime,
+        min_length: timedelta = timedelta(0),
+    ) -> list[Span]:
+        """The free stretches of ``[start, end)``, in order.
+
+        Stretches shorter than `min_length` are left out.
+        """
+        gaps: list[Span] = []
+        gap_start = start if self.busy_at(start) == 0 else None
+        first = bisect_right(self._times, start)
+        stop = bisect_left(self._times, end)
+        for time, active in zip(
+            self._times[first:stop], self._active[first:stop]
+        ):
+            if active == 0 and gap_start is None:
+                gap_start = time
+            elif active and gap_start is not None:
+                gaps.append((gap_start, time))
+                gap_start = None
+        if gap_start is not None:
+            gaps.append((gap_start, end))
+        return [(a, b) for a, b in gaps if b - a >= min_length]
+
+
+def _subtree_max_ends(ends: list[datetime]) -> list[datetime]:
+    """The latest end within the subtree of each node, bottom up.
+
+    A right child past the array stands for the rest of it, the nodes
+    between its parent and the end of the array.
+    """
+    size = len(ends)
+    max_ends = list(ends)
+    rest = list(accumulate(reversed(ends), max))[::-1]
+    level = 1
+    while 1 << level <= size:
+        half = 1 << (level - 1)
+        for i in range((1 << level) - 1, size, 1 << (level + 1)):
+            if i + half < size:
+                right = max_ends[i + half]
+            else:
+                right = rest[i + 1] if i + 1 < size else ends[i]
+            max_ends[i] = max(ends[i], max_ends[i - half], right)
+        level += 1
+    return max_ends
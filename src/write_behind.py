@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import datetime
+from itertools import islice
+from typing import Any, Iterator, NamedTuple
+
+from sqlalchemy import insert, update
+
+from src.data_model import AuditEvent, User
+from src.db import new_async_db_session
+from src.metrics import gauge
+from src.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class AuditRecord(NamedTuple):
+    kind: str
+    occurred_at: datetime
+    user_id: int | None = None
+    tenant_id: int | None = None
+    client_ip: str | None = None
+
+
+class WriteBehindBuffer:
+    """Bookkeeping writes of this process, buffered and written in batches.
+
+    Writes are queued in memory and returned from at once; `run` flushes
+    them whenever ``batch_size`` are pending or ``interval`` seconds have
+    passed, audit events as multi-row inserts and user updates as a single
+    executemany of one statement. Updates of the same user are coalesced,
+    the latest value of a column winning.
+
+    A failed flush puts its writes back to be retried. Once ``max_pending``
+    writes are waiting, callers wait up to ``max_wait`` seconds for a flush
+    to make room, then their write is dropped and counted: losing some
+    bookkeeping beats stalling logins while the database is away. `close`
+    writes out what is left.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_size: int,
+        interval: float,
+        max_pending: int,
+        max_wait: float,
+    ) -> None:
+        self.name = name
+        self._batch_size = batch_size
+        self._interval = interval
+        self._max_pending = max_pending
+        self._max_wait = max_wait
+        self._audit: list[AuditRecord] = []
+        self._user_updates: dict[int, dict[str, Any]] = {}
+        self._due = asyncio.Event()
+        self._room = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self.dropped = 0
+        self._dropping = False
+        gauge(
+            "write_behind_pending",
+            "Writes waiting to be flushed.",
+            lambda: len(self),
+            buffer=name,
+        )
+        gauge(
+            "write_behind_dropped_total",
+            "Writes dropped for lack of room.",
+            lambda: self.dropped,
+            kind="counter",
+            buffer=name,
+        )
+
+    def __len__(self) -> int:
+        return len(self._audit) + len(self._user_updates)
+
+    async def record(self, event: AuditRecord) -> None:
+        if await self._admit():
+            self._audit.append(event)
+            self._added()
+
+    async def update_user(self, user_id: int, **values: Any) -> None:
+        if user_id in self._user_updates:
+            self._user_updates[user_id].update(values)
+        elif await self._admit():
+            self._user_updates.setdefault(user_id, {}).update(values)
+            self._added()
+
+    async def _admit(self) -> bool:
+        while len(self) >= self._max_pending:
+            self._room.clear()
+            self._due.set()
+            try:
+                await asyncio.wait_for(self._room.wait(), self._max_wait)
+            except asyncio.TimeoutError:
+                self._drop(1)
+                return False
+        return True
+
+    def _drop(self, count: int) -> None:
+        if not self._dropping:
+            logger.warning(
+                f"Write-behind buffer {self.name} full, dropping writes."
+            )
+            self._dropping = True
+        self.dropped += count
+
+    def _added(self) -> None:
+        if len(self) >= self._batch_size:
+            self._due.set()
+
+    async def run(self) -> None:
+        """Flush on size or time until cancelled."""
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._due.wait(), self._interval)
+            self._due.clear()
+            if not await self.flush():
+                # Back off rather than retry at the pace of new writes.
+                await asyncio.sleep(self._interval)
+
+    async def close(self) -> None:
+        if not await self.flush() and len(self):
+            logger.error(
+                f"Write-behind buffer {self.name} lost {len(self)} writes."
+            )
+
+    async def flush(self) -> bool:
+        """Write out what is pending; False if that failed."""
+        async with self._flush_lock:
+            audit, updates = self._audit, self._user_updates
+            if not audit and not updates:
+                return True
+            self._audit, self._user_updates = [], {}
+            try:
+                async with new_async_db_session(
+                    Settings.database.shared_schema
+                ) as session:
+                    # Bookkeeping is no client's own write: reads of the
+                    # shared schema need not move to the primary for it.
+                    session.info.pop("schema", None)
+                    if updates:
+                        await session.execute(
+                            update(User),
+                            [{"id": k, **v} for k, v in updates.items()],
+                        )
+                    for batch in _batched(audit, self._batch_size):
+                        await session.execute(
+                            insert(AuditEvent).values(
+                                [event._asdict() for event in batch]
+                            )
+                        )
+            except BaseException as e:
+                self._requeue(audit, updates)
+                if not isinstance(e, Exception):
+                    raise
+                logger.exception(
+                    f"Flushing write-behind buffer {self.name} failed."
+                )
+                return False
+            self._room.set()
+            self._dropping = False
+            return True
+
+    def _requeue(
+        self, audit: list[AuditRecord], updates: dict[int, dict[str, Any]]
+    ) -> None:
+        for user_id, values in updates.items():
+            self._user_updates[user_id] = {
+                **values,
+                **self._user_updates.get(user_id, {}),
+            }
+        self._audit[:0] = audit
+        # The oldest events go first; user updates are too few to matter.
+        excess = min(len(self) - self._max_pending, len(self._audit))
+        if excess > 0:
+            del self._audit[:excess]
+            self._drop(excess)
+
+
+def _batched(
+    items: list[AuditRecord], size: int
+) -> Iterator[list[AuditRecord]]:
+    remaining = iter(items)
+    return iter(lambda: list(islice(remaining, size)), [])
+
+
+write_behind = WriteBehindBuffer(
+    "bookkeeping",
+    batch_size=Settings.database.write_behind_batch_size,
+    interval=Settings.database.write_behind_interval,
+    max_pending=Settings.database.write_behind_max_pending,
+    max_wait=Settings.database.write_behind_max_wait,
+)
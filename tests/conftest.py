@@ -0,0 +1,158 @@
+"""Shared fixtures.
+
+Settings not given in the environment are taken from ``.env.example``.
+Tests needing Postgres use the database of ``DB_URL``, migrated to head,
+and are skipped when it cannot be reached.
+"""
+
+from __future__ import annotations
+
+import os
+import uuid
+from functools import partial
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterator, NamedTuple, TypeVar
+
+import fakeredis
+import httpx
+import pytest
+from anyio.from_thread import BlockingPortal, start_blocking_portal
+from dotenv import dotenv_values
+
+ROOT = Path(__file__).parents[1]
+
+T = TypeVar("T")
+
+for _key, _value in dotenv_values(ROOT / ".env.example").items():
+    if _value is not None:
+        os.environ.setdefault(_key, _value)
+
+
+@pytest.fixture(scope="session")
+def database() -> Iterator[None]:
+    from sqlalchemy import create_engine
+    from sqlalchemy.exc import OperationalError
+
+    from alembic import command
+    from alembic.config import Config
+    from src.db import dispose_engines
+    from src.settings import Settings
+
+    probe = create_engine(
+        Settings.database.pg_dsn.unicode_string(),
+        connect_args={"connect_timeout": 2},
+    )
+    try:
+        with probe.connect():
+            pass
+    except OperationalError:
+        pytest.skip("No database at DB_URL.")
+    finally:
+        probe.dispose()
+
+    # Without a config file, so that logging is left as the tests set it.
+    config = Config()
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.upgrade(config, "head")
+    yield
+    dispose_engines()
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+def redis(monkeypatch: pytest.MonkeyPatch) -> fakeredis.FakeServer:
+    """Redis clients of `src.redis_client` backed by an in-memory server.
+
+    Setting ``connected`` of the server to False makes every call fail.
+    """
+    from src import redis_client
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        redis_client, "_redis", fakeredis.FakeRedis(server=server)
+    )
+    monkeypatch.setattr(
+        redis_client, "_async_redis", fakeredis.FakeAsyncRedis(server=server)
+    )
+    return server
+
+
+class ApiClient:
+    """Calls the app in process, on the event loop of a thread of its own.
+
+    Calls may come from any number of threads; they all share that loop,
+    like the requests served by one worker.
+    """
+
+    def __init__(self, portal: BlockingPortal, client: httpx.AsyncClient):
+        self._portal = portal
+        self._client = client
+
+    def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self._portal.call(partial(self._client.get, url, **kwargs))
+
+    def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self._portal.call(partial(self._client.post, url, **kwargs))
+
+    def call(self, func: Callable[..., Awaitable[T]], *args: Any) -> T:
+        """Await `func` on the loop of the app."""
+        return self._portal.call(func, *args)
+
+
+@pytest.fixture
+def api(database: None, redis: fakeredis.FakeServer) -> Iterator[ApiClient]:
+    from app.api.app import app
+    from src.db import dispose_async_engines
+
+    with start_blocking_portal() as portal:
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),  # type: ignore[arg-type]
+            base_url="http://test",
+        )
+        yield ApiClient(portal, client)
+        portal.call(client.aclose)
+        # Pooled connections belong to the loop of the portal.
+        portal.call(dispose_async_engines)
+
+
+class LoginUser(NamedTuple):
+    id: int
+    name: str
+    password: str
+    tenant_id: int
+
+
+@pytest.fixture
+def login_user(database: None) -> Iterator[LoginUser]:
+    """A user of a tenant of its own, removed afterwards."""
+    from sqlalchemy import delete
+
+    from src.data_model import Tenant, User
+    from src.db import new_db_session
+    from src.security.password import password_hasher
+    from src.settings import Settings
+
+    name = f"test-{uuid.uuid4().hex[:12]}"
+    password = "correct horse battery staple"
+    with new_db_session(Settings.database.shared_schema) as session:
+        tenant = Tenant(name=name, schema=name.replace("-", "_"), active=True)
+        session.add(tenant)
+        session.flush()
+        user = User(
+            tenant_id=tenant.id,
+            name=name,
+            password=password_hasher.context.hash(password),
+            email=f"{name}@example.com",
+            active=True,
+        )
+        session.add(user)
+        session.flush()
+        created = LoginUser(user.id, name, password, tenant.id)
+    yield created
+    with new_db_session(Settings.database.shared_schema) as session:
+        session.execute(delete(User).where(User.id == created.id))
+        session.execute(delete(Tenant).where(Tenant.id == created.tenant_id))
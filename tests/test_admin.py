@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import json
+import uuid
+from typing import Any, Iterator
+
+import pytest
+from sqlalchemy import delete, select, update
+
+from src.data_model import Tenant, User
+from src.db import new_db_session
+from src.multitenancy.registry import tenant_registry
+from src.settings import Settings
+
+SHARED = Settings.database.shared_schema
+TOKEN = "/api/v1/authentication/token"
+ADMIN = "/api/v1/admin"
+
+
+def _bearer(api, user) -> dict[str, str]:
+    response = api.post(
+        TOKEN, data={"username": user.name, "password": user.password}
+    )
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def admin(api, login_user) -> Iterator[dict[str, str]]:
+    """Headers of a user of a default tenant."""
+    with new_db_session(SHARED) as session:
+        session.execute(
+            update(Tenant)
+            .where(Tenant.id == login_user.tenant_id)
+            .values(default_tenant=True)
+        )
+    api.call(tenant_registry.refresh)
+    yield _bearer(api, login_user)
+    tenant_registry.forget(login_user.tenant_id)
+
+
+@pytest.fixture
+def members(login_user) -> Iterator[list[int]]:
+    """Ids of five more users of the tenant of `login_user`."""
+    with new_db_session(SHARED) as session:
+        users = [
+            User(
+                tenant_id=login_user.tenant_id,
+                name=f"{login_user.name}-{i}",
+                password="not a hash",
+                email=f"{login_user.name}-{i}@example.com",
+                active=True,
+            )
+            for i in range(5)
+        ]
+        session.add_all(users)
+        session.flush()
+        ids = [login_user.id, *(u.id for u in users)]
+    yield ids
+    with new_db_session(SHARED) as session:
+        session.execute(delete(User).where(User.id.in_(ids[1:])))
+
+
+@pytest.fixture
+def other_tenant(database: None) -> Iterator[int]:
+    with new_db_session(SHARED) as session:
+        name = f"other-{uuid.uuid4().hex[:12]}"
+        tenant = Tenant(name=name, schema=name.replace("-", "_"))
+        session.add(tenant)
+        session.flush()
+        tenant_id = tenant.id
+    yield tenant_id
+    with new_db_session(SHARED) as session:
+        session.execute(delete(Tenant).where(Tenant.id == tenant_id))
+
+
+def _tenant_ids() -> list[int]:
+    with new_db_session(SHARED) as session:
+        return list(
+            session.scalars(
+                select(Tenant.id)
+                .where(Tenant.filter_deleted_out())
+                .order_by(Tenant.id)
+            )
+        )
+
+
+def _pages(
+    api, path: str, headers: dict[str, str], **params: Any
+) -> list[list[dict[str, Any]]]:
+    """All pages, following ``next_after`` until there is none."""
+    pages, after = [], 0
+    while after is not None:
+        response = api.get(
+            path, headers=headers, params={**params, "after": after}
+        )
+        assert response.status_code == 200
+        page = response.json()
+        pages.append(page["items"])
+        after = page["next_after"]
+    return pages
+
+
+def test_users_are_paged(api, admin, members, login_user) -> None:
+    pages = _pages(
+        api,
+        f"{ADMIN}/users",
+        admin,
+        tenant_id=login_user.tenant_id,
+        limit=2,
+    )
+
+    assert [len(page) for page in pages] == [2, 2, 2, 0]
+    ids = [item["user_id"] for page in pages for item in page]
+    assert ids == sorted(members)
+    assert all(
+        item["tenant_id"] == login_user.tenant_id
+        for page in pages
+        for item in page
+    )
+
+
+def test_users_are_filtered_by_tenant(api, admin, members) -> None:
+    response = api.get(
+        f"{ADMIN}/users", headers=admin, params={"tenant_id": -1}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"items": [], "next_after": None}
+
+
+def test_tenants_are_paged(api, admin, other_tenant) -> None:
+    expected = _tenant_ids()
+
+    # One a page, as there may be no more tenants than the two made here.
+    pages = _pages(api, f"{ADMIN}/tenants", admin, limit=1)
+
+    assert len(expected) >= 2
+    assert [len(page) for page in pages] == [1] * len(expected) + [0]
+    assert [item["tenant_id"] for page in pages for item in page] == expected
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/tenants", "/users", "/tenants/export", "/users/export"],
+)
+def test_only_the_default_tenant_administers(
+    api, login_user, path: str
+) -> None:
+    api.call(tenant_registry.refresh)
+
+    response = api.get(f"{ADMIN}{path}", headers=_bearer(api, login_user))
+
+    assert response.status_code == 403
+
+
+def test_admin_needs_a_login(api) -> None:
+    assert api.get(f"{ADMIN}/tenants").status_code == 401
+
+
+def _lines(response) -> list[dict[str, Any]]:
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.text.endswith("\n")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_users_export(api, admin, members, login_user) -> None:
+    response = api.get(
+        f"{ADMIN}/users/export",
+        headers=admin,
+        params={"tenant_id": login_user.tenant_id},
+    )
+
+    assert [row["user_id"] for row in _lines(response)] == sorted(members)
+
+
+def test_tenants_export(api, admin, login_user) -> None:
+    expected = _tenant_ids()
+
+    rows = _lines(api.get(f"{ADMIN}/tenants/export", headers=admin))
+
+    assert [row["tenant_id"] for row in rows] == expected
+    (own,) = [r for r in rows if r["tenant_id"] == login_user.tenant_id]
+    assert own["name"] == login_user.name and own["default_tenant"]
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.api.app import app
+from app.api.v1.security.authentication import _throttle_login
+from src.security.password import HashingSaturatedError, password_hasher
+
+TOKEN = "/api/v1/authentication/token"
+
+
+@pytest.fixture
+def unthrottled():
+    app.dependency_overrides[_throttle_login] = lambda: None
+    yield
+    del app.dependency_overrides[_throttle_login]
+
+
+def _login(api, user, password=None):
+    return api.post(
+        TOKEN,
+        data={"username": user.name, "password": password or user.password},
+    )
+
+
+def test_login(api, login_user) -> None:
+    response = _login(api, login_user)
+
+    assert response.status_code == 200
+    assert response.json()["token_type"] == "bearer"
+    assert "refresh_token" in response.cookies
+
+
+def test_wrong_password(api, login_user) -> None:
+    assert _login(api, login_user, "wrong").status_code == 401
+
+
+def test_saturated_hashing_pool_rejects_logins(
+    api, login_user, mocker
+) -> None:
+    mocker.patch.object(
+        password_hasher,
+        "verify_and_update",
+        side_effect=HashingSaturatedError("full"),
+    )
+
+    response = _login(api, login_user)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.benchmark(group="health-check-during-login-storm")
+def test_health_check_during_login_storm(
+    benchmark, api, login_user, unthrottled
+) -> None:
+    latencies = []
+
+    def health_check() -> None:
+        start = time.perf_counter()
+        assert api.get("/api/v1/health-check").status_code == 204
+        latencies.append(time.perf_counter() - start)
+
+    stop = threading.Event()
+
+    def storm() -> None:
+        while not stop.is_set():
+            _login(api, login_user)
+
+    with ThreadPoolExecutor(8) as pool:
+        for _ in range(8):
+            pool.submit(storm)
+        try:
+            time.sleep(0.5)
+            benchmark.pedantic(health_check, rounds=200)
+        finally:
+            stop.set()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    benchmark.extra_info["p99_seconds"] = p99
+    # With bcrypt on the event loop, a probe waits for whole hashes.
+    assert p99 < 0.1
+
+
+REFRESH = "/api/v1/authentication/refresh"
+PING = "/api/v1/authentication/ping"
+LOGOUT = "/api/v1/authentication/logout"
+
+
+def _refresh(api, refresh_token: str):
+    # As a header, so that cookies kept by the client from earlier
+    # responses are not sent along.
+    return api.post(
+        REFRESH, headers={"Cookie": f"refresh_token={refresh_token}"}
+    )
+
+
+def _bearer(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_refresh_rotates_the_token(api, login_user) -> None:
+    first = _login(api, login_user).cookies["refresh_token"]
+
+    response = _refresh(api, first)
+    assert response.status_code == 200
+    second = response.cookies["refresh_token"]
+    access = response.json()["access_token"]
+    assert api.get(PING, headers=_bearer(access)).status_code == 200
+
+    assert _refresh(api, first).status_code == 401
+    # Reusing the first token revoked the whole family.
+    assert _refresh(api, second).status_code == 401
+
+
+def test_tokens_are_not_interchangeable(api, login_user) -> None:
+    response = _login(api, login_user)
+    access = response.json()["access_token"]
+    refresh = response.cookies["refresh_token"]
+
+    assert api.get(PING, headers=_bearer(access)).status_code == 200
+    assert api.get(PING, headers=_bearer(refresh)).status_code == 401
+    assert _refresh(api, access).status_code == 401
+
+
+def test_login_without_redis_leaves_out_the_refresh_token(
+    api, login_user, redis
+) -> None:
+    redis.connected = False
+
+    response = _login(api, login_user)
+
+    assert response.status_code == 200
+    assert "refresh_token" not in response.cookies
+    assert _refresh(api, "").status_code == 400
+
+
+def test_refresh_without_redis(api, login_user, redis) -> None:
+    refresh = _login(api, login_user).cookies["refresh_token"]
+    redis.connected = False
+
+    response = _refresh(api, refresh)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def _logout(api, refresh_token: str):
+    return api.post(
+        LOGOUT, headers={"Cookie": f"refresh_token={refresh_token}"}
+    )
+
+
+def test_logout_revokes_the_refresh_token(api, login_user) -> None:
+    refresh = _login(api, login_user).cookies["refresh_token"]
+
+    response = _logout(api, refresh)
+
+    assert response.status_code == 204
+    assert 'refresh_token=""' in response.headers["set-cookie"]
+    assert _refresh(api, refresh).status_code == 401
+
+
+def test_logout_without_redis(api, login_user, redis) -> None:
+    refresh = _login(api, login_user).cookies["refresh_token"]
+    redis.connected = False
+
+    response = _logout(api, refresh)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert "set-cookie" not in response.headers
+    redis.connected = True
+    assert _logout(api, refresh).status_code == 204
+    assert _refresh(api, refresh).status_code == 401
+
+
+def test_concurrent_reuse_lets_one_refresh_through(api, login_user) -> None:
+    refresh = _login(api, login_user).cookies["refresh_token"]
+
+    with ThreadPoolExecutor(8) as pool:
+        responses = pool.map(lambda _: _refresh(api, refresh), range(8))
+        statuses = [response.status_code for response in responses]
+
+    assert statuses.count(200) == 1
+    assert statuses.count(401) == 7
+
+
+@pytest.mark.benchmark(group="refresh-tokens")
+def test_refresh_load(benchmark, api, login_user, unthrottled) -> None:
+    clients = 16
+    tokens = [
+        _login(api, login_user).cookies["refresh_token"]
+        for _ in range(clients)
+    ]
+
+    def refresh(token: str) -> str:
+        response = _refresh(api, token)
+        assert response.status_code == 200
+        return response.cookies["refresh_token"]
+
+    def refresh_all() -> None:
+        with ThreadPoolExecutor(clients) as pool:
+            tokens[:] = pool.map(refresh, tokens)
+
+    rounds = 20
+    start = time.perf_counter()
+    benchmark.pedantic(refresh_all, rounds=rounds)
+    seconds = time.perf_counter() - start
+    benchmark.extra_info["refreshes_per_second"] = clients * rounds / seconds
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import time
+import uuid
+from typing import Any, Iterator
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from src.data_model import Tenant, User
+from src.db import new_db_session
+from src.multitenancy import bulk_import
+from src.settings import Settings
+
+USERS = 100_000
+
+
+@pytest.fixture
+def tenant(database: None) -> Iterator[str]:
+    """The name of a tenant, removed afterwards with all of its users."""
+    name = f"import-{uuid.uuid4().hex[:12]}"
+    with new_db_session(Settings.database.shared_schema) as session:
+        created = Tenant(name=name, schema=name.replace("-", "_"))
+        session.add(created)
+        session.flush()
+        tenant_id = created.id
+    yield name
+    with new_db_session(Settings.database.shared_schema) as session:
+        session.execute(delete(User).where(User.tenant_id == tenant_id))
+        session.execute(delete(Tenant).where(Tenant.id == tenant_id))
+
+
+@pytest.fixture
+def unhashed(mocker) -> None:
+    # Hashing 100k passwords at full cost takes hours of CPU; what is
+    # measured here is getting the rows into the database.
+    mocker.patch.object(
+        bulk_import,
+        "_hash_batch",
+        side_effect=lambda _, batch, __: iter(r["password"] for r in batch),
+    )
+
+
+def _records(tenant: str, count: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "tenant": tenant,
+            "name": f"{tenant}-{i}",
+            "password": "x",
+            "email": f"{i}@{tenant}.example.com",
+        }
+        for i in range(count)
+    ]
+
+
+def _users_of(tenant: str) -> int:
+    with new_db_session(Settings.database.shared_schema) as session:
+        return session.scalars(
+            select(func.count())
+            .select_from(User)
+            .join(User.tenant)
+            .where(Tenant.name == tenant)
+        ).one()
+
+
+def _insert_row_by_row(records: list[dict[str, Any]]) -> float:
+    # One INSERT per user, as the ORM does when adding users one by one.
+    start = time.perf_counter()
+    with new_db_session(Settings.database.shared_schema) as session:
+        tenant_id = session.scalars(
+            select(Tenant.id).where(Tenant.name == records[0]["tenant"])
+        ).one()
+        for record in records:
+            session.add(
+                User(
+                    tenant_id=tenant_id,
+                    name=record["name"],
+                    password=record["password"],
+                    email=record["email"],
+                    active=True,
+                )
+            )
+            session.flush()
+    return time.perf_counter() - start
+
+
+@pytest.mark.benchmark(group="import-users")
+def test_import_users_with_copy(benchmark, tenant: str, unhashed) -> None:
+    records = _records(tenant, USERS)
+
+    report = benchmark.pedantic(
+        bulk_import.import_users, args=(records,), rounds=1
+    )
+
+    benchmark.extra_info["rows_per_second"] = report.rows_per_second
+    assert report.inserted == USERS
+    assert _users_of(tenant) == USERS
+
+
+@pytest.mark.benchmark(group="import-users")
+def test_insert_users_row_by_row(benchmark, tenant: str) -> None:
+    # A tenth as many, which already takes several seconds; compare the
+    # rows per second.
+    records = _records(tenant, USERS // 10)
+
+    seconds = benchmark.pedantic(_insert_row_by_row, args=(records,), rounds=1)
+
+    benchmark.extra_info["rows_per_second"] = len(records) / seconds
+    assert _users_of(tenant) == len(records)
+
+
+def test_import_skips_taken_names(tenant: str, unhashed) -> None:
+    bulk_import.import_users(_records(tenant, 3))
+
+    report = bulk_import.import_users(_records(tenant, 5), batch_size=2)
+
+    assert (report.read, report.inserted) == (5, 2)
+    assert _users_of(tenant) == 5
+
+
+def test_import_hashes_passwords(tenant: str) -> None:
+    bulk_import.import_users(_records(tenant, 2), workers=1)
+
+    with new_db_session(Settings.database.shared_schema) as session:
+        hashed = session.scalars(
+            select(User.password)
+            .join(User.tenant)
+            .where(Tenant.name == tenant)
+        ).all()
+    assert len(hashed) == 2
+    assert all(h.startswith("$2b$") for h in hashed)
+
+
+def test_unknown_tenant_aborts_the_import(tenant: str, unhashed) -> None:
+    records = _records(tenant, 2) + _records("no-such-tenant", 1)
+
+    with pytest.raises(ValueError, match="no-such-tenant"):
+        bulk_import.import_users(records)
+
+    assert _users_of(tenant) == 0
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+
+import fakeredis
+import pytest
+
+from src import caching
+from src.caching import LocalCache, TieredCache, listen_for_invalidations
+from src.redis_client import get_async_redis
+
+pytestmark = pytest.mark.anyio
+
+
+def _worker_cache() -> TieredCache[int, str]:
+    # The same cache as another worker process would have it.
+    return TieredCache(
+        LocalCache("users", maxsize=16, ttl=60),
+        ttl=60,
+        dump=lambda value: value,
+        load=bytes.decode,
+    )
+
+
+async def test_values_are_shared_through_redis(redis) -> None:
+    a, b = _worker_cache(), _worker_cache()
+    await a.set(1, "alice")
+
+    assert await b.get(1) == "alice"
+    assert b.remote_stats.hits == 1
+    assert b.local.get(1) == "alice"
+    assert await b.get(2) is None
+    assert b.remote_stats.misses == 1
+
+
+async def test_invalidation_reaches_other_workers(redis, monkeypatch) -> None:
+    a, b = _worker_cache(), _worker_cache()
+    monkeypatch.setattr(caching, "_tiered_caches", {"users": b})
+    await a.set(1, "alice")
+    await b.get(1)
+
+    listener = asyncio.create_task(listen_for_invalidations())
+    try:
+        while not (
+            await get_async_redis().pubsub_numsub(caching.INVALIDATION_CHANNEL)
+        )[0][1]:
+            await asyncio.sleep(0.01)
+        a.invalidate(1)
+        async with asyncio.timeout(1):
+            while b.local.get(1) is not None:
+                await asyncio.sleep(0.01)
+    finally:
+        listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await listener
+
+    assert await b.get(1) is None
+
+
+async def test_tag_invalidation(redis) -> None:
+    a, b = _worker_cache(), _worker_cache()
+    await a.set(1, "alice", tags=["tenant_a"])
+    await a.set(2, "bob", tags=["tenant_b"])
+
+    a.invalidate_tag("tenant_a")
+
+    assert a.local.get(1) is None
+    assert await b.get(1) is None
+    assert await b.get(2) == "bob"
+
+
+async def test_redis_outage_leaves_the_local_tier(
+    redis: fakeredis.FakeServer,
+) -> None:
+    a, b = _worker_cache(), _worker_cache()
+    redis.connected = False
+
+    await a.set(1, "alice")
+    a.invalidate_tag("tenant_a")  # Clears the local tier to be safe.
+    await a.set(2, "bob")
+
+    assert await a.get(2) == "bob"
+    assert await b.get(2) is None
+
+
+async def test_redis_outage_is_not_logged_on_every_call(
+    redis: fakeredis.FakeServer, caplog, monkeypatch
+) -> None:
+    cache = _worker_cache()
+    redis.connected = False
+
+    for _ in range(10):
+        assert await cache.get(1) is None
+    monkeypatch.setattr(
+        cache, "_warned_at", cache._warned_at - caching._OUTAGE_WARNING_SECONDS
+    )
+    await cache.get(1)
+
+    assert [r.getMessage() for r in caplog.records] == [
+        "Redis unavailable, skipping users tier.",
+        "Redis unavailable, skipping users tier."
+        " (9 more since the last warning)",
+    ]
@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+from xml.etree import ElementTree
+
+import caldav
+import pytest
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+
+from src.calendar_sync import add_calendar, sync_calendars
+from src.data_model import Calendar, CalendarEvent
+from src.db import get_engine, new_db_session
+from src.multitenancy.provisioning import clone_template
+from src.settings import Settings
+
+SCHEMA = "test_calendar_sync"
+START = datetime(2026, 3, 2, 9)
+
+DAV = "{DAV:}"
+CALDAV = "{urn:ietf:params:xml:ns:caldav}"
+CS = "{http://calendarserver.org/ns/}"
+NAMESPACES = (
+    'xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav" '
+    'xmlns:CS="http://calendarserver.org/ns/"'
+)
+
+
+def _event(uid: str, start: datetime = START, *lines: str) -> str:
+    body = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//test//EN",
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        "DTSTAMP:20260101T000000Z",
+        f"DTSTART:{start:%Y%m%dT%H%M%SZ}",
+        f"DTEND:{start + timedelta(hours=1):%Y%m%dT%H%M%SZ}",
+        f"SUMMARY:{uid}",
+        *lines,
+        "END:VEVENT",
+        "END:VCALENDAR",
+    ]
+    return "\r\n".join(body) + "\r\n"
+
+
+class CalDAVStandIn:
+    """A single calendar served over just enough CalDAV for the sync.
+
+    Answers the ctag and etag PROPFINDs, sync-collection reports (unless
+    ``sync_reports`` is off) and calendar-multiget reports. Every change
+    bumps the ctag and the sync token; `forget_tokens` expires the tokens
+    handed out so far.
+    """
+
+    def __init__(self) -> None:
+        self.resources: dict[str, tuple[str, str]] = {}  # href -> etag, data
+        self.sync_reports = True
+        self.requests: list[str] = []
+        self._version = 0
+        self._oldest_token = 0
+        self._changed: dict[str, int] = {}  # href -> version
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self._server.server_port}/calendar/"
+        threading.Thread(target=self._server.serve_forever).start()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _href(self, name: str) -> str:
+        return f"/calendar/{name}.ics"
+
+    def put(self, name: str, data: str) -> None:
+        self._version += 1
+        href = self._href(name)
+        self.resources[href] = (f'"{name}-{self._version}"', data)
+        self._changed[href] = self._version
+
+    def remove(self, name: str) -> None:
+        self._version += 1
+        href = self._href(name)
+        del self.resources[href]
+        self._changed[href] = self._version
+
+    def forget_tokens(self) -> None:
+        self._oldest_token = self._version
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args: object) -> None:
+                pass
+
+            def do_PROPFIND(self) -> None:
+                body = self._body()
+                stand_in.requests.append(f"PROPFIND {body.tag}")
+                if body.find(f".//{CS}getctag") is not None:
+                    ctag = f"<CS:getctag>{stand_in._version}</CS:getctag>"
+                    self._reply([_response("/calendar/", ctag)])
+                else:
+                    self._reply(
+                        [_response("/calendar/", "")]
+                        + [
+                            _response(href, f"<D:getetag>{etag}</D:getetag>")
+                            for href, (etag, _) in stand_in.resources.items()
+                        ]
+                    )
+
+            def do_REPORT(self) -> None:
+                body = self._body()
+                stand_in.requests.append(f"REPORT {body.tag}")
+                if body.tag == f"{DAV}sync-collection":
+                    self._sync(body.findtext(f"{DAV}sync-token") or "")
+                else:
+                    self._multiget(
+                        [href.text or "" for href in body.iter(f"{DAV}href")]
+                    )
+
+            def _sync(self, token: str) -> None:
+                if not stand_in.sync_reports:
+                    self.send_response(501)
+                    self.end_headers()
+                    return
+                if token and int(token) < stand_in._oldest_token:
+                    self._reply(
+                        ["<D:valid-sync-token/>"], status=403, root="error"
+                    )
+                    return
+                since = int(token) if token else -1
+                responses = []
+                for href, version in stand_in._changed.items():
+                    if version <= since:
+                        continue
+                    if href in stand_in.resources:
+                        etag, _ = stand_in.resources[href]
+                        prop = f"<D:getetag>{etag}</D:getetag>"
+                        responses.append(_response(href, prop))
+                    elif token:
+                        responses.append(
+                            f"<D:response><D:href>{href}</D:href>"
+                            "<D:status>HTTP/1.1 404 Not Found</D:status>"
+                            "</D:response>"
+                        )
+                token = f"<D:sync-token>{stand_in._version}</D:sync-token>"
+                self._reply(responses + [token])
+
+            def _multiget(self, hrefs: list[str]) -> None:
+                self._reply(
+                    [
+                        _response(
+                            href,
+                            f"<D:getetag>{etag}</D:getetag>"
+                            f"<C:calendar-data>{data}</C:calendar-data>",
+                        )
+                        for href in hrefs
+                        if href in stand_in.resources
+                        for etag, data in [stand_in.resources[href]]
+                    ]
+                )
+
+            def _body(self) -> ElementTree.Element:
+                length = int(self.headers.get("Content-Length", 0))
+                return ElementTree.fromstring(self.rfile.read(length))
+
+            def _reply(
+                self,
+                parts: list[str],
+                status: int = 207,
+                root: str = "multistatus",
+            ) -> None:
+                body = (
+                    '<?xml version="1.0" encoding="utf-8"?>'
+                    f"<D:{root} {NAMESPACES}>{''.join(parts)}</D:{root}>"
+                ).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def _response(href: str, props: str) -> str:
+    return (
+        f"<D:response><D:href>{href}</D:href><D:propstat>"
+        f"<D:prop>{props}</D:prop><D:status>HTTP/1.1 200 OK</D:status>"
+        "</D:propstat></D:response>"
+    )
+
+
+def _drop_schema() -> None:
+    with get_engine().begin() as connection:
+        connection.execute(text(f'DROP SCHEMA IF EXISTS "{SCHEMA}" CASCADE'))
+        connection.execute(
+            text(
+                f"DELETE FROM {Settings.database.shared_schema}"
+                ".tenant_migration WHERE schema = :schema"
+            ),
+            {"schema": SCHEMA},
+        )
+
+
+@pytest.fixture(scope="module")
+def tenant_schema(database: None) -> Iterator[str]:
+    # Left over should an earlier run have been cut short.
+    _drop_schema()
+    with get_engine().begin() as connection:
+        clone_template(connection, SCHEMA)
+    yield SCHEMA
+    _drop_schema()
+
+
+@pytest.fixture
+def session(tenant_schema: str) -> Iterator[Session]:
+    with new_db_session(tenant_schema) as session:
+        yield session
+        session.rollback()
+        session.execute(delete(CalendarEvent))
+        session.execute(delete(Calendar))
+
+
+@pytest.fixture
+def server(monkeypatch) -> Iterator[CalDAVStandIn]:
+    monkeypatch.setattr(Settings.caldav, "url", None)
+    monkeypatch.setattr(Settings.caldav, "batch_size", 2)
+    stand_in = CalDAVStandIn()
+    yield stand_in
+    stand_in.close()
+
+
+def _sync(session: Session):
+    [report] = sync_calendars(session)
+    return report
+
+
+def _stored(session: Session) -> dict[str, tuple[str, datetime]]:
+    events = session.scalars(select(CalendarEvent)).all()
+    return {event.uid: (event.etag, event.start) for event in events}
+
+
+def test_first_sync_fetches_every_event(session, server) -> None:
+    for i in range(5):
+        server.put(f"event{i}", _event(f"event{i}", START + timedelta(i)))
+    add_calendar(session, server.url)
+
+    report = _sync(session)
+
+    assert (report.updated, report.deleted, report.full) == (5, 0, True)
+    assert _stored(session) == {
+        f"event{i}": (etag, START + timedelta(i))
+        for i in range(5)
+        for etag, _ in [server.resources[f"/calendar/event{i}.ics"]]
+    }
+    # Batches of two.
+    assert server.requests.count(f"REPORT {CALDAV}calendar-multiget") == 3
+
+
+def test_unchanged_calendar_is_not_fetched(session, server) -> None:
+    server.put("event", _event("event"))
+    add_calendar(session, server.url)
+    _sync(session)
+    server.requests.clear()
+
+    report = _sync(session)
+
+    assert (report.updated, report.deleted) == (0, 0)
+    assert server.requests == [f"PROPFIND {DAV}propfind"]
+
+
+def test_changes_are_synced_incrementally(session, server) -> None:
+    for name in ["kept", "moved", "removed"]:
+        server.put(name, _event(name))
+    add_calendar(session, server.url)
+    _sync(session)
+
+    server.put("moved", _event("moved", START + timedelta(days=1)))
+    server.remove("removed")
+    server.put("added", _event("added"))
+    server.requests.clear()
+    report = _sync(session)
+
+    assert (report.updated, report.deleted, report.full) == (2, 1, False)
+    stored = _stored(session)
+    assert sorted(stored) == ["added", "kept", "moved"]
+    assert stored["moved"][1] == START + timedelta(days=1)
+    assert server.requests.count(f"REPORT {CALDAV}calendar-multiget") == 1
+
+
+def test_expired_sync_token_falls_back_to_a_full_listing(
+    session, server
+) -> None:
+    for name in ["kept", "removed"]:
+        server.put(name, _event(name))
+    add_calendar(session, server.url)
+    _sync(session)
+
+    server.remove("removed")
+    server.forget_tokens()
+    server.requests.clear()
+    report = _sync(session)
+
+    assert (report.updated, report.deleted, report.full) == (0, 1, True)
+    assert sorted(_stored(session)) == ["kept"]
+    # Nothing downloaded again.
+    assert f"REPORT {CALDAV}calendar-multiget" not in server.requests
+
+
+def test_server_without_sync_reports(session, server) -> None:
+    server.sync_reports = False
+    for name in ["kept", "changed", "removed"]:
+        server.put(name, _event(name))
+    add_calendar(session, server.url)
+    assert _sync(session).updated == 3
+
+    server.put("changed", _event("changed", START + timedelta(hours=2)))
+    server.remove("removed")
+    report = _sync(session)
+
+    assert (report.updated, report.deleted, report.full) == (1, 1, True)
+    stored = _stored(session)
+    assert sorted(stored) == ["changed", "kept"]
+    assert stored["changed"][1] == START + timedelta(hours=2)
+
+
+def test_events_that_cannot_be_stored_are_skipped(session, server) -> None:
+    without_start = _event("without-start").replace(
+        f"DTSTART:{START:%Y%m%dT%H%M%SZ}\r\n", ""
+    )
+    server.put("without-start", without_start)
+    server.put(
+        "override", _event("override", START, "RECURRENCE-ID:20260302T090000Z")
+    )
+    server.put("daily", _event("daily", START, "RRULE:FREQ=DAILY"))
+    add_calendar(session, server.url)
+
+    assert _sync(session).updated == 1
+
+    [event] = session.scalars(select(CalendarEvent)).all()
+    assert (event.uid, event.recurring) == ("daily", True)
+
+
+def test_every_calendar_is_synced_with_a_client_of_its_own(
+    session, server
+) -> None:
+    other = CalDAVStandIn()
+    try:
+        server.put("here", _event("here"))
+        other.put("there", _event("there"))
+        add_calendar(session, server.url)
+        add_calendar(session, other.url)
+
+        reports = sync_calendars(session)
+
+        assert [report.updated for report in reports] == [1, 1]
+        assert sorted(_stored(session)) == ["here", "there"]
+    finally:
+        other.close()
+
+
+def test_unreachable_calendar_does_not_stop_the_others(
+    session, server
+) -> None:
+    unreachable = CalDAVStandIn()
+    unreachable.close()
+    server.put("here", _event("here"))
+    add_calendar(session, unreachable.url)
+    add_calendar(session, server.url)
+    session.commit()
+
+    [report] = sync_calendars(session)
+
+    assert report.url == server.url
+    calendars = session.scalars(select(Calendar).order_by(Calendar.id)).all()
+    assert [calendar.synced_at is not None for calendar in calendars] == [
+        False,
+        True,
+    ]
+
+
+def test_sync_with_a_given_client(session, server) -> None:
+    server.put("event", _event("event"))
+    add_calendar(session, server.url)
+
+    [report] = sync_calendars(session, caldav.DAVClient(url=server.url))
+
+    assert report.updated == 1
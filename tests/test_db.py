@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+from sqlalchemy import Engine, create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from src import db
+from src.data_model import Tenant
+from src.db import (
+    delete,
+    delete_async,
+    dispose_async_engines,
+    new_async_db_session,
+    new_db_session,
+)
+from src.settings import Settings
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def _open_session_with_own_engine(schema: str) -> None:
+    # How sessions were opened before the engine registry: a new engine,
+    # and so a new pool and connection, for every session.
+    engine = create_engine(
+        Settings.database.pg_dsn.unicode_string(),
+        pool_pre_ping=True,
+        pool_size=5,
+        max_overflow=10,
+    )
+    factory = sessionmaker(
+        bind=engine.execution_options(schema_translate_map={None: schema})
+    )
+    with factory() as session:
+        session.execute(text("SELECT 1"))
+    # Not done back then, but leaking the connections would starve the
+    # server long before the benchmark ends.
+    engine.dispose()
+
+
+def _open_session(schema: str) -> None:
+    with new_db_session(schema) as session:
+        session.execute(text("SELECT 1"))
+
+
+@pytest.mark.benchmark(group="sessions-opened")
+def test_open_session_with_own_engine(benchmark) -> None:
+    benchmark(_open_session_with_own_engine, Settings.database.shared_schema)
+
+
+@pytest.mark.benchmark(group="sessions-opened")
+def test_open_session(benchmark) -> None:
+    benchmark(_open_session, Settings.database.shared_schema)
+
+
+def test_sessions_share_one_pool() -> None:
+    with new_db_session("tenant_a") as a, new_db_session("tenant_b") as b:
+        a_bind, b_bind = a.get_bind(), b.get_bind()
+    assert isinstance(a_bind, Engine) and isinstance(b_bind, Engine)
+    assert a_bind is not b_bind
+    assert a_bind.pool is b_bind.pool
+
+
+def test_deletion_hooks_run_once_before_and_once_after_commit(
+    monkeypatch,
+) -> None:
+    deleted: list[int] = []
+    monkeypatch.setattr(
+        db, "_deletion_hooks", [lambda deletable: deleted.append(deletable.id)]
+    )
+    with new_db_session(Settings.database.shared_schema) as session:
+        tenant = Tenant(name="test-deletion-hooks", schema="test_deletion")
+        session.add(tenant)
+        session.flush()
+
+        delete(tenant, session)
+
+        assert deleted == [tenant.id, tenant.id]
+        assert tenant.is_deleted
+        session.delete(tenant)
+
+
+@pytest.mark.anyio
+async def test_async_deletion_hooks_run_off_the_event_loop(
+    monkeypatch,
+) -> None:
+    loop_thread = threading.get_ident()
+    ran_in: list[int] = []
+    monkeypatch.setattr(
+        db, "_deletion_hooks", [lambda _: ran_in.append(threading.get_ident())]
+    )
+    try:
+        async with new_async_db_session(
+            Settings.database.shared_schema
+        ) as session:
+            tenant = Tenant(name="test-async-hooks", schema="test_async_hooks")
+            session.add(tenant)
+            await session.flush()
+
+            await delete_async(tenant, session)
+
+            assert len(ran_in) == 2
+            assert loop_thread not in ran_in
+            assert tenant.is_deleted
+            await session.delete(tenant)
+    finally:
+        await dispose_async_engines()
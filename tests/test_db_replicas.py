@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import time
+from typing import Iterator
+
+import pytest
+from pydantic import PostgresDsn
+from sqlalchemy import make_url, text, update
+from sqlalchemy.orm import Session
+
+from src import db, db_replicas
+from src.data_model import Tenant
+from src.db import new_async_db_session, new_db_session
+from src.settings import Settings
+
+SHARED = Settings.database.shared_schema
+
+# Stands in for a replica: another database of the same server, told
+# apart from the primary by its name. Not being in recovery, it reports
+# no lag.
+STAND_IN = "postgres"
+
+
+def _dsn(
+    database: str | None = None,
+    host: str | None = None,
+    port: int | None = None,
+) -> PostgresDsn:
+    url = make_url(Settings.database.pg_dsn.unicode_string()).set(
+        database=database, host=host, port=port
+    )
+    return PostgresDsn(url.render_as_string(hide_password=False))
+
+
+@pytest.fixture
+def replicas(database: None, monkeypatch) -> Iterator[list[PostgresDsn]]:
+    """The replica URLs, empty until the test adds some."""
+    dsns: list[PostgresDsn] = []
+    monkeypatch.setattr(Settings.database, "replica_dsns", dsns)
+    monkeypatch.setattr(db_replicas, "_last_write", {})
+    db.dispose_engines()
+    yield dsns
+    db.dispose_engines()
+
+
+def _database(session: Session) -> str:
+    return session.scalars(text("SELECT current_database()")).one()
+
+
+def test_reads_go_to_the_replica(replicas) -> None:
+    replicas.append(_dsn(database=STAND_IN))
+
+    with new_db_session(SHARED, read_only=True) as session:
+        assert _database(session) == STAND_IN
+    with new_db_session(SHARED) as session:
+        assert _database(session) != STAND_IN
+
+
+def test_reads_follow_writes_to_the_primary(replicas) -> None:
+    replicas.append(_dsn(database=STAND_IN))
+
+    with new_db_session(SHARED) as session:
+        session.execute(update(Tenant).where(Tenant.id < 0).values(name=""))
+
+    with new_db_session(SHARED, read_only=True) as session:
+        assert _database(session) != STAND_IN
+    with new_db_session("tenant_other", read_only=True) as session:
+        assert _database(session) == STAND_IN
+
+
+def test_sessions_without_writes_leave_reads_on_the_replica(replicas) -> None:
+    replicas.append(_dsn(database=STAND_IN))
+
+    with new_db_session(SHARED) as session:
+        session.execute(text("SELECT 1"))
+
+    with new_db_session(SHARED, read_only=True) as session:
+        assert _database(session) == STAND_IN
+
+
+def test_unreachable_replica_is_skipped(replicas) -> None:
+    # Nothing listens on port 1.
+    replicas.append(_dsn(database=STAND_IN, port=1))
+
+    with new_db_session(SHARED, read_only=True) as session:
+        assert _database(session) != STAND_IN
+    [replica] = db.get_replicas().replicas
+    assert not replica.usable
+
+
+def test_check_gives_up_after_connect_timeout(replicas, monkeypatch) -> None:
+    monkeypatch.setattr(Settings.database, "replica_connect_timeout", 1)
+    # Not routed, so connecting hangs rather than being refused.
+    replicas.append(_dsn(host="10.255.255.1"))
+
+    start = time.monotonic()
+    assert db.get_replicas().pick() is None
+    assert time.monotonic() - start < 2
+
+
+@pytest.mark.anyio
+async def test_async_reads_go_to_the_replica(replicas) -> None:
+    replicas.append(_dsn(database=STAND_IN))
+    try:
+        async with new_async_db_session(SHARED, read_only=True) as session:
+            database = await session.scalar(text("SELECT current_database()"))
+        assert database == STAND_IN
+    finally:
+        await db.dispose_async_engines()
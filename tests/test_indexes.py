@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Iterator
+
+import pytest
+from sqlalchemy import Select, text
+from sqlalchemy.dialects import postgresql
+
+from src.db import get_engine
+from src.multitenancy import tenant, user
+
+Explain = Callable[[Select], set[str]]
+
+
+@pytest.fixture(scope="module")
+def indexes_used(database: None) -> Iterator[Explain]:
+    """The indexes Postgres would use for a statement, in a populated table.
+
+    The rows, and the statistics they give the planner, are rolled back.
+    """
+    with get_engine().connect() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO shared.tenant (name, schema, active) "
+                "SELECT 'explain-' || i, 'explain_' || i, true "
+                "FROM generate_series(1, 1000) AS i"
+            )
+        )
+        connection.execute(
+            text(
+                'INSERT INTO shared."user" '
+                "(tenant_id, name, password, email, active) "
+                "SELECT t.id, t.name || '-' || i, 'x', 'x', true "
+                "FROM shared.tenant AS t, generate_series(1, 20) AS i "
+                "WHERE t.name LIKE 'explain-%'"
+            )
+        )
+        connection.execute(text('ANALYZE shared.tenant, shared."user"'))
+
+        def explain(statement: Select) -> set[str]:
+            sql = statement.compile(
+                dialect=postgresql.dialect(),
+                compile_kwargs={"literal_binds": True},
+            )
+            [(explained,)] = connection.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {sql}"
+            ).all()
+            return set(_index_names(explained[0]["Plan"]))
+
+        yield explain
+        connection.rollback()
+
+
+def _index_names(plan: dict[str, Any]) -> Iterator[str]:
+    if "Index Name" in plan:
+        yield plan["Index Name"]
+    for child in plan.get("Plans", []):
+        yield from _index_names(child)
+
+
+@pytest.mark.parametrize(
+    "statement, index",
+    [
+        (user._by_name("explain-1-1"), "uq_user_name"),
+        (user._by_id(1000), "pk_user"),
+        (tenant._by_name("explain-1"), "uq_tenant_name"),
+        (user._listed(after_id=1000, tenant_id=1000), "ix_user_tenant_id"),
+    ],
+)
+def test_lookup_uses_index(
+    indexes_used: Explain, statement: Select, index: str
+) -> None:
+    assert index in indexes_used(statement)
+
+
+def test_user_lookup_joins_tenant_by_key(indexes_used: Explain) -> None:
+    assert "pk_tenant" in indexes_used(user._by_name("explain-1-1"))
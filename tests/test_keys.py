@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from cryptography.hazmat.primitives.serialization import (
+    Encoding,
+    NoEncryption,
+    PrivateFormat,
+    PublicFormat,
+)
+
+from app.api.app import app
+from src.security.keys import KeyRing, key_ring
+from src.settings import Settings
+
+JWKS = "/api/v1/authentication/.well-known/jwks.json"
+
+
+def _write_private(
+    path: Path, key: rsa.RSAPrivateKey | ec.EllipticCurvePrivateKey
+) -> None:
+    path.write_bytes(
+        key.private_bytes(Encoding.PEM, PrivateFormat.PKCS8, NoEncryption())
+    )
+
+
+def _write_public(
+    path: Path, key: rsa.RSAPrivateKey | ec.EllipticCurvePrivateKey
+) -> None:
+    path.write_bytes(
+        key.public_key().public_bytes(
+            Encoding.PEM, PublicFormat.SubjectPublicKeyInfo
+        )
+    )
+
+
+def _ring(keys_dir: Path, active_kid: str | None) -> KeyRing:
+    settings = Settings.security_settings.model_copy(
+        update={
+            "keys_dir": str(keys_dir),
+            "active_kid": active_kid,
+            "algorithm": "RS256",
+        }
+    )
+    return KeyRing.from_settings(settings)
+
+
+def _claims() -> dict[str, object]:
+    return {"sub": "1000", "exp": int(time.time()) + 60}
+
+
+@pytest.fixture
+def old_key() -> rsa.RSAPrivateKey:
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def new_key() -> ec.EllipticCurvePrivateKey:
+    return ec.generate_private_key(ec.SECP256R1())
+
+
+def test_active_kid_is_required(tmp_path: Path, old_key) -> None:
+    _write_private(tmp_path / "2026-01.pem", old_key)
+
+    with pytest.raises(ValueError, match="AUTH_ACTIVE_KID"):
+        _ring(tmp_path, None)
+
+
+def test_empty_keys_dir(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="No keys"):
+        _ring(tmp_path, "2026-01")
+
+
+def test_unknown_active_kid(tmp_path: Path, old_key) -> None:
+    _write_private(tmp_path / "2026-01.pem", old_key)
+
+    with pytest.raises(ValueError, match="not available"):
+        _ring(tmp_path, "2026-02")
+
+
+def test_tokens_are_verified_by_kid(tmp_path: Path, old_key, new_key) -> None:
+    _write_private(tmp_path / "2026-01.pem", old_key)
+    _write_private(tmp_path / "2026-02.pem", new_key)
+    before = _ring(tmp_path, "2026-01")
+    after = _ring(tmp_path, "2026-02")
+
+    old_token, new_token = before.sign(_claims()), after.sign(_claims())
+
+    assert jwt.get_unverified_header(new_token)["kid"] == "2026-02"
+    assert jwt.get_unverified_header(new_token)["alg"] == "ES256"
+    for ring in [before, after]:
+        assert ring.verify(old_token)["sub"] == "1000"
+        assert ring.verify(new_token)["sub"] == "1000"
+
+
+def test_verify_only_key(tmp_path: Path, old_key, new_key) -> None:
+    _write_private(tmp_path / "2026-01.pem", old_key)
+    old_token = _ring(tmp_path, "2026-01").sign(_claims())
+    (tmp_path / "2026-01.pem").unlink()
+    _write_public(tmp_path / "2026-01.pub.pem", old_key)
+    _write_private(tmp_path / "2026-02.pem", new_key)
+
+    ring = _ring(tmp_path, "2026-02")
+
+    assert ring.verify(old_token)["sub"] == "1000"
+    with pytest.raises(ValueError, match="no private key"):
+        _ring(tmp_path, "2026-01")
+
+
+def test_unknown_kid_is_refused(tmp_path: Path, old_key, new_key) -> None:
+    _write_private(tmp_path / "2026-02.pem", new_key)
+    ring = _ring(tmp_path, "2026-02")
+    token = jwt.encode(
+        _claims(), old_key, algorithm="RS256", headers={"kid": "2026-01"}
+    )
+
+    with pytest.raises(jwt.InvalidTokenError, match="Unknown signing key"):
+        ring.verify(token)
+
+
+def test_jwks(tmp_path: Path, old_key, new_key) -> None:
+    _write_public(tmp_path / "2026-01.pub.pem", old_key)
+    _write_private(tmp_path / "2026-02.pem", new_key)
+    ring = _ring(tmp_path, "2026-02")
+
+    keys = {key["kid"]: key for key in ring.jwks()["keys"]}
+
+    assert sorted(keys) == ["2026-01", "2026-02"]
+    assert (keys["2026-01"]["kty"], keys["2026-01"]["alg"]) == ("RSA", "RS256")
+    assert (keys["2026-02"]["kty"], keys["2026-02"]["alg"]) == ("EC", "ES256")
+    assert all(key["use"] == "sig" and "d" not in key for key in keys.values())
+    # What a verifier does with the published key.
+    published = jwt.PyJWK(keys["2026-02"])
+    token = ring.sign(_claims())
+    assert jwt.decode(token, published.key, algorithms=["ES256"])
+
+
+def test_jwks_leaves_out_shared_secrets() -> None:
+    ring = KeyRing.from_settings(
+        Settings.security_settings.model_copy(update={"keys_dir": None})
+    )
+
+    assert ring.jwks() == {"keys": []}
+
+
+@pytest.fixture
+def client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),  # type: ignore[arg-type]
+        base_url="http://test",
+    )
+
+
+@pytest.mark.anyio
+async def test_jwks_endpoint(client: httpx.AsyncClient) -> None:
+    async with client:
+        response = await client.get(JWKS)
+
+        assert response.status_code == 200
+        assert response.json() == key_ring.jwks()
+        max_age = Settings.security_settings.jwks_max_age_seconds
+        assert response.headers["Cache-Control"] == (
+            f"public, max-age={max_age}"
+        )
+        etag = response.headers["ETag"]
+
+        cached = await client.get(JWKS, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["ETag"] == etag
+
+        stale = await client.get(JWKS, headers={"If-None-Match": '"old"'})
+        assert stale.status_code == 200
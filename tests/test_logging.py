@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import inspect
+import logging
+from pathlib import Path
+from typing import Callable, Iterator
+
+import anyio
+import httpx
+import pytest
+import yaml
+from anyio.from_thread import start_blocking_portal
+from fastapi import FastAPI
+
+from src.logging import utils
+from src.logging.main import init_logging
+from src.metrics import Histogram, histogram
+
+CONFIG = Path(__file__).parents[1] / "config" / "logging_backend.yml"
+
+logger = logging.getLogger(__name__)
+
+app = FastAPI()
+
+
+@app.get("/")
+async def logged() -> None:
+    logger.info("Handled a request.")
+
+
+@pytest.fixture(params=["off", "inline", "queued"])
+def logging_mode(request, tmp_path: Path) -> Iterator[str]:
+    """The backend logging config, writing its files to `tmp_path`."""
+    config = yaml.safe_load(CONFIG.read_text())
+    config["queue"] = request.param == "queued"
+    for handler in config["handlers"].values():
+        if "filename" in handler:
+            handler["filename"] = str(
+                tmp_path / Path(handler["filename"]).name
+            )
+    path = tmp_path / "logging.yml"
+    path.write_text(yaml.safe_dump(config))
+    init_logging(str(path))
+    if request.param == "off":
+        logging.disable(logging.CRITICAL)
+    yield request.param
+    logging.disable(logging.NOTSET)
+    init_logging(str(CONFIG))
+
+
+@pytest.mark.benchmark(group="requests-with-logging")
+def test_requests_per_second(benchmark, logging_mode: str) -> None:
+    with start_blocking_portal() as portal:
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),  # type: ignore[arg-type]
+            base_url="http://test",
+        )
+        response = benchmark(portal.call, client.get, "/")
+        portal.call(client.aclose)
+    assert response.status_code == 200
+
+
+def _add(a: int, b: int) -> int:
+    return a + b
+
+
+async def _add_async(a: int, b: int) -> int:
+    await anyio.sleep(0)
+    return a + b
+
+
+def _timings(func: Callable) -> Histogram:
+    return histogram(
+        "function_duration_seconds",
+        function=f"{__name__}.{func.__qualname__}",
+    )
+
+
+def test_logged_returns_the_result(caplog) -> None:
+    caplog.set_level(logging.INFO, logger=__name__)
+    before = _timings(_add).snapshot()["count"]
+
+    assert utils.logged(_add)(1, 2) == 3
+
+    assert _timings(_add).snapshot()["count"] == before + 1
+    assert caplog.messages == ["Started _add.", "Finished _add."]
+
+
+@pytest.mark.anyio
+async def test_logged_awaits_async_functions(caplog) -> None:
+    caplog.set_level(logging.INFO, logger=__name__)
+    before = _timings(_add_async).snapshot()["count"]
+    decorated = utils.logged(_add_async)
+    assert inspect.iscoroutinefunction(decorated)
+
+    assert await decorated(1, 2) == 3
+
+    timings = _timings(_add_async).snapshot()
+    assert timings["count"] == before + 1
+    assert timings["sum"] > 0
+    assert caplog.messages == ["Started _add_async.", "Finished _add_async."]
+
+
+def test_logged_times_failed_calls() -> None:
+    def fail() -> None:
+        raise ValueError("failed")
+
+    decorated = utils.logged(fail)
+    before = _timings(fail).snapshot()["count"]
+
+    with pytest.raises(ValueError):
+        decorated()
+
+    assert _timings(fail).snapshot()["count"] == before + 1
+
+
+def test_logged_does_not_log_below_info(caplog, mocker) -> None:
+    caplog.set_level(logging.WARNING, logger=__name__)
+    log = mocker.spy(logging.Logger, "_log")
+    enabled = mocker.spy(logging.Logger, "isEnabledFor")
+
+    assert utils.logged(_add)(1, 2) == 3
+
+    log.assert_not_called()
+    assert enabled.call_count == 1
+    assert not caplog.records
+
+
+@pytest.fixture
+def info_disabled() -> Iterator[None]:
+    # As in production, where the backend logs warnings and up.
+    previous = logger.level
+    logger.setLevel(logging.WARNING)
+    yield
+    logger.setLevel(previous)
+
+
+@pytest.mark.benchmark(group="logged-overhead")
+@pytest.mark.parametrize("decorated", [False, True])
+def test_logged_overhead(benchmark, info_disabled, decorated: bool) -> None:
+    func = utils.logged(_add) if decorated else _add
+
+    assert benchmark(func, 1, 2) == 3
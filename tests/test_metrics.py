@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import logging
+import re
+
+import pytest
+
+from src.settings import Settings
+
+METRICS = "/api/metrics"
+TOKEN = "scraper-token"
+LOGIN = "/api/v1/authentication/token"
+LOGIN_LABELS = 'method="POST",route="/api/v1/authentication/token"'
+
+
+@pytest.fixture
+def scraper(monkeypatch) -> dict[str, str]:
+    """Headers of an admitted scraper."""
+    monkeypatch.setattr(Settings.security_settings, "metrics_token", TOKEN)
+    return {"Authorization": f"Bearer {TOKEN}"}
+
+
+def _sample(metrics: str, name: str, labels: str) -> float:
+    found = re.search(
+        rf"^{name}\{{{re.escape(labels)}\}} (\S+)$", metrics, re.MULTILINE
+    )
+    assert found, f"{name}{{{labels}}} missing"
+    return float(found.group(1))
+
+
+def _login(api, login_user) -> None:
+    form = {"username": login_user.name, "password": login_user.password}
+    assert api.post(LOGIN, data=form).status_code == 200
+
+
+def test_metrics_are_off_without_a_token(api, monkeypatch) -> None:
+    monkeypatch.setattr(Settings.security_settings, "metrics_token", None)
+
+    assert api.get(METRICS).status_code == 404
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer wrong", TOKEN])
+def test_metrics_need_the_token(api, scraper, authorization) -> None:
+    headers = {"Authorization": authorization} if authorization else {}
+
+    response = api.get(METRICS, headers=headers)
+
+    assert response.status_code in (401, 403)
+
+
+def test_requests_are_measured(api, scraper, login_user) -> None:
+    _login(api, login_user)
+
+    response = api.get(METRICS, headers=scraper)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    metrics = response.text
+    assert _sample(metrics, "http_request_queries_count", LOGIN_LABELS) >= 1
+    assert _sample(metrics, "http_request_queries_sum", LOGIN_LABELS) >= 1
+    assert _sample(metrics, "http_request_db_seconds_sum", LOGIN_LABELS) > 0
+    assert (
+        _sample(metrics, "http_request_duration_seconds_count", LOGIN_LABELS)
+        >= 1
+    )
+    for gauge in ("db_pool_checked_out", "db_pool_size", "db_pool_overflow"):
+        assert _sample(metrics, gauge, 'engine="primary_async"') >= 0
+
+
+def test_requests_over_the_query_budget_are_logged(
+    api, login_user, monkeypatch, caplog
+) -> None:
+    monkeypatch.setattr(Settings.database, "query_budget", 0)
+    caplog.set_level(logging.WARNING, logger="app.api.middleware")
+
+    _login(api, login_user)
+
+    warnings = [
+        r.getMessage()
+        for r in caplog.records
+        if r.name == "app.api.middleware"
+    ]
+    assert any(
+        message.startswith(f"POST {LOGIN} ran ") and "(budget 0)" in message
+        for message in warnings
+    ), warnings
+
+
+def test_requests_within_the_query_budget_are_not_logged(
+    api, login_user, caplog
+) -> None:
+    caplog.set_level(logging.WARNING, logger="app.api.middleware")
+
+    _login(api, login_user)
+
+    assert not [r for r in caplog.records if r.name == "app.api.middleware"]
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+
+from alembic import command
+from alembic.config import Config
+from src.db import new_db_session
+from src.settings import Settings
+
+pytestmark = pytest.mark.usefixtures("database")
+
+# Creates the calendar tables of every tenant, see `tenant.for_each_tenant`.
+TENANT_STEP = "c5e8a1f3d902"
+BEFORE_TENANT_STEP = "a3d6f0b8c215"
+
+
+def _config(*x: str) -> Config:
+    config = Config(cmd_opts=Namespace(x=list(x)))
+    config.set_main_option(
+        "script_location", str(Path(__file__).parents[1] / "alembic")
+    )
+    return config
+
+
+def _current_revision() -> str:
+    schema = Settings.database.shared_schema
+    with new_db_session(schema) as session:
+        return session.execute(
+            text(f"SELECT version_num FROM {schema}.alembic_version")
+        ).scalar_one()
+
+
+def test_online_upgrade_refuses_a_subset_of_tenants() -> None:
+    command.downgrade(_config(), BEFORE_TENANT_STEP)
+    try:
+        with pytest.raises(ValueError, match="offline"):
+            command.upgrade(_config("tenants=tenant_template"), TENANT_STEP)
+        assert _current_revision() == BEFORE_TENANT_STEP
+    finally:
+        command.upgrade(_config(), "head")
+
+
+def test_offline_upgrade_of_a_subset_of_tenants(capsys) -> None:
+    command.upgrade(
+        _config("tenants=tenant_a,tenant_b"),
+        f"{BEFORE_TENANT_STEP}:{TENANT_STEP}",
+        sql=True,
+    )
+
+    sql = capsys.readouterr().out
+    assert "-- Tenant schema tenant_a" in sql
+    assert "tenant_b.calendar" in sql
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+from passlib.context import CryptContext
+
+from src.security.password import (
+    HashingSaturatedError,
+    PasswordHasher,
+    hashing_context,
+)
+from src.settings import Settings
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_saturated_hasher_fails_fast(mocker) -> None:
+    release = threading.Event()
+
+    def blocked_hash(plain: str) -> str:
+        release.wait()
+        return f"hashed {plain}"
+
+    context = mocker.Mock(spec=CryptContext)
+    context.hash.side_effect = blocked_hash
+    hasher = PasswordHasher(context, max_workers=1, max_pending=1)
+    try:
+        # One hashing, one queued: the pool and its queue are full.
+        admitted = [asyncio.create_task(hasher.hash(p)) for p in "ab"]
+        await asyncio.sleep(0)
+        assert hasher.in_flight == 2
+
+        with pytest.raises(HashingSaturatedError):
+            await hasher.hash("c")
+
+        release.set()
+        assert await asyncio.gather(*admitted) == ["hashed a", "hashed b"]
+        assert hasher.in_flight == 0
+        assert await hasher.hash("c") == "hashed c"
+    finally:
+        release.set()
+        hasher.shutdown()
+
+
+async def test_verify_runs_off_the_event_loop(mocker) -> None:
+    threads = []
+
+    def verify_and_update(plain: str, hashed: str) -> tuple[bool, None]:
+        threads.append(threading.get_ident())
+        return True, None
+
+    context = mocker.Mock(spec=CryptContext)
+    context.verify_and_update.side_effect = verify_and_update
+    hasher = PasswordHasher(context, max_workers=1, max_pending=0)
+    try:
+        assert await hasher.verify("secret", "hashed")
+    finally:
+        hasher.shutdown()
+    assert threads != [threading.get_ident()]
+
+
+async def test_bcrypt_hashes_are_replaced_with_argon2() -> None:
+    settings = Settings.security_settings.model_copy(
+        update={
+            "hash_schemes": ["argon2", "bcrypt"],
+            "bcrypt_rounds": 4,
+            "argon2_time_cost": 1,
+            "argon2_memory_cost": 1024,
+            "argon2_parallelism": 1,
+        }
+    )
+    context = hashing_context(settings)
+    old = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret")
+
+    verified, new = context.verify_and_update("secret", old)
+
+    assert verified
+    assert new is not None and context.identify(new) == "argon2"
+    assert context.verify_and_update("secret", new) == (True, None)
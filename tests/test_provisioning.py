@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+from sqlalchemy import Connection, text
+
+from alembic.config import Config
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from src.db import get_engine
+from src.multitenancy.provisioning import clone_template, template_layout
+
+TENANTS = 100
+
+ALEMBIC = Path(__file__).parents[1] / "alembic"
+
+Provision = Callable[[Connection, str], None]
+
+
+@pytest.fixture(scope="module")
+def replay(database: None) -> Iterator[Provision]:
+    """Creates a tenant schema by running every tenant migration step."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        # Where the revisions import `tenant` from, as env.py arranges.
+        monkeypatch.syspath_prepend(str(ALEMBIC))
+        config = Config()
+        config.set_main_option("script_location", str(ALEMBIC))
+        revisions = ScriptDirectory.from_config(config).walk_revisions()
+        steps = [
+            step
+            for revision in reversed(list(revisions))
+            # Tenant steps, unwrapped from `tenant.for_each_tenant`.
+            if (step := getattr(revision.module.upgrade, "__wrapped__", None))
+        ]
+
+    def replay(connection: Connection, schema: str) -> None:
+        connection.exec_driver_sql(f'CREATE SCHEMA "{schema}"')
+        op = Operations(MigrationContext.configure(connection))
+        for step in steps:
+            step(schema=schema, op=op)
+
+    yield replay
+
+
+def _clone_all(connection: Connection, schemas: list[str]) -> None:
+    # The template is read once, as `bulk_import.import_tenants` does.
+    layout = template_layout(connection)
+    for schema in schemas:
+        clone_template(connection, schema, layout)
+
+
+def _provision_all(provision: Callable[[Connection, list[str]], None]) -> None:
+    # Rolled back, DDL included, so every round starts from scratch.
+    with get_engine().connect() as connection:
+        provision(connection, [f"test_provision_{i}" for i in range(TENANTS)])
+        connection.rollback()
+
+
+@pytest.mark.benchmark(group="provision-100-tenants")
+def test_clone_template(benchmark) -> None:
+    benchmark.pedantic(_provision_all, args=(_clone_all,), rounds=3)
+
+
+@pytest.mark.benchmark(group="provision-100-tenants")
+def test_replay_migrations(benchmark, replay: Provision) -> None:
+    def replay_all(connection: Connection, schemas: list[str]) -> None:
+        for schema in schemas:
+            replay(connection, schema)
+
+    benchmark.pedantic(_provision_all, args=(replay_all,), rounds=3)
+
+
+def _definitions(connection: Connection, schema: str) -> list[str]:
+    rows = connection.execute(
+        text(
+            """
+            SELECT tablename || ': ' || indexdef FROM pg_indexes
+            WHERE schemaname = :schema
+            UNION ALL
+            SELECT c.relname || ': ' || pg_get_constraintdef(con.oid)
+            FROM pg_constraint con
+            JOIN pg_class c ON c.oid = con.conrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = :schema
+            UNION ALL
+            SELECT table_name || '.' || column_name || ' ' || data_type
+                || ' ' || is_nullable
+            FROM information_schema.columns
+            WHERE table_schema = :schema
+            """
+        ),
+        {"schema": schema},
+    ).scalars()
+    return sorted(row.replace(schema, "<schema>") for row in rows)
+
+
+def test_clone_matches_replayed_migrations(replay: Provision) -> None:
+    with get_engine().connect() as connection:
+        clone_template(connection, "test_cloned")
+        replay(connection, "test_replayed")
+
+        cloned = _definitions(connection, "test_cloned")
+        assert cloned
+        assert cloned == _definitions(connection, "test_replayed")
+        connection.rollback()
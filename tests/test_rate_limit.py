@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import uuid
+from functools import partial
+
+import pytest
+from anyio.from_thread import start_blocking_portal
+from starlette.requests import Request
+
+from app.api.v1.security.authentication import _client_ip
+from src.security.rate_limit import Rate, login_limiter
+from src.settings import Settings
+
+TOKEN = "/api/v1/authentication/token"
+
+
+def _request(peer: str, *forwarded: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "client": (peer, 1234),
+            "headers": [
+                (b"x-forwarded-for", value.encode()) for value in forwarded
+            ],
+        }
+    )
+
+
+@pytest.fixture
+def trusted_proxies(monkeypatch) -> None:
+    monkeypatch.setattr(
+        Settings.security_settings,
+        "trusted_proxies",
+        ["10.0.0.0/8", "::1"],
+    )
+
+
+def test_forwarded_for_is_ignored_by_default() -> None:
+    assert _client_ip(_request("10.0.0.1", "203.0.113.7")) == "10.0.0.1"
+
+
+def test_forwarded_for_of_trusted_proxies(trusted_proxies) -> None:
+    assert _client_ip(_request("10.0.0.1", "203.0.113.7")) == "203.0.113.7"
+    assert _client_ip(_request("::1", "203.0.113.7")) == "203.0.113.7"
+
+
+def test_forwarded_for_is_followed_through_trusted_proxies_only(
+    trusted_proxies,
+) -> None:
+    request = _request("10.0.0.1", "198.51.100.1, 203.0.113.7", "10.0.0.2")
+    assert _client_ip(request) == "203.0.113.7"
+
+
+def test_untrusted_peer_is_the_client(trusted_proxies) -> None:
+    assert _client_ip(_request("192.0.2.1", "203.0.113.7")) == "192.0.2.1"
+    assert _client_ip(_request("10.0.0.1")) == "10.0.0.1"
+
+
+def _login(api, name: str, forwarded_for: str):
+    return api.post(
+        TOKEN,
+        data={"username": name, "password": "wrong"},
+        headers={"X-Forwarded-For": forwarded_for},
+    )
+
+
+def test_clients_behind_a_trusted_proxy_have_buckets_of_their_own(
+    api, monkeypatch
+) -> None:
+    # Requests from the test client come from 127.0.0.1.
+    monkeypatch.setattr(
+        Settings.security_settings, "trusted_proxies", ["127.0.0.1"]
+    )
+    burst = Settings.security_settings.login_ip_burst
+    names = [f"test-{uuid.uuid4().hex[:12]}" for _ in range(burst + 1)]
+
+    statuses = [_login(api, name, "203.0.113.7").status_code for name in names]
+    assert statuses[:-1] == [401] * burst
+    assert statuses[-1] == 429
+    assert _login(api, names[0], "203.0.113.8").status_code == 401
+
+
+@pytest.fixture
+def unlimited(monkeypatch) -> None:
+    # Every attempt still runs the script, but none is turned away.
+    rate = Rate(per_minute=10**9, burst=10**9)
+    monkeypatch.setattr(login_limiter, "_rates", {"user": rate, "ip": rate})
+
+
+def _unknown_user_login(api) -> None:
+    # An unknown user is turned away before any hashing, which leaves the
+    # limiter a large share of the request.
+    name = f"test-{uuid.uuid4().hex[:12]}"
+    response = api.post(TOKEN, data={"username": name, "password": "wrong"})
+    assert response.status_code == 401
+
+
+async def _admitted(**identities: str) -> float:
+    return 0.0
+
+
+@pytest.mark.benchmark(group="login-limiter-overhead")
+def test_login_without_limiter(benchmark, api, monkeypatch) -> None:
+    # Rather than overriding the dependency, which FastAPI resolves anew
+    # on every request.
+    monkeypatch.setattr(login_limiter, "retry_after", _admitted)
+    benchmark.pedantic(
+        _unknown_user_login, (api,), rounds=200, warmup_rounds=20
+    )
+
+
+@pytest.mark.benchmark(group="login-limiter-overhead")
+def test_login_with_limiter(benchmark, api, unlimited) -> None:
+    benchmark.pedantic(
+        _unknown_user_login, (api,), rounds=200, warmup_rounds=20
+    )
+
+
+@pytest.mark.benchmark(group="rate-limit-check")
+def test_check(benchmark, redis, unlimited) -> None:
+    # Against fakeredis, which runs the script slower than Redis does.
+    check = partial(
+        login_limiter.retry_after, user="someone", ip="203.0.113.7"
+    )
+    with start_blocking_portal() as portal:
+        assert benchmark(portal.call, check) == 0
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import uuid
+from typing import AsyncIterator, Iterator
+
+import pytest
+from sqlalchemy import delete, update
+
+from src.data_model import Tenant
+from src.db import delete as delete_deletable
+from src.db import dispose_async_engines, new_db_session
+from src.multitenancy import registry
+from src.multitenancy.registry import TenantRegistry
+from src.settings import Settings
+
+pytestmark = pytest.mark.anyio
+
+SHARED = Settings.database.shared_schema
+
+
+def _create_tenant(active: bool = True) -> int:
+    name = f"test-{uuid.uuid4().hex[:12]}"
+    with new_db_session(SHARED) as session:
+        tenant = Tenant(
+            name=name, schema=name.replace("-", "_"), active=active
+        )
+        session.add(tenant)
+        session.flush()
+        return tenant.id
+
+
+@pytest.fixture
+def tenants(database: None) -> Iterator[list[int]]:
+    """Ids of tenants created by a test, removed afterwards."""
+    created: list[int] = []
+    yield created
+    with new_db_session(SHARED) as session:
+        session.execute(delete(Tenant).where(Tenant.id.in_(created)))
+
+
+@pytest.fixture
+async def tenant_registry(
+    monkeypatch: pytest.MonkeyPatch,
+) -> AsyncIterator[TenantRegistry]:
+    loaded = TenantRegistry()
+    # For the deletion hook to act on this one.
+    monkeypatch.setattr(registry, "tenant_registry", loaded)
+    await loaded.reload()
+    yield loaded
+    await dispose_async_engines()
+
+
+async def test_reload(tenants, tenant_registry) -> None:
+    tenants.extend([_create_tenant(), _create_tenant(active=False)])
+    await tenant_registry.reload()
+
+    active, inactive = tenants
+    record = tenant_registry.get(active)
+    assert record is not None
+    assert tenant_registry.by_name(record.name) == record
+    assert tenant_registry.schema_for(active) == record.schema
+    assert tenant_registry.get(inactive) is None
+
+
+async def test_refresh_picks_up_new_tenants(tenants, tenant_registry) -> None:
+    tenants.append(_create_tenant())
+    assert tenant_registry.get(tenants[0]) is None
+
+    await tenant_registry.refresh()
+
+    assert tenant_registry.get(tenants[0]) is not None
+
+
+@pytest.mark.parametrize("active", [True, False])
+async def test_refresh_picks_up_activation(
+    tenants, tenant_registry, active: bool
+) -> None:
+    tenants.append(_create_tenant(active=not active))
+    await tenant_registry.refresh()
+
+    with new_db_session(SHARED) as session:
+        session.execute(
+            update(Tenant).where(Tenant.id == tenants[0]).values(active=active)
+        )
+    await tenant_registry.refresh()
+
+    assert (tenant_registry.get(tenants[0]) is not None) is active
+
+
+async def test_deleted_tenant_is_forgotten_at_once(
+    tenants, tenant_registry, redis
+) -> None:
+    tenants.append(_create_tenant())
+    await tenant_registry.refresh()
+    assert tenant_registry.get(tenants[0]) is not None
+
+    with new_db_session(SHARED) as session:
+        tenant = session.get(Tenant, tenants[0])
+        assert tenant is not None
+        delete_deletable(tenant, session)
+
+    assert tenant_registry.get(tenants[0]) is None
+    await tenant_registry.refresh()
+    assert tenant_registry.get(tenants[0]) is None
+
+
+async def test_resolve_refreshes_on_a_miss(
+    tenants, tenant_registry, monkeypatch
+) -> None:
+    monkeypatch.setattr(registry, "_MISS_REFRESH_SECONDS", 0.0)
+    tenants.append(_create_tenant())
+
+    record = await tenant_registry.resolve(tenants[0])
+
+    assert record is not None and record.id == tenants[0]
+
+
+async def test_resolve_refreshes_at_most_so_often(
+    tenants, tenant_registry
+) -> None:
+    await tenant_registry.refresh()
+    tenants.append(_create_tenant())
+
+    assert await tenant_registry.resolve(tenants[0]) is None
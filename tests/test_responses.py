@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import Callable
+
+import httpx
+import pytest
+from anyio.from_thread import start_blocking_portal
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.api.responses import FastJSONResponse
+from app.api.v1.data_model import Token
+from app.api.v1.data_model import User as UserDto
+
+USER = UserDto(
+    username="someone",
+    user_id=1000,
+    email="someone@example.com",
+    full_name="Some One",
+    tenant_id=10,
+    tenant_schema="tenant_example",
+)
+# About the size of a signed access token.
+TOKEN = Token(token_type="bearer", access_token="x" * 180)
+
+
+def _by_fastapi(model: BaseModel) -> bytes:
+    # What FastAPI does with a model returned from a handler: dump it,
+    # encode the dump once more, then have `json.dumps` render it.
+    return JSONResponse(jsonable_encoder(model.model_dump(mode="json"))).body
+
+
+def _by_pydantic_core(model: BaseModel) -> bytes:
+    return FastJSONResponse(model).body
+
+
+@pytest.mark.parametrize("model", [USER, TOKEN], ids=["users-me", "token"])
+@pytest.mark.parametrize(
+    "serialize",
+    [_by_fastapi, _by_pydantic_core],
+    ids=["fastapi", "pydantic-core"],
+)
+def test_serialize(
+    benchmark, model: BaseModel, serialize: Callable[[BaseModel], bytes]
+) -> None:
+    benchmark.group = f"serialize-{type(model).__name__.lower()}"
+
+    body = benchmark(serialize, model)
+
+    assert type(model).model_validate_json(body) == model
+
+
+app = FastAPI()
+
+
+@app.get("/fastapi", response_model=UserDto)
+async def by_fastapi() -> UserDto:
+    return USER
+
+
+@app.get("/pydantic-core", response_model=UserDto)
+async def by_pydantic_core() -> FastJSONResponse:
+    return FastJSONResponse(USER)
+
+
+@pytest.mark.benchmark(group="users-me-requests")
+@pytest.mark.parametrize("route", ["/fastapi", "/pydantic-core"])
+def test_request(benchmark, route: str) -> None:
+    with start_blocking_portal() as portal:
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),  # type: ignore[arg-type]
+            base_url="http://test",
+        )
+        response = benchmark(portal.call, client.get, route)
+        portal.call(client.aclose)
+    assert UserDto.model_validate_json(response.content) == USER
+
+
+@pytest.mark.benchmark(group="users-me-requests")
+def test_users_me(benchmark, api, login_user) -> None:
+    token = api.post(
+        "/api/v1/authentication/token",
+        data={"username": login_user.name, "password": login_user.password},
+    ).json()["access_token"]
+
+    response = benchmark(
+        api.get,
+        "/api/v1/authentication/users/me",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    assert response.json()["user_id"] == login_user.id
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.tasks import tenants
+from app.tasks.app import celery_app
+from app.tasks.tenants import (
+    fan_out,
+    for_each_tenant,
+    run_tenant_chunk,
+    tenant_job,
+)
+
+SCHEMAS = [f"tenant_{i}" for i in range(7)]
+
+_runs: list[tuple[str, str]] = []
+
+
+@tenant_job
+def _record(session: Session, label: str = "") -> None:
+    _runs.append((session.info["schema"], label))
+
+
+@tenant_job
+def _fail_for_tenant_3(session: Session) -> None:
+    if session.info["schema"] == "tenant_3":
+        raise RuntimeError("Tenant 3 is broken.")
+    _runs.append((session.info["schema"], ""))
+
+
+@pytest.fixture(autouse=True)
+def eager(monkeypatch, mocker) -> None:
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", True)
+    mocker.patch.object(tenants, "_active_schemas", return_value=SCHEMAS)
+    _runs.clear()
+
+
+def test_runs_job_once_per_tenant() -> None:
+    for_each_tenant(_record, chunk_size=3, concurrency=2, label="eager")
+
+    assert sorted(_runs) == [(schema, "eager") for schema in SCHEMAS]
+
+
+def test_lanes_take_chunks_round_robin() -> None:
+    for_each_tenant(_record, chunk_size=2, concurrency=2)
+
+    # Chunks [0, 1] and [4, 5] make one lane, [2, 3] and [6] the other.
+    assert [schema for schema, _ in _runs] == [
+        "tenant_0",
+        "tenant_1",
+        "tenant_4",
+        "tenant_5",
+        "tenant_2",
+        "tenant_3",
+        "tenant_6",
+    ]
+
+
+def test_failing_tenant_does_not_stop_the_others() -> None:
+    for_each_tenant(_fail_for_tenant_3, chunk_size=7)
+
+    assert [schema for schema, _ in _runs] == [
+        s for s in SCHEMAS if s != "tenant_3"
+    ]
+
+
+def test_chunk_reports_failed_tenants() -> None:
+    failed = run_tenant_chunk.apply(
+        args=(f"{__name__}._fail_for_tenant_3", SCHEMAS[2:5], {})
+    ).get()
+
+    assert failed == ["tenant_3"]
+
+
+def test_fan_out_by_name() -> None:
+    fan_out.delay(f"{__name__}._record", chunk_size=4, label="beat")
+
+    assert sorted(_runs) == [(schema, "beat") for schema in SCHEMAS]
+
+
+def test_no_tenants(mocker) -> None:
+    mocker.patch.object(tenants, "_active_schemas", return_value=[])
+
+    assert for_each_tenant(_record) is None
+    assert _runs == []
+
+
+def test_unregistered_job_is_refused() -> None:
+    def unregistered(session: Session) -> None:
+        pass
+
+    with pytest.raises(ValueError):
+        for_each_tenant(unregistered)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from pyintervals import Interval
+
+from src.timespans import Span, TimespanIndex
+
+EPOCH = datetime(2026, 1, 1)
+
+
+def _spans(count: int, seed: int = 0) -> list[Span]:
+    """Spans of up to a day over a year, some of them long."""
+    rng = random.Random(seed)
+    spans = []
+    for _ in range(count):
+        start = EPOCH + timedelta(minutes=rng.randrange(365 * 24 * 60))
+        longest = 60 * 24 * (30 if rng.random() < 0.01 else 1)
+        spans.append(
+            (start, start + timedelta(minutes=rng.randrange(1, longest)))
+        )
+    return spans
+
+
+def _index(spans: list[Span]) -> TimespanIndex[Span]:
+    return TimespanIndex(spans, span=lambda span: span)
+
+
+def _overlapping(spans: list[Span], start: datetime, end: datetime):
+    query = Interval(start, end)
+    return sorted(
+        span for span in spans if Interval(*span).overlaps_with(query)
+    )
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 7, 16, 17, 100, 1000, 1025])
+def test_overlapping_matches_a_scan(count: int) -> None:
+    spans = _spans(count, seed=count)
+    index = _index(spans)
+    rng = random.Random(count)
+    for _ in range(200):
+        start = EPOCH + timedelta(hours=rng.randrange(-24, 366 * 24))
+        end = start + timedelta(hours=rng.choice([0, 1, 24, 24 * 40]))
+
+        found = index.overlapping(start, end)
+
+        assert found == sorted(found, key=lambda span: span[0])
+        assert sorted(found) == _overlapping(spans, start, end)
+
+
+def test_overlapping_a_point_in_time() -> None:
+    index = _index([(EPOCH, EPOCH + timedelta(hours=1))])
+
+    assert index.overlapping(EPOCH, EPOCH)
+    assert not index.overlapping(*[EPOCH + timedelta(hours=1)] * 2)
+
+
+def test_gaps() -> None:
+    hour = timedelta(hours=1)
+    index = _index(
+        [(EPOCH, EPOCH + hour), (EPOCH + 3 * hour, EPOCH + 4 * hour)]
+    )
+
+    assert index.gaps(EPOCH - hour, EPOCH + 5 * hour) == [
+        (EPOCH - hour, EPOCH),
+        (EPOCH + hour, EPOCH + 3 * hour),
+        (EPOCH + 4 * hour, EPOCH + 5 * hour),
+    ]
+    assert index.gaps(EPOCH, EPOCH + 5 * hour, min_length=2 * hour) == [
+        (EPOCH + hour, EPOCH + 3 * hour)
+    ]
+    assert index.busy_at(EPOCH + 3 * hour) == 1
+
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"{size}")
+def index(request) -> TimespanIndex[Span]:
+    spans = _spans(request.param)
+    # A span over the whole year, which used to make every overlap query
+    # look at all spans starting before it.
+    spans.append((EPOCH, EPOCH + timedelta(days=365)))
+    return _index(spans)
+
+
+def _windows(count: int, length: timedelta) -> list[Span]:
+    rng = random.Random(1)
+    return [
+        (start, start + length)
+        for _ in range(count)
+        for start in [EPOCH + timedelta(hours=rng.randrange(365 * 24))]
+    ]
+
+
+def test_build(benchmark, index: TimespanIndex[Span]) -> None:
+    benchmark.group = f"timespans-build-{len(index)}"
+    spans = _spans(len(index) - 1)
+
+    built = benchmark.pedantic(_index, (spans,), rounds=1)
+
+    assert len(built) == len(spans)
+
+
+def test_overlapping(benchmark, index: TimespanIndex[Span]) -> None:
+    benchmark.group = f"timespans-overlapping-{len(index)}"
+    windows = _windows(100, timedelta(hours=1))
+
+    def query() -> int:
+        return sum(len(index.overlapping(*window)) for window in windows)
+
+    assert benchmark(query) >= len(windows)
+
+
+def test_gaps_over_a_week(benchmark, index: TimespanIndex[Span]) -> None:
+    benchmark.group = f"timespans-gaps-{len(index)}"
+    windows = _windows(100, timedelta(days=7))
+
+    def query() -> int:
+        return sum(len(index.gaps(*window)) for window in windows)
+
+    benchmark(query)
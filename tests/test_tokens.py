@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+
+from app.api.v1.security import common
+from app.api.v1.security.common import access_token_claims, verify_token
+from src.security.keys import KeyRing, SigningKey
+
+
+def _hs256_ring() -> KeyRing:
+    secret = "a secret of at least thirty-two bytes for HS256"
+    return KeyRing([SigningKey("hs", "HS256", secret, secret)], "hs")
+
+
+def _rs256_ring() -> KeyRing:
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return KeyRing(
+        [SigningKey("rs", "RS256", private, private.public_key())], "rs"
+    )
+
+
+@pytest.fixture(params=["HS256", "RS256"])
+def key_ring(request, monkeypatch) -> KeyRing:
+    ring = _hs256_ring() if request.param == "HS256" else _rs256_ring()
+    monkeypatch.setattr(common, "key_ring", ring)
+    common._claims_cache.clear()
+    return ring
+
+
+def _token(ring: KeyRing, expires_in: float = 3600) -> str:
+    return ring.sign({"sub": "1000", "exp": int(time.time() + expires_in)})
+
+
+@pytest.mark.benchmark(group="token-verification")
+def test_decode(benchmark, key_ring: KeyRing) -> None:
+    token = _token(key_ring)
+    options = {"require": ["exp", "sub"]}
+
+    claims = benchmark(key_ring.verify, token, options=options)
+
+    assert claims["sub"] == "1000"
+
+
+@pytest.mark.benchmark(group="token-verification")
+def test_cached(benchmark, key_ring: KeyRing) -> None:
+    token = _token(key_ring)
+    verify_token(token)
+
+    claims = benchmark(verify_token, token)
+
+    assert claims["sub"] == "1000"
+
+
+def test_expired_token_is_refused(key_ring: KeyRing) -> None:
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verify_token(_token(key_ring, expires_in=-1))
+
+    with pytest.raises(HTTPException) as refused:
+        asyncio.run(access_token_claims(_token(key_ring, expires_in=-1)))
+    assert refused.value.status_code == 401
+    assert refused.value.detail == "Token expired"
+
+
+def test_cached_claims_expire_with_the_token(key_ring: KeyRing) -> None:
+    expires_at = int(time.time()) + 2
+    token = key_ring.sign({"sub": "1000", "exp": expires_at})
+    assert verify_token(token)["sub"] == "1000"
+
+    time.sleep(expires_at - time.time() + 0.1)
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verify_token(token)
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from typing import AsyncIterator, Iterator
+
+import pytest
+from sqlalchemy import delete
+
+from app.api.v1.data_model import User as UserDto
+from app.api.v1.security import common
+from app.api.v1.security.common import user_from_id
+from src.caching import LocalCache, TieredCache
+from src.data_model import Tenant, User
+from src.db import delete as delete_deletable
+from src.db import (
+    delete_async,
+    dispose_async_engines,
+    new_async_db_session,
+    new_db_session,
+)
+from src.redis_client import get_redis
+from src.settings import Settings
+
+pytestmark = pytest.mark.anyio
+
+SHARED = Settings.database.shared_schema
+
+
+@pytest.fixture
+async def user_cache(
+    redis, monkeypatch
+) -> AsyncIterator[TieredCache[int, UserDto]]:
+    """A user cache of room for one, with counters of its own."""
+    cache: TieredCache[int, UserDto] = TieredCache(
+        LocalCache("authenticated_users", maxsize=1, ttl=60),
+        ttl=60,
+        dump=UserDto.model_dump_json,
+        load=UserDto.model_validate_json,
+    )
+    monkeypatch.setattr(common, "_user_cache", cache)
+    yield cache
+    await dispose_async_engines()
+
+
+@pytest.fixture
+def other_user(login_user) -> Iterator[int]:
+    """Another user of the tenant of `login_user`."""
+    with new_db_session(SHARED) as session:
+        user = User(
+            tenant_id=login_user.tenant_id,
+            name=f"{login_user.name}-other",
+            password="not a hash",
+            email=f"{login_user.name}-other@example.com",
+            active=True,
+        )
+        session.add(user)
+        session.flush()
+        user_id = user.id
+    yield user_id
+    with new_db_session(SHARED) as session:
+        session.execute(delete(User).where(User.id == user_id))
+
+
+def _in_redis(cache: TieredCache, user_id: int) -> bool:
+    return bool(get_redis().exists(cache._key(user_id)))
+
+
+async def test_second_lookup_is_cached(user_cache, login_user, mocker) -> None:
+    load = mocker.spy(common, "_load_user")
+
+    first = await user_from_id(login_user.id)
+    second = await user_from_id(login_user.id)
+
+    assert first is not None and first == second
+    assert first.tenant_id == login_user.tenant_id
+    load.assert_called_once_with(login_user.id)
+    assert user_cache.local.stats.as_dict() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+    }
+    assert user_cache.remote_stats.misses == 1
+    assert _in_redis(user_cache, login_user.id)
+
+
+async def test_lookup_is_promoted_from_redis(
+    user_cache, login_user, mocker
+) -> None:
+    await user_from_id(login_user.id)
+    # As seen by another worker, or after a restart.
+    user_cache.local.clear()
+    load = mocker.spy(common, "_load_user")
+
+    assert await user_from_id(login_user.id) is not None
+
+    load.assert_not_called()
+    assert user_cache.remote_stats.hits == 1
+    assert user_cache.local.get(login_user.id) is not None
+
+
+async def test_least_recently_used_user_is_evicted(
+    user_cache, login_user, other_user
+) -> None:
+    await user_from_id(login_user.id)
+    await user_from_id(other_user)
+
+    assert user_cache.local.stats.evictions == 1
+    assert user_cache.local.get(login_user.id) is None
+    assert user_cache.local.get(other_user) is not None
+
+
+async def test_deleting_a_user_evicts_it(user_cache, login_user) -> None:
+    await user_from_id(login_user.id)
+
+    with new_db_session(SHARED) as session:
+        user = session.get(User, login_user.id)
+        assert user is not None
+        delete_deletable(user, session)
+
+    assert user_cache.local.get(login_user.id) is None
+    assert not _in_redis(user_cache, login_user.id)
+    assert await user_from_id(login_user.id) is None
+
+
+async def test_deleting_a_user_asynchronously_evicts_it(
+    user_cache, login_user
+) -> None:
+    await user_from_id(login_user.id)
+
+    async with new_async_db_session(SHARED) as session:
+        user = await session.get(User, login_user.id)
+        assert user is not None
+        await delete_async(user, session)
+
+    assert user_cache.local.get(login_user.id) is None
+    assert not _in_redis(user_cache, login_user.id)
+
+
+async def test_invalidating_a_tag_evicts_its_users(
+    user_cache, login_user
+) -> None:
+    user = await user_from_id(login_user.id)
+    assert user is not None
+
+    user_cache.invalidate_tag(user.tenant_schema)
+
+    assert user_cache.local.get(login_user.id) is None
+    assert not _in_redis(user_cache, login_user.id)
+
+
+async def test_deleting_a_tenant_evicts_its_users(
+    user_cache, login_user
+) -> None:
+    await user_from_id(login_user.id)
+
+    with new_db_session(SHARED) as session:
+        tenant = session.get(Tenant, login_user.tenant_id)
+        assert tenant is not None
+        delete_deletable(tenant, session)
+
+    assert user_cache.local.get(login_user.id) is None
+    assert not _in_redis(user_cache, login_user.id)
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import Request
+from sqlalchemy import delete, select, update
+
+from app.api.v1.security import authentication
+from src import db_replicas
+from src.data_model import AuditEvent, User
+from src.db import dispose_async_engines, new_async_db_session
+from src.db_replicas import recently_written
+from src.security.password import password_hasher
+from src.security.rate_limit import login_limiter
+from src.settings import Settings
+from src.write_behind import AuditRecord, WriteBehindBuffer, write_behind
+
+SHARED = Settings.database.shared_schema
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@pytest.fixture
+def buffer() -> WriteBehindBuffer:
+    return WriteBehindBuffer(
+        "test", batch_size=10, interval=1, max_pending=100, max_wait=0.01
+    )
+
+
+@pytest.fixture
+def forget_writes(monkeypatch) -> None:
+    monkeypatch.setattr(db_replicas, "_last_write", {})
+
+
+@pytest.mark.anyio
+async def test_flush(buffer, login_user, forget_writes) -> None:
+    now = _now()
+    await buffer.update_user(login_user.id, last_login_at=datetime(2000, 1, 1))
+    await buffer.update_user(login_user.id, last_login_at=now)
+    for _ in range(25):
+        await buffer.record(AuditRecord("test", now, user_id=login_user.id))
+    assert len(buffer) == 26
+
+    try:
+        assert await buffer.flush()
+        assert len(buffer) == 0
+
+        async with new_async_db_session(SHARED) as session:
+            user = await session.get(User, login_user.id)
+            assert user is not None and user.last_login_at == now
+            events = await session.scalars(
+                select(AuditEvent).where(AuditEvent.user_id == login_user.id)
+            )
+            assert len(events.all()) == 25
+            await session.execute(
+                delete(AuditEvent).where(AuditEvent.user_id == login_user.id)
+            )
+    finally:
+        await dispose_async_engines()
+
+
+@pytest.mark.anyio
+async def test_flush_keeps_reads_off_the_primary(
+    buffer, login_user, forget_writes
+) -> None:
+    await buffer.update_user(login_user.id, last_login_at=_now())
+    try:
+        assert await buffer.flush()
+    finally:
+        await dispose_async_engines()
+
+    assert not recently_written(SHARED)
+
+
+@pytest.mark.anyio
+async def test_failed_flush_keeps_the_writes(
+    buffer, login_user, mocker
+) -> None:
+    mocker.patch(
+        "src.write_behind.new_async_db_session",
+        side_effect=ConnectionError("database away"),
+    )
+    await buffer.update_user(login_user.id, last_login_at=_now())
+    await buffer.record(AuditRecord("test", _now(), user_id=login_user.id))
+
+    assert not await buffer.flush()
+
+    assert len(buffer) == 2
+    assert buffer.dropped == 0
+
+
+@pytest.mark.anyio
+async def test_full_buffer_drops_writes(buffer) -> None:
+    for i in range(101):
+        await buffer.record(AuditRecord("test", _now(), user_id=i))
+
+    assert len(buffer) == 100
+    assert buffer.dropped == 1
+
+
+async def _record_login_inline(user: User, request: Request) -> None:
+    # One session and commit per login, as writes were made before the
+    # buffer.
+    now = _now()
+    async with new_async_db_session(SHARED) as session:
+        await session.execute(
+            update(User).where(User.id == user.id).values(last_login_at=now)
+        )
+        session.add(
+            AuditEvent(
+                kind="login",
+                occurred_at=now,
+                user_id=user.id,
+                tenant_id=user.tenant_id,
+                client_ip=request.client.host if request.client else None,
+            )
+        )
+
+
+async def _verified(plain: str, hashed: str) -> tuple[bool, None]:
+    return True, None
+
+
+async def _admitted(**identities: str) -> float:
+    return 0.0
+
+
+@pytest.mark.benchmark(group="login-throughput")
+@pytest.mark.parametrize("writes", ["inline", "write-behind"])
+def test_login_throughput(
+    benchmark, api, login_user, monkeypatch, writes: str
+) -> None:
+    # Hashing would take most of the time of a login, and the limiter
+    # would soon turn the logins away.
+    monkeypatch.setattr(password_hasher, "verify_and_update", _verified)
+    monkeypatch.setattr(login_limiter, "retry_after", _admitted)
+    if writes == "inline":
+        monkeypatch.setattr(
+            authentication, "_record_login", _record_login_inline
+        )
+    clients, logins = 8, 25
+    form = {"username": login_user.name, "password": login_user.password}
+
+    def login(_: int) -> None:
+        for _ in range(logins):
+            response = api.post("/api/v1/authentication/token", data=form)
+            assert response.status_code == 200
+
+    def storm() -> None:
+        with ThreadPoolExecutor(clients) as pool:
+            list(pool.map(login, range(clients)))
+        # Part of the cost of the logins, whenever it is paid.
+        assert api.call(write_behind.flush)
+
+    rounds = 5
+    api.call(write_behind.flush)
+    start = time.perf_counter()
+    try:
+        benchmark.pedantic(storm, rounds=rounds)
+    finally:
+        seconds = time.perf_counter() - start
+        api.call(_delete_audit_events, login_user.id)
+    benchmark.extra_info["logins_per_second"] = (
+        clients * logins * rounds / seconds
+    )
+
+
+async def _delete_audit_events(user_id: int) -> None:
+    async with new_async_db_session(SHARED) as session:
+        await session.execute(
+            delete(AuditEvent).where(AuditEvent.user_id == user_id)
+        )